@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# Time the parsing and the grid creation of a fixed corpus: the sample logs of this repo repeated N times
+#   $ python benchmarks/bench_parse_fix_lines.py [N]
+import glob
+import os
+import sys
+import time
+
+from fixations.fix_utils import extract_fix_lines_from_str_lines, create_fix_lines_grid
+
+LOGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'logs')
+DEFAULT_REPEAT_COUNT = 500
+
+
+def load_corpus():
+    corpus = {}
+    for log_path in sorted(glob.glob(f"{LOGS_DIR}/*.log")):
+        with open(log_path) as fd:
+            lines = fd.readlines()
+        if extract_fix_lines_from_str_lines(lines)[1]:
+            corpus[os.path.basename(log_path)] = lines
+
+    return corpus
+
+
+def main():
+    repeat_count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REPEAT_COUNT
+    total_parse_time = total_grid_time = 0
+    for log_name, lines in load_corpus().items():
+        lines = lines * repeat_count
+
+        start_time = time.perf_counter()
+        fix_tag_dict, fix_lines, used_fix_tags, _ = extract_fix_lines_from_str_lines(lines)
+        parse_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        create_fix_lines_grid(fix_tag_dict, fix_lines, used_fix_tags)
+        grid_time = time.perf_counter() - start_time
+
+        total_parse_time += parse_time
+        total_grid_time += grid_time
+        print(f"{log_name:30} {len(fix_lines):7} FIX lines  parse:{parse_time:7.3f}s  grid:{grid_time:7.3f}s")
+    print(f"{'TOTAL':30} {'':17}  parse:{total_parse_time:7.3f}s  grid:{total_grid_time:7.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# Time the saves of THREAD_COUNT threads, SAVE_COUNT saves each, to a fresh store in a temp dir
+#   $ python benchmarks/bench_store.py [THREAD_COUNT] [SAVE_COUNT]
+import inspect
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from fixations.fix_store import Store
+
+DEFAULT_THREAD_COUNT = 8
+DEFAULT_SAVE_COUNT = 200
+LINES = "12:00:00.001 8=FIX.4.2|9=10|35=D|49=BUYER|56=SELLER|11=ORD{0}|55=IBM|10=001\n" * 20
+
+
+def time_saves(store: Store, thread_count: int, save_count: int) -> float:
+    errors = []
+
+    def save_lines(thread_index: int) -> None:
+        try:
+            for i in range(save_count):
+                store.save(f"{thread_index}-{i}", LINES.format(i))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save_lines, args=(thread_index,)) for thread_index in range(thread_count)]
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed_time = time.perf_counter() - start_time
+    if errors:
+        print(f"  {len(errors)} threads failed, e.g. {errors[0]}")
+
+    return elapsed_time
+
+
+def main():
+    thread_count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_THREAD_COUNT
+    save_count = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_SAVE_COUNT
+    modes = [('save', {})]
+    if 'group_commit' in inspect.signature(Store).parameters:
+        modes.append(('save with group commit', {'group_commit': True}))
+
+    for mode, kwargs in modes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = Store(os.path.join(tmp_dir, 'store.db'), **kwargs)
+            elapsed_time = time_saves(store, thread_count, save_count)
+            save_total = thread_count * save_count
+            print(f"{mode:25} {save_total:6} saves by {thread_count} threads: {elapsed_time:7.3f}s "
+                  f"{save_total / elapsed_time:8.0f} saves/s")
+
+    if hasattr(Store, 'save_many'):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = Store(os.path.join(tmp_dir, 'store.db'))
+            save_total = thread_count * save_count
+            start_time = time.perf_counter()
+            store.save_many((str(i), LINES.format(i)) for i in range(save_total))
+            elapsed_time = time.perf_counter() - start_time
+            print(f"{'save_many':25} {save_total:6} saves by 1 thread:  {elapsed_time:7.3f}s "
+                  f"{save_total / elapsed_time:8.0f} saves/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# Asynchronous (ASGI) entry point of webfix, alongside the WSGI one (wsgi.py), e.g.
+#   $ uvicorn --workers 4 fixations.asgi:app
+#   $ gunicorn -w 4 -k uvicorn.workers.UvicornWorker fixations.asgi:app
+#
+# It serves the same Flask app, routes and templates but without tying up a worker for a whole request:
+#  . the event loop only receives the requests and sends the responses, as the Flask app reads/produces their bodies
+#  . the Flask app runs in a thread pool so that the reads from the store, which are blocking, don't block the loop
+#  . the large payloads are parsed and turned into grids by a process pool (see webfix.run_parsing()) so that they
+#    don't hold the GIL of the threads handling the small requests in the meantime
+import asyncio
+import io
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import List, Tuple, Dict, Callable
+
+from fixations import webfix
+
+THREAD_COUNT = 32
+PROCESS_COUNT = os.cpu_count() or 1
+
+thread_executor = ThreadPoolExecutor(THREAD_COUNT, thread_name_prefix='webfix')
+
+
+def create_parse_executor() -> ProcessPoolExecutor:
+    # forking a process that has threads running (e.g. the group commit writer of the store) isn't safe
+    start_methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('forkserver' if 'forkserver' in start_methods else 'spawn')
+
+    return ProcessPoolExecutor(PROCESS_COUNT, mp_context=context)
+
+
+async def app(scope, receive, send) -> None:
+    if scope['type'] == 'lifespan':
+        await handle_lifespan(receive, send)
+    elif scope['type'] == 'http':
+        await handle_http(scope, receive, send)
+
+
+async def handle_lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            if webfix.parse_executor is None:
+                webfix.parse_executor = create_parse_executor()
+            webfix.start_store_eviction()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if webfix.parse_executor is not None:
+                webfix.parse_executor.shutdown()
+                webfix.parse_executor = None
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def handle_http(scope, receive, send) -> None:
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(thread_executor, call_flask_app, scope, receive, send, loop)
+
+
+# The body of the request is received and the one of the response is sent as the Flask app reads and produces them:
+# their coroutines are run by the event loop while the thread waits for them
+def call_flask_app(scope, receive, send, loop: asyncio.AbstractEventLoop) -> None:
+    def run(coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    response_start = {'type': 'http.response.start'}
+
+    def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None) -> None:
+        response_start['status'] = int(status.split()[0])
+        response_start['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                     for name, value in headers]
+
+    body_chunks = webfix.app(create_environ(scope, ReceivedBody(lambda: run(receive()))), start_response)
+    try:
+        run(send(response_start))
+        for chunk in body_chunks:
+            if chunk:
+                run(send({'type': 'http.response.body', 'body': chunk, 'more_body': True}))
+        run(send({'type': 'http.response.body', 'body': b''}))
+    finally:
+        if hasattr(body_chunks, 'close'):
+            body_chunks.close()
+
+
+# The body of the request as a file, read as its http.request messages are received
+class ReceivedBody(io.RawIOBase):
+    def __init__(self, receive_message: Callable[[], Dict]) -> None:
+        self.receive_message = receive_message
+        self.data = b''
+        self.more_body = True
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self.data and self.more_body:
+            message = self.receive_message()
+            if message['type'] == 'http.disconnect':
+                self.more_body = False
+            else:
+                self.data = message.get('body', b'')
+                self.more_body = message.get('more_body', False)
+
+        size = min(len(buffer), len(self.data))
+        buffer[:size] = self.data[:size]
+        self.data = self.data[size:]
+
+        return size
+
+
+# The WSGI environ (PEP 3333) of an ASGI HTTP request
+def create_environ(scope, body: io.RawIOBase) -> Dict:
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {'REQUEST_METHOD': scope['method'],
+               'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+               'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+               'QUERY_STRING': scope['query_string'].decode('latin-1'),
+               'SERVER_NAME': server_name,
+               'SERVER_PORT': str(server_port),
+               'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+               'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+               'wsgi.version': (1, 0),
+               'wsgi.url_scheme': scope.get('scheme', 'http'),
+               'wsgi.input': body,
+               # the body ends with its last message, even a chunked one (i.e. without Content-Length)
+               'wsgi.input_terminated': True,
+               'wsgi.errors': sys.stderr,
+               'wsgi.multithread': True,
+               'wsgi.multiprocess': True,
+               'wsgi.run_once': False}
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f"HTTP_{name}"
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+
+    return environ
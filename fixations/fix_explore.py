@@ -7,8 +7,10 @@ from typing import Dict, List, Tuple, Union, Set
 
 from tabulate import tabulate
 
-from fixations.fix_utils import extract_info_for_fix_version, get_list_of_available_fix_versions, \
-    FixVersionInfo, FixTag, FIX_VERSION_ALL, FixTagValueClash
+from fixations.fix_tag_search_engine import get_fix_tag_search_engine, RANK_NAMES
+from fixations.fix_utils import get_list_of_available_fix_versions, FixVersionInfo, FIX_VERSION_ALL, \
+    FixTagValueClash
+from fixations.fix_version_matrix import get_fix_version_matrix
 
 TABULATE_DEFAULT_FORMAT = 'grid'
 
@@ -31,35 +33,28 @@ def validate_fix_versions(fix_versions_csv: str) -> List[str]:
     return valid_fix_versions
 
 
-def get_tags_and_infos_for_versions(fix_versions: List[str], fix_tags: Union[None, List[str]] = None) -> Tuple[
-    Dict[str, FixVersionInfo], Dict[str, FixTag]]:
-    fix_tags_of_interest: Set[str] = set(fix_tags if fix_tags else [])
-    fix_version_infos: Dict[str, FixVersionInfo] = {}
-    all_fix_tags_across_all_versions: Dict[str, FixTag] = {}
-    for fix_version in fix_versions:
-        fix_version_infos[fix_version] = extract_info_for_fix_version(fix_version)
-        for fix_tag in fix_version_infos[fix_version].fix_tags_by_tag_id.values():
-            if not fix_tags_of_interest or fix_tag.id in fix_tags_of_interest:
-                all_fix_tags_across_all_versions[fix_tag.id] = fix_tag
-
-    return fix_version_infos, all_fix_tags_across_all_versions
-
-
 def show_tags_across_versions(fix_versions: Union[None, List[str]] = None, fix_tags: Union[None, List[str]] = None,
                               grid_style: str = TABULATE_DEFAULT_FORMAT) -> None:
     if fix_versions == None:
         fix_versions = get_list_of_available_fix_versions()
 
-    fix_version_infos, all_fix_tags_across_all_versions = get_tags_and_infos_for_versions(fix_versions, fix_tags)
+    fix_version_matrix = get_fix_version_matrix()
+    version_mask = fix_version_matrix.get_version_mask(fix_versions)
+    version_masks = [fix_version_matrix.get_version_mask([fix_version]) for fix_version in fix_versions]
+    fix_tags_of_interest: Set[str] = set(fix_tags if fix_tags else [])
 
     versions_for_tags: List[List[str]] = []
-    for fix_tag in sorted(all_fix_tags_across_all_versions.values(), key=lambda fix_tag: int(fix_tag.id)):
-        versions_for_tag: List[str] = [fix_tag.id, fix_tag.name, fix_tag.type]
-        for fix_version in fix_versions:
-            if fix_tag.id in fix_version_infos[fix_version].fix_tags_by_tag_id:
-                values = fix_version_infos[fix_version].fix_tags_by_tag_id[fix_tag.id].values.values()
+    for fix_tag_id in fix_version_matrix.get_tag_ids(version_mask):
+        if fix_tags_of_interest and fix_tag_id not in fix_tags_of_interest:
+            continue
+        name, tag_type, _ = fix_version_matrix.get_tag_fields(fix_tag_id, version_mask)
+        versions_for_tag: List[str] = [fix_tag_id, name, tag_type]
+        tag_version_mask = fix_version_matrix.tag_version_masks[fix_tag_id]
+        for fix_version, fix_version_mask in zip(fix_versions, version_masks):
+            if tag_version_mask & fix_version_mask:
+                values = fix_version_matrix.get_values(fix_tag_id, fix_version)
                 if values:
-                    value_rows = "\n".join([f"{v.value}: {v.name}" for v in sorted(values, key=lambda v: v.value)])
+                    value_rows = "\n".join([f"{value}: {value_name}" for value, value_name in values])
                 else:
                     value_rows = '✅'
                 versions_for_tag.append(value_rows)
@@ -67,8 +62,49 @@ def show_tags_across_versions(fix_versions: Union[None, List[str]] = None, fix_t
                 versions_for_tag.append(' ')
         versions_for_tags.append(versions_for_tag)
 
+    # all the columns are text but the TAG_ID one: there's no need for tabulate to guess the type of each cell
     print(tabulate(versions_for_tags, headers=['TAG_ID', 'NAME', 'TYPE'] + fix_versions,
-                   tablefmt=grid_style))
+                   tablefmt=grid_style, disable_numparse=True, colalign=['right'] + ['left'] * (2 + len(fix_versions))))
+
+
+def show_diff_between_versions(old_fix_version: str, new_fix_version: str,
+                               grid_style: str = TABULATE_DEFAULT_FORMAT) -> None:
+    fix_version_matrix = get_fix_version_matrix()
+    fix_version_diff = fix_version_matrix.diff(old_fix_version, new_fix_version)
+    new_version_mask = fix_version_matrix.get_version_mask([new_fix_version])
+    old_version_mask = fix_version_matrix.get_version_mask([old_fix_version])
+
+    def get_tag_rows(fix_tag_ids: List[str], version_mask: int) -> List[List[str]]:
+        return [[fix_tag_id, *fix_version_matrix.get_tag_fields(fix_tag_id, version_mask)[:2]]
+                for fix_tag_id in fix_tag_ids]
+
+    tables = [(f"TAGS ADDED IN {new_fix_version}", ['TAG_ID', 'NAME', 'TYPE'],
+               get_tag_rows(fix_version_diff.added_tag_ids, new_version_mask)),
+              (f"TAGS REMOVED FROM {old_fix_version}", ['TAG_ID', 'NAME', 'TYPE'],
+               get_tag_rows(fix_version_diff.removed_tag_ids, old_version_mask)),
+              ("TAGS CHANGED", ['TAG_ID', f"{old_fix_version} NAME", f"{old_fix_version} TYPE",
+                                f"{new_fix_version} NAME", f"{new_fix_version} TYPE"],
+               [old_row + new_row[1:] for old_row, new_row in
+                zip(get_tag_rows(fix_version_diff.changed_tag_ids, old_version_mask),
+                    get_tag_rows(fix_version_diff.changed_tag_ids, new_version_mask))]),
+              (f"VALUES ADDED IN {new_fix_version}", ['TAG_ID', 'VALUE', 'NAME'], fix_version_diff.added_values),
+              (f"VALUES REMOVED FROM {old_fix_version}", ['TAG_ID', 'VALUE', 'NAME'], fix_version_diff.removed_values),
+              ("VALUES RENAMED", ['TAG_ID', 'VALUE', f"{old_fix_version} NAME", f"{new_fix_version} NAME"],
+               fix_version_diff.renamed_values)]
+    for title, headers, rows in tables:
+        print(f"\n{title}: {len(rows)}")
+        if rows:
+            print(tabulate(rows, headers=headers, tablefmt=grid_style, disable_numparse=True))
+
+
+def show_search_results(search: str, fix_versions: Union[None, List[str]] = None,
+                        grid_style: str = TABULATE_DEFAULT_FORMAT) -> None:
+    results = get_fix_tag_search_engine().search(search, fix_versions)
+    rows = [[result.fix_tag_id, result.name, RANK_NAMES[result.rank], result.match, ', '.join(result.fix_versions)]
+            for result in results]
+
+    print(tabulate(rows, headers=['TAG_ID', 'NAME', 'MATCHED_BY', 'MATCH', 'FIX_VERSIONS'], tablefmt=grid_style,
+                   maxcolwidths=[None, None, None, 60, 40]))
 
 
 def print_all_fix_tag_value_clashes(all_fix_tag_value_clashes: List[FixTagValueClash]) -> None:
@@ -83,28 +119,14 @@ def print_all_fix_tag_value_clashes(all_fix_tag_value_clashes: List[FixTagValueC
                        tablefmt='psql'), file=sys.stderr)
 
 
-def sort_by_tag_ids_and_values(fix_tags_by_tag_id: Dict[str, FixTag]) -> Dict[str, FixTag]:
-    sorted_fix_tags_by_tag_id: Dict[str, FixTag] = {}
-    for fix_tag_id in sorted(fix_tags_by_tag_id, key=int):
-        fix_tag = fix_tags_by_tag_id[fix_tag_id]
-        fix_tag.values = {v.value: v for v in sorted(fix_tag.values.values(), key=lambda v: v.value)}
-        sorted_fix_tags_by_tag_id[fix_tag_id] = fix_tag
-
-    return sorted_fix_tags_by_tag_id
-
-
 def merge_fix_versions(fix_versions: List[str]) -> Tuple[FixVersionInfo, List[FixTagValueClash]]:
-    all_versions_info: FixVersionInfo = extract_info_for_fix_version(fix_versions[0])
-    all_versions_info.version = FIX_VERSION_ALL
-    all_fix_tag_value_clashes: List[FixTagValueClash] = []
-    for fix_version in fix_versions[1:]:
-        fix_version_info = extract_info_for_fix_version(fix_version)
-        fix_tag_value_clashes = all_versions_info.merge_with_other_fix_version_info(fix_version_info)
-        all_fix_tag_value_clashes.extend(fix_tag_value_clashes)
+    fix_version_matrix = get_fix_version_matrix()
+    version_mask = fix_version_matrix.get_version_mask(fix_versions)
+    all_versions_info = FixVersionInfo(FIX_VERSION_ALL)
+    all_versions_info.fix_tags_by_tag_id = {fix_tag_id: fix_version_matrix.get_fix_tag(fix_tag_id, version_mask)
+                                            for fix_tag_id in fix_version_matrix.get_tag_ids(version_mask)}
 
-    all_versions_info.fix_tags_by_tag_id = sort_by_tag_ids_and_values(all_versions_info.fix_tags_by_tag_id)
-
-    return all_versions_info, all_fix_tag_value_clashes
+    return all_versions_info, fix_version_matrix.get_value_clashes(version_mask)
 
 
 def generate_all_info() -> None:
@@ -113,7 +135,8 @@ def generate_all_info() -> None:
     all_versions_info, all_fix_tag_value_clashes = merge_fix_versions(fix_versions)
     print_all_fix_tag_value_clashes(all_fix_tag_value_clashes)
 
-    json_str = json.dumps(all_versions_info.fix_tags_by_tag_id, default=lambda o: o.to_dict(), indent=2)
+    # the fields of the FixTag/FixTagValue dataclasses, in order, as their to_dict() would but without its overhead
+    json_str = json.dumps(all_versions_info.fix_tags_by_tag_id, default=lambda o: o.__dict__, indent=2)
     print(json_str)
 
 
@@ -127,6 +150,10 @@ def parse_args():
                          "See 'Table format' section in https://github.com/astanin/python-tabulate")
     ap.add_argument('-a', '--generate_all_info', action='store_true',
                     help="Generate JSON info across *all* FIX versions")
+    ap.add_argument('-d', '--diff', type=str,
+                    help="Show what changed between two CSV FIX versions, e.g. 4.4,5.0SP2")
+    ap.add_argument('-s', '--search', type=str,
+                    help="Search the tags best matching this text (id, name, enum value name, description or a typo)")
     ap.add_argument('fix_tags', nargs='*', help="Optional list of FIX tags to focus on. All by default.")
 
     return ap.parse_args()
@@ -137,6 +164,12 @@ def main():
 
     if cli_args.generate_all_info:
         generate_all_info()
+    elif cli_args.diff:
+        fix_versions = validate_fix_versions(cli_args.diff)
+        if len(fix_versions) != 2:
+            print(f"Two FIX versions are needed to show their differences, not:{cli_args.diff}. Exiting")
+            exit(1)
+        show_diff_between_versions(fix_versions[0], fix_versions[1], cli_args.grid_style)
     else:
         fix_versions_csv = cli_args.fix_versions
         if fix_versions_csv:
@@ -144,7 +177,10 @@ def main():
         else:
             fix_versions = None
 
-        show_tags_across_versions(fix_versions, cli_args.fix_tags, cli_args.grid_style)
+        if cli_args.search:
+            show_search_results(cli_args.search, fix_versions, cli_args.grid_style)
+        else:
+            show_tags_across_versions(fix_versions, cli_args.fix_tags, cli_args.grid_style)
 
 
 if __name__ == '__main__':
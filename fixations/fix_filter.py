@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# Filter expressions to only keep the FIX lines of interest, e.g.
+#   35 in (D,8,F) and 55=IBM and 11~^ABC
+#   time >= 10:52:25 and time < 10:53 and not 39=8
+#   (49=BUYER and 56=SELLER) or (49=SELLER and 56=BUYER)
+#
+# Grammar (keywords are case-insensitive, values with spaces or special characters can be quoted):
+#   expression := and_expression ('or' and_expression)*
+#   and_expression := unary_expression ('and' unary_expression)*
+#   unary_expression := 'not' unary_expression | '(' expression ')' | condition
+#   condition := field operator value | field 'in' '(' value (',' value)* ')'
+#   field := FIX tag id | 'time' (the line's timestamp, see extract_timestamp())
+#   operator := '=' | '!=' | '~' (regex search) | '!~' | '<' | '<=' | '>' | '>='
+#
+# The comparisons (<, <=, >, >=) are numeric when both sides are numbers. Otherwise they're done on the strings,
+# without the date of one side when the other one doesn't have any.
+# The times (all but ~ and !~) are compared as instants whatever their format (see parse_timestamp()), also without
+# the date of one side when the other one doesn't have any, i.e. time < 10:53 matches 20111107-10:52:25.5 and
+# time < 9:30 doesn't match 10:52:57. They're hh:mm[:ss[.fraction]], optionally preceded by a date.
+#
+# Each FIX line is first checked at the bytes level, e.g. a line without b'55=IBM' can't match 55=IBM, so that
+# most of the filtered out lines don't even get decoded, let alone parsed.
+import re
+import sys
+from typing import List, Tuple, Union, Dict
+
+from fixations.fix_timestamp import parse_timestamp, compute_delta_ns
+from fixations.fix_utils import get_kv_parts_from_line, extract_timestamp, remove_date_from_datetime
+
+TIME_FIELD = 'time'
+TOKEN_PATTERN = re.compile(r"""\s*(?:(?P<quoted>'[^']*'|"[^"]*")|(?P<operator>!=|!~|<=|>=|=|~|<|>)|"""
+                           r"""(?P<punctuation>[(),])|(?P<word>[^\s(),=!~<>'"]+))""")
+DATE_PATTERN = re.compile(r'\d{8}-|\d{4}-\d\d-\d\d')
+
+
+class FixFilterError(ValueError):
+    pass
+
+
+# The fields of a FIX line, only extracted when first needed
+class FixLineFields:
+    def __init__(self, line: str) -> None:
+        self.line = line
+        self.fix_tags = None
+
+    def get_fix_tags(self) -> Dict[str, str]:
+        if self.fix_tags is None:
+            _, kv_parts, _, _, _ = get_kv_parts_from_line(self.line.strip())
+            self.fix_tags = {}
+            for kv_part in kv_parts:
+                tag_id, equal_sign, value = kv_part.partition('=')
+                if equal_sign:
+                    self.fix_tags[tag_id] = value
+
+        return self.fix_tags
+
+    def get(self, field: str) -> Union[str, None]:
+        if field == TIME_FIELD:
+            timestamp, _ = extract_timestamp(self.line, self.get_fix_tags())
+            return timestamp
+
+        return self.get_fix_tags().get(field)
+
+
+class Condition:
+    def __init__(self, field: str, operator: str, values: List[str]) -> None:
+        self.field = field
+        self.operator = operator
+        self.values = values
+        if operator in ('~', '!~'):
+            try:
+                self.regex = re.compile(values[0])
+            except re.error as e:
+                raise FixFilterError(f"Invalid regex:'{values[0]}' for field:{field}. Error:{e}")
+        # the line must contain at least one of these to possibly match
+        if field != TIME_FIELD and operator in ('=', 'in'):
+            self.needles = [f"{field}={value}".encode() for value in values]
+        else:
+            self.needles = None
+        if field == TIME_FIELD and operator not in ('~', '!~'):
+            self.time_values_ns = [parse_time_value(value) for value in values]
+        else:
+            self.time_values_ns = None
+
+    def might_match(self, byte_line: bytes) -> bool:
+        return self.needles is None or any(needle in byte_line for needle in self.needles)
+
+    def evaluate(self, fields: FixLineFields) -> bool:
+        value = fields.get(self.field)
+        operator = self.operator
+        if value is None:
+            return operator in ('!=', '!~')
+        if self.time_values_ns is not None:
+            return self.evaluate_time(value)
+        if operator == '=':
+            return value == self.values[0]
+        if operator == '!=':
+            return value != self.values[0]
+        if operator == 'in':
+            return value in self.values
+        if operator == '~':
+            return self.regex.search(value) is not None
+        if operator == '!~':
+            return self.regex.search(value) is None
+
+        return compare_values(value, operator, self.values[0])
+
+    def evaluate_time(self, timestamp: str) -> bool:
+        try:
+            timestamp_ns = parse_timestamp(timestamp)
+        except ValueError:
+            # like a line without any time
+            return self.operator == '!='
+        deltas_ns = [compute_delta_ns(timestamp_ns, time_value_ns) for time_value_ns in self.time_values_ns]
+        operator = self.operator
+        if operator == '=':
+            return deltas_ns[0] == 0
+        if operator == '!=':
+            return deltas_ns[0] != 0
+        if operator == 'in':
+            return 0 in deltas_ns
+
+        return compare(deltas_ns[0], operator, 0)
+
+
+class Not:
+    def __init__(self, operand) -> None:
+        self.operand = operand
+
+    def might_match(self, byte_line: bytes) -> bool:
+        return True
+
+    def evaluate(self, fields: FixLineFields) -> bool:
+        return not self.operand.evaluate(fields)
+
+
+class And:
+    def __init__(self, operands: List) -> None:
+        self.operands = operands
+
+    def might_match(self, byte_line: bytes) -> bool:
+        return all(operand.might_match(byte_line) for operand in self.operands)
+
+    def evaluate(self, fields: FixLineFields) -> bool:
+        return all(operand.evaluate(fields) for operand in self.operands)
+
+
+class Or:
+    def __init__(self, operands: List) -> None:
+        self.operands = operands
+
+    def might_match(self, byte_line: bytes) -> bool:
+        return any(operand.might_match(byte_line) for operand in self.operands)
+
+    def evaluate(self, fields: FixLineFields) -> bool:
+        return any(operand.evaluate(fields) for operand in self.operands)
+
+
+class FixFilter:
+    def __init__(self, expression: str) -> None:
+        self.expression = expression
+        self.root = FixFilterParser(expression).parse()
+
+    # Cheap check done on the raw bytes of a FIX line: False means the line can't match
+    def might_match(self, byte_line: bytes) -> bool:
+        return self.root.might_match(byte_line)
+
+    # Only FIX lines are filtered: any other line (comment, command...) matches
+    def matches(self, line: str) -> bool:
+        fields = FixLineFields(line)
+        if not fields.get_fix_tags():
+            return True
+
+        return self.root.evaluate(fields)
+
+
+class FixFilterParser:
+    def __init__(self, expression: str) -> None:
+        self.expression = expression
+        self.tokens = tokenize(expression)
+        self.position = 0
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek() is not None:
+            self.fail(f"unexpected '{self.peek()[1]}'")
+
+        return node
+
+    def peek(self) -> Union[Tuple[str, str], None]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def next(self) -> Tuple[str, str]:
+        token = self.peek()
+        if token is None:
+            self.fail("unexpected end of expression")
+        self.position += 1
+
+        return token
+
+    def peek_keyword(self, keyword: str) -> bool:
+        token = self.peek()
+        return token is not None and token[0] == 'word' and token[1].lower() == keyword
+
+    def expect_punctuation(self, punctuation: str) -> None:
+        token = self.next()
+        if token != ('punctuation', punctuation):
+            self.fail(f"expected '{punctuation}' instead of '{token[1]}'")
+
+    def fail(self, message: str) -> None:
+        raise FixFilterError(f"Invalid filter expression:'{self.expression}': {message}")
+
+    def parse_or(self):
+        operands = [self.parse_and()]
+        while self.peek_keyword('or'):
+            self.next()
+            operands.append(self.parse_and())
+
+        return operands[0] if len(operands) == 1 else Or(operands)
+
+    def parse_and(self):
+        operands = [self.parse_unary()]
+        while self.peek_keyword('and'):
+            self.next()
+            operands.append(self.parse_unary())
+
+        return operands[0] if len(operands) == 1 else And(operands)
+
+    def parse_unary(self):
+        if self.peek_keyword('not'):
+            self.next()
+            return Not(self.parse_unary())
+        if self.peek() == ('punctuation', '('):
+            self.next()
+            node = self.parse_or()
+            self.expect_punctuation(')')
+            return node
+
+        return self.parse_condition()
+
+    def parse_condition(self) -> Condition:
+        token_type, field = self.next()
+        field = field.lower()
+        if token_type != 'word' or not (field.isdigit() or field == TIME_FIELD):
+            self.fail(f"'{field}' isn't a FIX tag id or '{TIME_FIELD}'")
+
+        if self.peek_keyword('in'):
+            self.next()
+            self.expect_punctuation('(')
+            values = [self.parse_value()]
+            while self.peek() == ('punctuation', ','):
+                self.next()
+                values.append(self.parse_value())
+            self.expect_punctuation(')')
+            return Condition(field, 'in', values)
+
+        token_type, operator = self.next()
+        if token_type != 'operator':
+            self.fail(f"expected an operator after '{field}' instead of '{operator}'")
+
+        return Condition(field, operator, [self.parse_value()])
+
+    def parse_value(self) -> str:
+        token_type, value = self.next()
+        if token_type == 'quoted':
+            return value[1:-1]
+        if token_type != 'word':
+            self.fail(f"expected a value instead of '{value}'")
+
+        return value
+
+
+def tokenize(expression: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = TOKEN_PATTERN.match(expression, position)
+        if not match or match.end() == position:
+            raise FixFilterError(f"Invalid filter expression:'{expression}': can't parse '{expression[position:]}'")
+        tokens.append((match.lastgroup, match.group(match.lastgroup)))
+        position = match.end()
+
+    return tokens
+
+
+def compare_values(value: str, operator: str, other_value: str) -> bool:
+    try:
+        value, other_value = float(value), float(other_value)
+    except ValueError:
+        # e.g. a log prefix timestamp usually doesn't have a date but tag 52 does
+        value_has_date, other_value_has_date = DATE_PATTERN.search(value), DATE_PATTERN.search(other_value)
+        if value_has_date and not other_value_has_date:
+            value = remove_date_from_datetime(value)
+        elif other_value_has_date and not value_has_date:
+            other_value = remove_date_from_datetime(other_value)
+
+    return compare(value, operator, other_value)
+
+
+def compare(value, operator: str, other_value) -> bool:
+    if operator == '<':
+        return value < other_value
+    if operator == '<=':
+        return value <= other_value
+    if operator == '>':
+        return value > other_value
+
+    return value >= other_value
+
+
+# hh:mm is hh:mm:00
+def parse_time_value(value: str) -> int:
+    time_value = f"{value}:00" if value.count(':') == 1 else value
+    try:
+        return parse_timestamp(time_value)
+    except ValueError as e:
+        raise FixFilterError(f"Invalid time:'{value}' for field:{TIME_FIELD}. Error:{e}")
+
+
+def create_fix_filter(expression: str) -> Union[FixFilter, None]:
+    return FixFilter(expression) if expression and expression.strip() else None
+
+
+if __name__ == "__main__":
+    fix_filter = FixFilter(sys.argv[1])
+    for line in sys.stdin:
+        if fix_filter.might_match(line.encode()) and fix_filter.matches(line):
+            print(line, end='')
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# A grid of parsed FIX lines, as created by create_fix_lines_grid(), that is served by windows of rows x columns
+# rather than as a whole, e.g. to a web page that only displays the part of a huge grid that's in view:
+#  . the first fixed_column_count columns (e.g. TAG_ID and TAG_NAME) are part of every window
+#  . the comment row, if any, is windowed like the headers
+import sys
+from dataclasses import dataclass
+from typing import List, Dict, Union
+
+from fixations.fix_utils import create_fix_lines_grid_from_str_lines
+
+# rough memory footprint of a cell on top of its characters (str object, list slot)
+CELL_OVERHEAD = 64
+MAX_WINDOW_ROW_COUNT = 500
+MAX_WINDOW_COLUMN_COUNT = 200
+
+
+@dataclass
+class FixGrid:
+    headers: List[str]
+    rows: List[List[str]]
+    comment_row: Union[List[str], None]
+    fixed_column_count: int
+
+    @property
+    def row_count(self) -> int:
+        return len(self.rows)
+
+    @property
+    def column_count(self) -> int:
+        return len(self.headers) - self.fixed_column_count
+
+    @property
+    def cell_count(self) -> int:
+        return len(self.rows) * len(self.headers)
+
+    def get_size(self) -> int:
+        return sum(len(cell) + CELL_OVERHEAD for row in self.rows for cell in row) + \
+            sum(len(header) + CELL_OVERHEAD for header in self.headers)
+
+    # The column_start and column_count are those of the non-fixed columns. The counts are capped
+    def get_window(self, row_start: int, row_count: int, column_start: int, column_count: int) -> Dict:
+        row_start = min(max(row_start, 0), self.row_count)
+        row_end = row_start + min(max(row_count, 0), MAX_WINDOW_ROW_COUNT)
+        column_start = min(max(column_start, 0), self.column_count)
+        column_end = column_start + min(max(column_count, 0), MAX_WINDOW_COLUMN_COUNT)
+
+        def get_window_columns(row: List[str]) -> List[str]:
+            fixed_column_count = self.fixed_column_count
+            return row[:fixed_column_count] + row[fixed_column_count + column_start:fixed_column_count + column_end]
+
+        return {'row_count': self.row_count,
+                'column_count': self.column_count,
+                'fixed_column_count': self.fixed_column_count,
+                'row_start': row_start,
+                'column_start': column_start,
+                'headers': get_window_columns(self.headers),
+                'comment_row': get_window_columns(self.comment_row) if self.comment_row else None,
+                'rows': [get_window_columns(row) for row in self.rows[row_start:row_end]]}
+
+
+if __name__ == "__main__":
+    with open(sys.argv[1]) as fd:
+        headers_, rows_, comment_row_, _, _ = create_fix_lines_grid_from_str_lines(fd.readlines())
+    fix_grid = FixGrid(headers_, rows_, comment_row_, 2)
+    print(f"rows:{fix_grid.row_count} columns:{fix_grid.column_count} size:{fix_grid.get_size()}")
+    print(fix_grid.get_window(*[int(arg) for arg in sys.argv[2:6]]))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# Incremental parsing of a live log file, like tail -F: each call to read_new_fix_lines() only parses the FIX lines
+# appended since the previous one.
+#  . only complete lines are parsed: a partial last line will be once it's done being written
+#  . the FIX version is determined once, from the first FIX line, and the comment of the last line read is carried
+#    over to the next FIX line
+#  . the header state (previous timestamp and Σ of the deltas) is kept so that the Δ/Σ of each new table follow on
+#    from the previous one. So are the tags used so far so that the tables keep the same rows
+#  . a rotated (i.e. replaced or truncated) log file is detected by its inode/size: the rest of the old file is read
+#    and the new one is then followed from its beginning
+import os
+import sys
+import time
+from typing import List, Tuple, Dict, Union
+
+from fixations.fix_utils import HeaderState, iter_byte_lines, iter_str_lines_from_byte_lines, \
+    iter_fix_lines_from_str_lines, determine_fix_version, extract_info_for_fix_version, \
+    create_table_from_parsed_fix_lines, get_comment_of_last_line, FixVersionInfo
+
+FixLine = Tuple[str, Dict[str, str], str]
+
+FOLLOW_POLL_INTERVAL = 0.5
+
+
+class FixLogFollower:
+    def __init__(self, log_path: str, fix_filter=None) -> None:
+        self.log_path = log_path
+        self.fix_filter = fix_filter
+        self.fd = None
+        self.inode = None
+        self.position = 0
+        self.fix_version_info: Union[FixVersionInfo, None] = None
+        # lines read before the FIX version is known
+        self.pending_lines: List[str] = []
+        self.previous_line_comment = ''
+        self.header_state = HeaderState()
+        # the tags of all the tables so far, so that each new table has the rows of the previous ones
+        self.used_fix_tags: Dict[str, int] = {}
+
+    def close(self) -> None:
+        if self.fd:
+            self.fd.close()
+            self.fd = None
+
+    def open(self) -> None:
+        self.close()
+        try:
+            self.fd = open(self.log_path, 'rb')
+        except FileNotFoundError:
+            # e.g. in the middle of a rotation: it will be retried on the next read
+            return
+        self.inode = os.fstat(self.fd.fileno()).st_ino
+        self.position = 0
+        self.previous_line_comment = ''
+
+    def is_rotated(self) -> bool:
+        try:
+            stat = os.stat(self.log_path)
+        except FileNotFoundError:
+            return False
+
+        return stat.st_ino != self.inode or stat.st_size < self.position
+
+    # The FIX lines appended since the previous call
+    def read_new_fix_lines(self) -> List[FixLine]:
+        if self.fd is None:
+            self.open()
+            if self.fd is None:
+                return []
+
+        fix_lines = self.parse_new_data(self.read_new_data(complete_lines_only=True))
+        if self.is_rotated():
+            # what's left of the old file, even a partial last line, and then the new one
+            fix_lines.extend(self.parse_new_data(self.read_new_data(complete_lines_only=False)))
+            self.open()
+            if self.fd:
+                fix_lines.extend(self.parse_new_data(self.read_new_data(complete_lines_only=True)))
+
+        return fix_lines
+
+    def read_new_data(self, complete_lines_only: bool) -> bytes:
+        self.fd.seek(self.position)
+        data = self.fd.read()
+        if complete_lines_only:
+            data = data[:data.rfind(b'\n') + 1]
+        self.position += len(data)
+
+        return data
+
+    def parse_new_data(self, data: bytes) -> List[FixLine]:
+        if not data:
+            return []
+
+        lines = list(iter_str_lines_from_byte_lines(iter_byte_lines(data), fix_filter=self.fix_filter,
+                                                    previous_line_has_comment=bool(self.previous_line_comment)))
+        if self.fix_version_info is None:
+            version = determine_fix_version(lines)
+            if not version:
+                self.pending_lines.extend(lines)
+                return []
+            self.fix_version_info = extract_info_for_fix_version(version)
+            lines = self.pending_lines + lines
+            self.pending_lines = []
+
+        fix_lines = list(iter_fix_lines_from_str_lines(lines, self.fix_version_info, self.previous_line_comment,
+                                                       self.fix_filter))
+        self.previous_line_comment = get_comment_of_last_line(lines, self.previous_line_comment)
+
+        return fix_lines
+
+    def create_table(self, fix_lines: List[FixLine], grid_style: str = 'psql') -> str:
+        for _, fix_tags, _ in fix_lines:
+            self.used_fix_tags.update(dict.fromkeys(fix_tags, 1))
+
+        return create_table_from_parsed_fix_lines(self.fix_version_info.fix_tags_by_tag_id, fix_lines,
+                                                  self.used_fix_tags, grid_style, self.header_state)
+
+
+if __name__ == "__main__":
+    follower = FixLogFollower(sys.argv[1])
+    while True:
+        new_fix_lines = follower.read_new_fix_lines()
+        if new_fix_lines:
+            print(follower.create_table(new_fix_lines), flush=True)
+        else:
+            time.sleep(FOLLOW_POLL_INTERVAL)
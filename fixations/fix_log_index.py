@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# Persistent index of the FIX lines of a (big) log file to jump straight to the lines of interest instead of
+# re-reading the whole file every time.
+#  . the log file is mmap'ed and scanned once to record, for each FIX line, its byte offset/length along with
+#    its msg type (35), timestamp, ClOrdID (11), OrderID (37), SenderCompID (49) and TargetCompID (56)
+#  . the index is a sqlite3 sidecar file (<log file>.fixidx or, if its dir is read-only, one in the data dir)
+#  . it's updated incrementally: only the bytes appended since the last run are scanned
+#  . it's rebuilt from scratch if the file was truncated or rotated, i.e. its first bytes changed
+import hashlib
+import mmap
+import os
+import sqlite3
+import sys
+from typing import List, Tuple, Iterator, Iterable, Union
+
+from fixations.fix_utils import get_data_dir_path, get_kv_parts_from_line, extract_timestamp, iter_byte_lines, \
+    FIX_LINE_SIGNATURE, DEFAULT_ENCODING, FIX_TAG_ID_SENDER_COMP_ID, FIX_TAG_ID_TARGET_COMP_ID, \
+    FIX_TAG_ID_SENDING_TIME
+
+FIX_TAG_ID_MSG_TYPE = "35"
+FIX_TAG_ID_CL_ORD_ID = "11"
+FIX_TAG_ID_ORDER_ID = "37"
+INDEXED_FIX_TAG_IDS = {FIX_TAG_ID_MSG_TYPE, FIX_TAG_ID_CL_ORD_ID, FIX_TAG_ID_ORDER_ID,
+                       FIX_TAG_ID_SENDER_COMP_ID, FIX_TAG_ID_TARGET_COMP_ID}
+
+INDEX_FILE_SUFFIX = '.fixidx'
+INDEX_DIR_NAME = 'log_indexes'
+INDEX_FORMAT_VERSION = 1
+# size of the beginning of the log file used to detect that it was rotated/replaced
+HEAD_SIZE = 4096
+
+
+class FixLogIndex:
+    LINES_TABLE_NAME = 'fix_lines'
+    META_TABLE_NAME = 'meta'
+
+    def __init__(self, log_path: str, index_path: str = None) -> None:
+        self.log_path = log_path
+        self.index_path = index_path if index_path else get_index_path(log_path)
+        self.conn = sqlite3.connect(self.index_path)
+
+        self.conn.execute(f'''CREATE TABLE IF NOT EXISTS {FixLogIndex.META_TABLE_NAME} (
+         key   TEXT NOT NULL PRIMARY KEY,
+         value TEXT NOT NULL);''')
+        self.conn.execute(f'''CREATE TABLE IF NOT EXISTS {FixLogIndex.LINES_TABLE_NAME} (
+         offset         INTEGER NOT NULL PRIMARY KEY,
+         length         INTEGER NOT NULL,
+         msg_type       TEXT,
+         timestamp      TEXT,
+         cl_ord_id      TEXT,
+         order_id       TEXT,
+         sender_comp_id TEXT,
+         target_comp_id TEXT);''')
+        for column in ('msg_type', 'cl_ord_id', 'order_id', 'sender_comp_id', 'target_comp_id'):
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {column}_idx ON {FixLogIndex.LINES_TABLE_NAME} ({column})")
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def get_meta(self, key: str) -> Union[str, None]:
+        row = self.conn.execute(f"SELECT value FROM {self.META_TABLE_NAME} WHERE key = ?", (key,)).fetchone()
+
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value) -> None:
+        self.conn.execute(f"INSERT OR REPLACE INTO {self.META_TABLE_NAME} (key, value) VALUES (?, ?)",
+                          (key, str(value)))
+
+    # Index the lines appended since the last update (all of them the first time) and return how many were added
+    def update(self) -> int:
+        added_line_count = 0
+        with open(self.log_path, 'rb') as fd:
+            if os.fstat(fd.fileno()).st_size == 0:
+                self.reset()
+            else:
+                with mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    indexed_size = self.get_indexed_size(data)
+                    # only complete lines are indexed: a partial last line will be once it's done being written
+                    end = data.rfind(b'\n', indexed_size) + 1
+                    if end > indexed_size:
+                        cursor = self.conn.executemany(
+                            f"INSERT OR REPLACE INTO {self.LINES_TABLE_NAME} VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            iter_index_rows(data, indexed_size, end))
+                        added_line_count = cursor.rowcount
+                        self.set_meta('indexed_size', end)
+                        self.set_meta('head_hash', compute_head_hash(data, min(end, HEAD_SIZE)))
+        self.conn.commit()
+
+        return added_line_count
+
+    # Number of bytes of the log file already indexed, 0 if the index needs to be (re)built
+    def get_indexed_size(self, data: mmap.mmap) -> int:
+        indexed_size = int(self.get_meta('indexed_size') or 0)
+        format_version = self.get_meta('format_version')
+        head_hash = self.get_meta('head_hash')
+        if indexed_size == 0 or format_version != str(INDEX_FORMAT_VERSION) or indexed_size > len(data) or \
+                head_hash != compute_head_hash(data, min(indexed_size, HEAD_SIZE)):
+            self.reset()
+            return 0
+
+        return indexed_size
+
+    def reset(self) -> None:
+        self.conn.execute(f"DELETE FROM {self.LINES_TABLE_NAME}")
+        self.conn.execute(f"DELETE FROM {self.META_TABLE_NAME}")
+        self.set_meta('format_version', INDEX_FORMAT_VERSION)
+
+    # Offsets and lengths of the FIX lines matching all the specified criteria (any of the values of each one)
+    #  . ids are matched against both ClOrdID (11) and OrderID (37)
+    #  . comp_ids are matched against both SenderCompID (49) and TargetCompID (56)
+    def find_lines(self, msg_types: Iterable[str] = None, ids: Iterable[str] = None,
+                   comp_ids: Iterable[str] = None) -> List[Tuple[int, int]]:
+        conditions = []
+        params = []
+        for columns, values in ((['msg_type'], msg_types),
+                                (['cl_ord_id', 'order_id'], ids),
+                                (['sender_comp_id', 'target_comp_id'], comp_ids)):
+            if values:
+                values = list(values)
+                placeholders = ', '.join('?' * len(values))
+                conditions.append('(' + ' OR '.join(f"{column} IN ({placeholders})" for column in columns) + ')')
+                params.extend(values * len(columns))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        return self.conn.execute(f"SELECT offset, length FROM {self.LINES_TABLE_NAME} {where} ORDER BY offset",
+                                 params).fetchall()
+
+    def iter_lines(self, msg_types: Iterable[str] = None, ids: Iterable[str] = None,
+                   comp_ids: Iterable[str] = None, encoding: str = DEFAULT_ENCODING) -> Iterator[str]:
+        lines = self.find_lines(msg_types, ids, comp_ids)
+        if not lines:
+            return
+
+        with open(self.log_path, 'rb') as fd, mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for offset, length in lines:
+                yield data[offset:offset + length].decode(encoding, errors='replace')
+
+
+def get_index_path(log_path: str) -> str:
+    log_path = os.path.abspath(log_path)
+    if os.access(os.path.dirname(log_path), os.W_OK):
+        return log_path + INDEX_FILE_SUFFIX
+
+    index_dir = f"{get_data_dir_path()}/{INDEX_DIR_NAME}"
+    os.makedirs(index_dir, exist_ok=True)
+    path_hash = hashlib.sha256(log_path.encode()).hexdigest()[:16]
+
+    return f"{index_dir}/{os.path.basename(log_path)}-{path_hash}{INDEX_FILE_SUFFIX}"
+
+
+def compute_head_hash(data: mmap.mmap, size: int) -> str:
+    return hashlib.sha256(data[:size]).hexdigest()
+
+
+# One (offset, length, msg_type, timestamp, cl_ord_id, order_id, sender_comp_id, target_comp_id) row
+# per FIX line found between the start and end offsets
+def iter_index_rows(data: mmap.mmap, start: int, end: int, encoding: str = DEFAULT_ENCODING) -> Iterator[Tuple]:
+    offset = start
+    for byte_line in iter_byte_lines(data, start, end):
+        if FIX_LINE_SIGNATURE in byte_line:
+            line = byte_line.decode(encoding, errors='replace')
+            _, kv_parts, _, _, _ = get_kv_parts_from_line(line)
+            fix_tags = {}
+            for kv_part in kv_parts:
+                tag_id, _, value = kv_part.partition('=')
+                if tag_id in INDEXED_FIX_TAG_IDS or tag_id == FIX_TAG_ID_SENDING_TIME:
+                    fix_tags[tag_id] = value.rstrip()
+            timestamp, _ = extract_timestamp(line, fix_tags)
+            yield (offset, len(byte_line), fix_tags.get(FIX_TAG_ID_MSG_TYPE), timestamp,
+                   fix_tags.get(FIX_TAG_ID_CL_ORD_ID), fix_tags.get(FIX_TAG_ID_ORDER_ID),
+                   fix_tags.get(FIX_TAG_ID_SENDER_COMP_ID), fix_tags.get(FIX_TAG_ID_TARGET_COMP_ID))
+        offset += len(byte_line) + 1
+
+
+if __name__ == "__main__":
+    fix_log_index = FixLogIndex(sys.argv[1])
+    print(f"Indexed {fix_log_index.update()} new FIX lines in {fix_log_index.index_path}")
+    for fix_line in fix_log_index.iter_lines(msg_types=sys.argv[2:]):
+        print(fix_line)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# Reconstruction of the whole lifecycle of orders out of parsed FIX lines, i.e. the (timestamp, fix_tags, comment)
+# tuples returned by extract_fix_lines_from_str_lines():
+#  . the new order, its replaces (41 -> 11), cancels and all the execution reports (37) are linked together
+#  . the FIX lines are indexed in one pass with a union-find of their ClOrdID (11), OrigClOrdID (41)
+#    and OrderID (37) so that the chain of any of these ids is then returned in O(chain) time
+#  . ClOrdID/OrigClOrdID and OrderID are distinct namespaces since they're assigned by different parties
+#  . the ids are only unique within a session: the same ids used by different sessions (SenderCompID/TargetCompID
+#    pairs, in either direction) belong to different chains
+import sys
+from typing import Dict, List, Tuple
+
+from fixations.fix_utils import simple_tag_id_encoding, extract_fix_lines_from_str_lines, \
+    create_table_from_parsed_fix_lines, get_used_fix_tags, FIX_TAG_ID_SENDER_COMP_ID, FIX_TAG_ID_TARGET_COMP_ID
+
+FIX_TAG_ID_CL_ORD_ID = "11"
+FIX_TAG_ID_ORIG_CL_ORD_ID = "41"
+FIX_TAG_ID_ORDER_ID = "37"
+# ids that don't identify an order, e.g. an OrderID of a rejected order
+IGNORED_IDS = {'', 'NONE'}
+
+ENCODED_CL_ORD_ID = simple_tag_id_encoding(FIX_TAG_ID_CL_ORD_ID)
+ENCODED_ORIG_CL_ORD_ID = simple_tag_id_encoding(FIX_TAG_ID_ORIG_CL_ORD_ID)
+ENCODED_ORDER_ID = simple_tag_id_encoding(FIX_TAG_ID_ORDER_ID)
+ENCODED_SENDER_COMP_ID = simple_tag_id_encoding(FIX_TAG_ID_SENDER_COMP_ID)
+ENCODED_TARGET_COMP_ID = simple_tag_id_encoding(FIX_TAG_ID_TARGET_COMP_ID)
+
+FixLine = Tuple[str, Dict[str, str], str]
+# the sorted (SenderCompID, TargetCompID) of a FIX line so that both directions are the same session
+Session = Tuple[str, str]
+# (namespace, session, id)
+OrderNode = Tuple[str, Session, str]
+
+
+class OrderChainIndex:
+    def __init__(self, fix_lines: List[FixLine]) -> None:
+        self.fix_lines = fix_lines
+        # union-find of the (namespace, session, id) nodes: each root holds the indexes of its chain's FIX lines
+        self.parents: Dict[OrderNode, OrderNode] = {}
+        self.line_indexes_by_root: Dict[OrderNode, List[int]] = {}
+        # the nodes of an id, one per namespace and session it's used in
+        self.nodes_by_order_id: Dict[str, List[OrderNode]] = {}
+
+        for line_index, (_, fix_tags, _) in enumerate(fix_lines):
+            nodes = get_order_nodes(fix_tags)
+            if nodes:
+                root = self.find(nodes[0])
+                for node in nodes[1:]:
+                    root = self.union(root, self.find(node))
+                self.line_indexes_by_root[root].append(line_index)
+
+    def find(self, node: OrderNode) -> OrderNode:
+        parents = self.parents
+        if node not in parents:
+            parents[node] = node
+            self.line_indexes_by_root[node] = []
+            self.nodes_by_order_id.setdefault(node[2], []).append(node)
+            return node
+
+        root = node
+        while parents[root] != root:
+            root = parents[root]
+        # path compression
+        while parents[node] != root:
+            parents[node], node = root, parents[node]
+
+        return root
+
+    def union(self, root: OrderNode, other_root: OrderNode) -> OrderNode:
+        if root == other_root:
+            return root
+
+        # the smaller chain is merged into the bigger one
+        line_indexes = self.line_indexes_by_root
+        if len(line_indexes[root]) < len(line_indexes[other_root]):
+            root, other_root = other_root, root
+        self.parents[other_root] = root
+        line_indexes[root].extend(line_indexes.pop(other_root))
+
+        return root
+
+    # The order chains that the id (ClOrdID, OrigClOrdID or OrderID) belongs to, one per session using it, each with
+    # its FIX lines in their original order. The chains are in the order of their first FIX line
+    def get_chains(self, order_id: str) -> List[Tuple[Session, List[FixLine]]]:
+        line_indexes_by_session: Dict[Session, set] = {}
+        for node in self.nodes_by_order_id.get(order_id, []):
+            line_indexes_by_session.setdefault(node[1], set()).update(self.line_indexes_by_root[self.find(node)])
+
+        chains = [(session, sorted(line_indexes)) for session, line_indexes in line_indexes_by_session.items()]
+        chains.sort(key=lambda chain: chain[1][0])
+
+        return [(session, [self.fix_lines[line_index] for line_index in line_indexes])
+                for session, line_indexes in chains]
+
+
+# The ids of the FIX line as union-find nodes, the OrigClOrdID being in the ClOrdID namespace
+def get_order_nodes(fix_tags: Dict[str, str]) -> List[OrderNode]:
+    nodes = []
+    session = None
+    for encoded_tag_id, namespace in ((ENCODED_CL_ORD_ID, FIX_TAG_ID_CL_ORD_ID),
+                                      (ENCODED_ORIG_CL_ORD_ID, FIX_TAG_ID_CL_ORD_ID),
+                                      (ENCODED_ORDER_ID, FIX_TAG_ID_ORDER_ID)):
+        order_id = fix_tags.get(encoded_tag_id)
+        if order_id is not None and order_id.upper() not in IGNORED_IDS:
+            if session is None:
+                session = get_session(fix_tags)
+            nodes.append((namespace, session, order_id))
+
+    return nodes
+
+
+def get_session(fix_tags: Dict[str, str]) -> Session:
+    sender_comp_id = fix_tags.get(ENCODED_SENDER_COMP_ID, '')
+    target_comp_id = fix_tags.get(ENCODED_TARGET_COMP_ID, '')
+
+    return (sender_comp_id, target_comp_id) if sender_comp_id <= target_comp_id else (target_comp_id, sender_comp_id)
+
+
+# One table per order chain of the id, along with the chain's session
+def create_tables_for_order_chains(fix_tag_dict, order_chain_index: OrderChainIndex, order_id: str,
+                                   grid_style: str = 'psql') -> List[Tuple[Session, str]]:
+    return [(session, create_table_from_parsed_fix_lines(fix_tag_dict, fix_lines, get_used_fix_tags(fix_lines),
+                                                         grid_style))
+            for session, fix_lines in order_chain_index.get_chains(order_id)]
+
+
+if __name__ == "__main__":
+    with open(sys.argv[1]) as fd:
+        fix_tag_dict_, fix_lines_, _, _ = extract_fix_lines_from_str_lines(fd.readlines())
+    order_chain_index_ = OrderChainIndex(fix_lines_)
+    for order_id_ in sys.argv[2:]:
+        for _, table_ in create_tables_for_order_chains(fix_tag_dict_, order_chain_index_, order_id_):
+            print(table_)
@@ -1,24 +1,126 @@
 #!/usr/bin/env python3
 import argparse
-import fileinput
-from typing import List
+import mmap
+import multiprocessing
+import os
+import sys
+import time
+from typing import List, Iterator, Tuple, Dict, Set
 
 import requests
 import tabulate
 
 from fixations.fix_utils import DEFAULT_FIX_VERSION, CFG_UPLOAD_URL, get_cfg_value, \
-    create_table_from_fix_lines
+    create_table_from_parsed_fix_lines, extract_fix_line_chunks_from_str_lines, \
+    iter_byte_lines, iter_str_lines_from_byte_lines, create_tag_set, \
+    determine_fix_version, extract_info_for_fix_version, iter_fix_lines_from_str_lines, \
+    extract_fix_lines_from_str_lines, get_used_fix_tags, HeaderState, get_comment_of_last_line
+from fixations.fix_filter import FixFilter, FixFilterError, create_fix_filter
+from fixations.fix_log_follower import FixLogFollower, FOLLOW_POLL_INTERVAL
+from fixations.fix_log_index import FixLogIndex
+from fixations.fix_order_chain import OrderChainIndex, create_tables_for_order_chains
 from fixations.webfix import FORM_FIX_LINES, FORM_UPLOAD
 
 tabulate.PRESERVE_WHITESPACE = True
 
+# with -j, each file is split in (up to) RANGES_PER_JOB byte ranges per job, of at least MIN_RANGE_SIZE bytes
+RANGES_PER_JOB = 4
+MIN_RANGE_SIZE = 1024 * 1024
 
-def extract_lines_from_files(files: List[str]) -> List[str]:
-    lines = []
-    for line in fileinput.input(files):
-        lines.append(line)
 
-    return lines
+# Only the FIX lines matching the criteria are read, thanks to the (incrementally updated) index of each file
+def iter_lines_from_indexed_files(files: List[str], msg_types: List[str], ids: List[str],
+                                  comp_ids: List[str]) -> Iterator[str]:
+    for file in files:
+        fix_log_index = FixLogIndex(file)
+        try:
+            fix_log_index.update()
+            yield from fix_log_index.iter_lines(msg_types, ids, comp_ids)
+        finally:
+            fix_log_index.close()
+
+
+def iter_lines_from_files(files: List[str], fix_filter: FixFilter = None) -> Iterator[str]:
+    for file in files if files else ['-']:
+        yield from iter_lines_from_file(file, fix_filter)
+
+
+# The file is mmap'ed (or read line by line when it can't be) so that only its FIX lines (that might match the filter)
+# get decoded
+def iter_lines_from_file(file: str, fix_filter: FixFilter = None) -> Iterator[str]:
+    if file == '-':
+        yield from iter_str_lines_from_byte_lines(sys.stdin.buffer, fix_filter=fix_filter)
+        return
+
+    with open(file, 'rb') as fd:
+        try:
+            data = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # empty file or not a regular file such as a pipe
+            yield from iter_str_lines_from_byte_lines(fd, fix_filter=fix_filter)
+            return
+
+        with data:
+            yield from iter_str_lines_from_byte_lines(iter_byte_lines(data), fix_filter=fix_filter)
+
+
+# Parse the files with a pool of jobs processes, each one parsing a newline-aligned byte range of a file at a time.
+# The FIX version (and its info) is determined upfront from the first lines, i.e. before the pool forks, and the
+# comment carried over to the first line of each range is taken from the line preceding it.
+def extract_fix_lines_from_files_in_parallel(files: List[str], jobs: int, fix_filter: FixFilter = None):
+    version = determine_fix_version(iter_lines_from_files(files, fix_filter))
+    if not version:
+        return {}, [], {}, None
+    fix_version_info = extract_info_for_fix_version(version)
+
+    tasks = []
+    previous_line_comment = ''
+    for file in files:
+        with open(file, 'rb') as fd:
+            if os.fstat(fd.fileno()).st_size == 0:
+                continue
+            with mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for start, end in split_into_byte_ranges(data, jobs * RANGES_PER_JOB):
+                    if start > 0:
+                        previous_line_comment = get_comment_of_last_line(data, end=start)
+                    tasks.append((file, start, end, version, previous_line_comment, fix_filter))
+                previous_line_comment = get_comment_of_last_line(data, previous_line_comment)
+
+    fix_lines = []
+    used_fix_tags = {}
+    with multiprocessing.Pool(jobs) as pool:
+        for range_fix_lines, range_used_fix_tags in pool.imap(parse_fix_lines_in_byte_range, tasks):
+            fix_lines.extend(range_fix_lines)
+            used_fix_tags.update(range_used_fix_tags)
+
+    return fix_version_info.fix_tags_by_tag_id, fix_lines, used_fix_tags, version
+
+
+def split_into_byte_ranges(data: mmap.mmap, range_count: int) -> List[Tuple[int, int]]:
+    range_size = max(len(data) // range_count, MIN_RANGE_SIZE)
+    byte_ranges = []
+    start = 0
+    while start < len(data):
+        end = data.find(b'\n', start + range_size) + 1
+        if end <= 0:
+            end = len(data)
+        byte_ranges.append((start, end))
+        start = end
+
+    return byte_ranges
+
+
+# Run by the pool's processes
+def parse_fix_lines_in_byte_range(task: Tuple[str, int, int, str, str, FixFilter]) -> \
+        Tuple[List[Tuple[str, Dict[str, str], str]], Dict[str, int]]:
+    file, start, end, version, previous_line_comment, fix_filter = task
+    fix_version_info = extract_info_for_fix_version(version)
+    with open(file, 'rb') as fd, mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        lines = iter_str_lines_from_byte_lines(iter_byte_lines(data, start, end), fix_filter=fix_filter,
+                                               previous_line_has_comment=bool(previous_line_comment))
+        fix_lines = list(iter_fix_lines_from_str_lines(lines, fix_version_info, previous_line_comment, fix_filter))
+
+    return fix_lines, get_used_fix_tags(fix_lines)
 
 
 def upload_lines(lines: List[str]) -> None:
@@ -31,12 +133,59 @@ def upload_lines(lines: List[str]) -> None:
         response = None
     assert response and response.status_code == 200, f"The URL:{upload_url} can't be reached!"
 
-    response = requests.get(upload_url, params={FORM_UPLOAD: True, FORM_FIX_LINES: ''.join(lines)})
+    response = requests.get(upload_url, params={FORM_UPLOAD: True, FORM_FIX_LINES: '\n'.join(lines)})
 
     if response.status_code == 200:
         print(response.text)
 
 
+def print_tables_by_chunk(lines: Iterator[str], chunk_size: int, grid_style: str,
+                          fix_filter: FixFilter = None) -> None:
+    # the lines are read, parsed and displayed as they come, chunk_size FIX lines per table, the times of each table
+    # carrying on from the previous one's
+    found_fix_lines = False
+    header_state = HeaderState()
+    for fix_tag_dict, fix_lines, used_fix_tags, _ in \
+            extract_fix_line_chunks_from_str_lines(lines, chunk_size, fix_filter):
+        print(create_table_from_parsed_fix_lines(fix_tag_dict, fix_lines, used_fix_tags, grid_style, header_state),
+              flush=True)
+        found_fix_lines = True
+
+    if not found_fix_lines:
+        print("Could not find FIX lines.")
+        exit(1)
+
+
+def print_order_chains(fix_tag_dict, fix_lines, order_ids: Set[str], grid_style: str) -> None:
+    order_chain_index = OrderChainIndex(fix_lines)
+    for order_id in sorted(order_ids):
+        tables = create_tables_for_order_chains(fix_tag_dict, order_chain_index, order_id, grid_style)
+        if not tables:
+            print(f"Order chain of id:{order_id}")
+            print("Could not find FIX lines for this id.")
+        for (comp_id, other_comp_id), table in tables:
+            print(f"Order chain of id:{order_id} between {comp_id} and {other_comp_id}")
+            print(table)
+
+
+# Like tail -F: keep parsing the FIX lines appended to the file, even once rotated, and display them as they come
+def follow_file(file: str, chunk_size: int, grid_style: str, fix_filter: FixFilter = None) -> None:
+    fix_log_follower = FixLogFollower(file, fix_filter)
+    try:
+        while True:
+            fix_lines = fix_log_follower.read_new_fix_lines()
+            if not fix_lines:
+                time.sleep(FOLLOW_POLL_INTERVAL)
+                continue
+            table_size = chunk_size if chunk_size > 0 else len(fix_lines)
+            for start in range(0, len(fix_lines), table_size):
+                print(fix_log_follower.create_table(fix_lines[start:start + table_size], grid_style), flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fix_log_follower.close()
+
+
 def parse_args():
     ap = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     ap.add_argument('-f', '--fix_version', type=str, nargs='?', const=1, default=DEFAULT_FIX_VERSION,
@@ -45,23 +194,92 @@ def parse_args():
                     help="Grid/Tabulate grid style.\n"
                          "See 'Table format' section in https://github.com/astanin/python-tabulate")
     ap.add_argument('-u', '--upload', action='store_true', help="Upload data to webfix")
+    ap.add_argument('-c', '--chunk_size', type=int, default=0,
+                    help="Stream the lines and display them in tables of (up to) CHUNK_SIZE FIX lines each "
+                         "so that memory usage is bounded on huge logs. 0 means a single table")
+    ap.add_argument('-x', '--index', action='store_true',
+                    help="Use (and build or update) an index of each file's FIX lines to only read the ones matching "
+                         "the --msg_types, --ids and --comp_ids options")
+    ap.add_argument('--msg_types', type=str, help="Space-separated msg types (35) to look for with -x")
+    ap.add_argument('--ids', type=str, help="Space-separated ClOrdIDs (11) / OrderIDs (37) to look for with -x")
+    ap.add_argument('--comp_ids', type=str,
+                    help="Space-separated SenderCompIDs (49) / TargetCompIDs (56) to look for with -x")
+    ap.add_argument('-q', '--query', type=str,
+                    help="Only show the FIX lines matching this filter expression, "
+                         "e.g. \"35 in (D,8,F) and 55=IBM and 11~^ABC and time >= 10:52:25\"")
+    ap.add_argument('-o', '--order_ids', type=str,
+                    help="Space-separated ClOrdIDs (11/41) / OrderIDs (37) to show the whole order chain of, "
+                         "i.e. the new order, its replaces, cancels and execution reports")
+    ap.add_argument('-F', '--follow', action='store_true',
+                    help="Like tail -F, keep displaying the FIX lines appended to the file, even if it's rotated")
+    ap.add_argument('-j', '--jobs', type=int, default=1,
+                    help="Number of processes parsing the files in parallel. 0 means one per CPU")
     ap.add_argument('fix_files', nargs='*')
 
-    return ap.parse_args()
+    cli_args = ap.parse_args()
+    if cli_args.chunk_size and (cli_args.upload or cli_args.order_ids):
+        ap.error("the -u and -o options require all the lines and can't be used with -c")
+    if cli_args.index and not cli_args.fix_files:
+        ap.error("the -x option requires files")
+    if cli_args.follow:
+        if len(cli_args.fix_files) != 1 or cli_args.fix_files[0] == '-':
+            ap.error("the -F option requires one file")
+        if cli_args.index or cli_args.upload or cli_args.order_ids or cli_args.jobs != 1:
+            ap.error("the -F option can't be used with -x, -u, -o or -j")
+    if cli_args.jobs != 1:
+        if not cli_args.fix_files or '-' in cli_args.fix_files:
+            ap.error("the -j option requires files")
+        if cli_args.index or cli_args.chunk_size or cli_args.upload:
+            ap.error("the -j option can't be used with -x, -c or -u")
+        if cli_args.jobs <= 0:
+            cli_args.jobs = os.cpu_count()
+    try:
+        cli_args.fix_filter = create_fix_filter(cli_args.query)
+    except FixFilterError as e:
+        ap.error(str(e))
+
+    return cli_args
 
 
 def main():
     cli_args = parse_args()
     files_to_parse = cli_args.fix_files
+    fix_filter = cli_args.fix_filter
+
+    if cli_args.follow:
+        follow_file(files_to_parse[0], cli_args.chunk_size, cli_args.grid_style, fix_filter)
+        return
 
-    lines_from_files = extract_lines_from_files(files_to_parse)
-    table = create_table_from_fix_lines(lines_from_files, cli_args.grid_style)
-    if not table:
+    lines_from_files = []
+    if cli_args.jobs > 1:
+        fix_tag_dict, fix_lines, used_fix_tags, _ = extract_fix_lines_from_files_in_parallel(files_to_parse,
+                                                                                            cli_args.jobs, fix_filter)
+    else:
+        if cli_args.index:
+            lines = iter_lines_from_indexed_files(files_to_parse, create_tag_set(cli_args.msg_types),
+                                                  create_tag_set(cli_args.ids), create_tag_set(cli_args.comp_ids))
+        else:
+            lines = iter_lines_from_files(files_to_parse, fix_filter)
+
+        if cli_args.chunk_size > 0:
+            print_tables_by_chunk(lines, cli_args.chunk_size, cli_args.grid_style, fix_filter)
+            return
+
+        lines_from_files = list(lines)
+        fix_tag_dict, fix_lines, used_fix_tags, _ = extract_fix_lines_from_str_lines(lines_from_files, fix_filter)
+
+    if len(used_fix_tags) == 0:
         print("Could not find FIX lines.")
         exit(1)
-    print(table)
+
+    if cli_args.order_ids:
+        print_order_chains(fix_tag_dict, fix_lines, create_tag_set(cli_args.order_ids), cli_args.grid_style)
+    else:
+        print(create_table_from_parsed_fix_lines(fix_tag_dict, fix_lines, used_fix_tags, cli_args.grid_style))
 
     if cli_args.upload:
+        if fix_filter:
+            lines_from_files = [line for line in lines_from_files if fix_filter.matches(line)]
         upload_lines(lines_from_files)
 
 
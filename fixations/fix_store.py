@@ -1,57 +1,574 @@
+import hashlib
+import os
+import queue
 import sqlite3
 import sys
-from datetime import datetime
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 from sqlite3 import Error
+from typing import Iterable, Tuple, List, Union, Callable
 
-from fixations.fix_utils import get_store_path
-from fixations.short_str_id import get_short_str_id
+from fixations.fix_utils import get_store_path, get_cfg_for_key, CFG_FILE_KEY_STORE_MAX_AGE_DAYS, \
+    CFG_FILE_KEY_STORE_MAX_SIZE_MB
+from fixations.short_str_id import get_short_str_id, convert_md5_str_into_short_str_id
 
+# used when the store's db can't be created: shared by all the threads (of the process) like a file db would be
+IN_MEMORY_STORE_PATH = 'file:fixations_store?mode=memory&cache=shared'
+# how long (in seconds) a connection waits for another one's write transaction to be over
+BUSY_TIMEOUT = 10
+# with group commit, the saves queued while the writer thread was committing the previous ones are all committed
+# in one transaction, up to GROUP_COMMIT_MAX_SIZE of them
+GROUP_COMMIT_MAX_SIZE = 256
+# serializes the start of the writer thread
+STORE_LOCK = threading.Lock()
 
+# 1: the lines as TEXT in the str_id_to_lines table
+# 2: the lines as compressed, content-addressed blobs with the short str_ids as aliases
+# 3: the aliases' last access time and the incremental auto-vacuum
+STORE_FORMAT_VERSION = 3
+SHORT_STR_ID_LENGTH = 8
+ZLIB_LEVEL = 9
+MIGRATION_BATCH_SIZE = 1000
+# the last access time of an alias is only updated once it's that old so that most reads don't write anything
+LAST_ACCESS_UPDATE_INTERVAL = timedelta(hours=1)
+# the eviction deletes (up to) that many aliases per transaction so as not to hold the write lock for long
+EVICTION_BATCH_SIZE = 100
+# and the compaction gives back that many free pages to the file system per transaction
+COMPACTION_BATCH_SIZE = 1000
+# seconds between 2 runs of the eviction thread
+EVICTION_INTERVAL = 15 * 60
+# the eviction threads of all the processes using the db take turns through this lease: its holder renews it at each
+# run and another one only takes it over once it's expired, i.e. when the holder is gone
+EVICTION_LEASE_NAME = 'eviction'
+EVICTION_LEASE_INTERVAL_COUNT = 2
+# size (in bytes) above which the WAL file is truncated after a checkpoint
+JOURNAL_SIZE_LIMIT = 64 * 1024 * 1024
+SQLITE_AUTO_VACUUM_INCREMENTAL = 2
+
+
+# Preset dictionary for the zlib compression of FIX lines: the most common strings of FIX messages that even a
+# small blob can then refer to. It must never change once used: a new one requires a new codec.
+def create_fix_zdict() -> bytes:
+    fix_strings = ['8=FIX.4.2', '8=FIX.4.4', '8=FIXT.1.1', '1128=9', '35=0', '35=A', '35=D', '35=F', '35=G', '35=8',
+                   '35=9', '34=', '49=', '56=', '52=20', '60=20', '11=', '41=', '37=', '17=', '39=0', '39=1', '39=2',
+                   '39=4', '39=8', '150=0', '150=F', '150=4', '54=1', '54=2', '55=', '38=', '40=1', '40=2', '44=',
+                   '59=0', '14=', '151=', '6=', '31=', '32=', '1=', '21=1', '10=']
+    zdict = []
+    for separator in (' ', '^A', '\x01', '|'):
+        zdict.append(separator.join(fix_strings) + separator)
+
+    return ''.join(zdict).encode()
+
+
+CODEC_ZLIB_FIX_ZDICT_1 = 'zlib+fix_zdict_1'
+FIX_ZDICT_1 = create_fix_zdict()
+
+
+# What the eviction deletes: the aliases not accessed for more than max_age_days and then, as long as the store
+# is bigger than max_size_bytes, the least recently accessed ones. Once they don't have any alias, blobs are deleted.
+@dataclass
+class RetentionPolicy:
+    max_age_days: Union[float, None] = None
+    max_size_bytes: Union[int, None] = None
+
+    def is_enabled(self) -> bool:
+        return self.max_age_days is not None or self.max_size_bytes is not None
+
+
+# The lines are stored once per content, compressed, in blobs keyed by their sha256. The (short) str_ids are
+# aliases of these blobs.
+# Each thread uses its own sqlite3 connection and the db is in WAL mode so that reads don't block on writes (and
+# vice versa). Saves are single upserts and, with group_commit, the concurrent ones are amortised into one
+# transaction (i.e. one fsync) by a background writer thread while each caller still waits for its save to be
+# committed.
 class Store:
-    conn = None
-    curs = None
+    LEGACY_TABLE_NAME = 'str_id_to_lines'
+    BLOBS_TABLE_NAME = 'blobs'
+    ALIASES_TABLE_NAME = 'str_id_aliases'
+    LEASES_TABLE_NAME = 'leases'
+
+    def __init__(self, store_path, group_commit: bool = False) -> None:
+        self.store_path = store_path
+        self.group_commit = group_commit
+        self.uri = False
+        self.local = threading.local()
+        self.save_queue = None
+        self.writer_thread = None
+        self.writer_pid = None
+        self.eviction_thread = None
+        # identifies the holder of a lease: a forked process is another holder
+        self.lease_owner = uuid.uuid4().hex
+        # keeps the shared in-memory db alive, if used, as long as the store is
+        self.main_conn = self.connect()
+
+        # only effective for a new db (or after a VACUUM)
+        self.main_conn.execute(f'PRAGMA auto_vacuum={SQLITE_AUTO_VACUUM_INCREMENTAL}')
+        self.main_conn.execute('PRAGMA journal_mode=WAL')
+        # the blobs are keyed by the sha256 of their (uncompressed) lines so that identical lines are stored once
+        self.main_conn.execute(f'''CREATE TABLE IF NOT EXISTS {Store.BLOBS_TABLE_NAME} (
+         hash  TEXT NOT NULL PRIMARY KEY,
+         codec TEXT NOT NULL,
+         size  INTEGER NOT NULL,
+         data  BLOB NOT NULL);''')
+        self.main_conn.execute(f'''CREATE TABLE IF NOT EXISTS {Store.ALIASES_TABLE_NAME} (
+         str_id        TEXT NOT NULL PRIMARY KEY,
+         hash          TEXT NOT NULL,
+         timestamp     TEXT NOT NULL,
+         last_accessed TEXT NOT NULL DEFAULT '');''')
+        self.main_conn.execute(f'''CREATE TABLE IF NOT EXISTS {Store.LEASES_TABLE_NAME} (
+         name    TEXT NOT NULL PRIMARY KEY,
+         owner   TEXT NOT NULL,
+         expires TEXT NOT NULL);''')
+        self.main_conn.commit()
+        self.migrate()
+        self.main_conn.execute(f"CREATE INDEX IF NOT EXISTS hash_idx ON {Store.ALIASES_TABLE_NAME} (hash)")
+        self.main_conn.execute(f"CREATE INDEX IF NOT EXISTS last_accessed_idx ON {Store.ALIASES_TABLE_NAME} "
+                               f"(last_accessed)")
+        self.main_conn.commit()
+
+    # Migrate a store of a previous format, in place
+    #  . 1 -> 2: move the lines of the legacy table into blobs
+    #  . 2 -> 3: add the last_accessed column and switch to incremental auto-vacuum
+    def migrate(self) -> None:
+        conn = self.main_conn
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            format_version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if format_version >= STORE_FORMAT_VERSION:
+                conn.rollback()
+                return
+            migrated_row_count = 0
+            if format_version < 2:
+                migrated_row_count = self.migrate_legacy_table()
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({self.ALIASES_TABLE_NAME})")]
+            if 'last_accessed' not in columns:
+                conn.execute(f"ALTER TABLE {self.ALIASES_TABLE_NAME} ADD COLUMN last_accessed TEXT NOT NULL "
+                             f"DEFAULT ''")
+            conn.execute(f"UPDATE {self.ALIASES_TABLE_NAME} SET last_accessed = timestamp WHERE last_accessed = ''")
+            conn.execute(f"PRAGMA user_version = {STORE_FORMAT_VERSION}")
+            conn.commit()
+        except Error:
+            conn.rollback()
+            raise
+
+        if migrated_row_count or conn.execute('PRAGMA auto_vacuum').fetchone()[0] != SQLITE_AUTO_VACUUM_INCREMENTAL:
+            # give the space of the legacy table back to the file system and make the auto-vacuum effective
+            conn.execute('VACUUM')
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        if format_version or migrated_row_count:
+            print(f"Migrated store:{self.store_path} from format:{format_version} to format:{STORE_FORMAT_VERSION}"
+                  f"{f' ({migrated_row_count} rows)' if migrated_row_count else ''}")
+
+    def migrate_legacy_table(self) -> int:
+        conn = self.main_conn
+        legacy_table = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                    (self.LEGACY_TABLE_NAME,)).fetchone()
+        if not legacy_table:
+            return 0
+
+        migrated_row_count = 0
+        rows = conn.execute(f"SELECT str_id, lines, timestamp FROM {self.LEGACY_TABLE_NAME}")
+        while True:
+            batch = rows.fetchmany(MIGRATION_BATCH_SIZE)
+            if not batch:
+                break
+            for str_id, lines, timestamp in batch:
+                blob_hash = self.save_blob(conn, lines)
+                conn.execute(f"INSERT OR REPLACE INTO {self.ALIASES_TABLE_NAME} (str_id, hash, timestamp) "
+                             f"VALUES (?, ?, ?)", (str_id, blob_hash, timestamp))
+            migrated_row_count += len(batch)
+        conn.execute(f"DROP TABLE {self.LEGACY_TABLE_NAME}")
+
+        return migrated_row_count
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = self.connect()
 
-    TABLE_NAME = 'str_id_to_lines'
+        return conn
 
-    def __init__(self, store_path) -> None:
+    def connect(self) -> sqlite3.Connection:
         try:
-            self.conn = sqlite3.connect(store_path, check_same_thread=False)
+            conn = sqlite3.connect(self.store_path, timeout=BUSY_TIMEOUT, uri=self.uri)
         except Error as e:
-            print(f"ERROR: creating sqlite3 db with path:{store_path} with exception:{e}. Using in-memory db instead")
-            self.conn = sqlite3.connect(':memory:')
+            print(f"ERROR: creating sqlite3 db with path:{self.store_path} with exception:{e}. Using in-memory db instead")
+            self.store_path = IN_MEMORY_STORE_PATH
+            self.uri = True
+            conn = sqlite3.connect(self.store_path, timeout=BUSY_TIMEOUT, uri=self.uri)
 
-        self.curs = self.conn.cursor()
-        self.conn.row_factory = sqlite3.Row
+        # safe with WAL: a power loss can only lose the last transactions, not corrupt the db
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA journal_size_limit={JOURNAL_SIZE_LIMIT}')
+        conn.row_factory = sqlite3.Row
 
-        self.conn.execute(f'''CREATE TABLE IF NOT EXISTS {Store.TABLE_NAME} (
-         str_id    TEXT NOT NULL PRIMARY KEY,
-         lines TEXT NOT NULL,
-         timestamp TEXT NOT NULL);''')
+        return conn
 
+    # A sqlite3 connection must not be used across a fork(), e.g. when the store was created in the gunicorn
+    # master with preload_app, so each worker must call this before using the store
+    def reconnect(self) -> None:
+        self.local = threading.local()
+        self.main_conn = self.connect()
+        # the writer and eviction threads, if any, didn't survive the fork
+        self.save_queue = self.writer_thread = self.writer_pid = None
+        self.eviction_thread = None
+        self.lease_owner = uuid.uuid4().hex
+
+    # Save the lines under the given str_id, which becomes an alias of them if it already existed
     def save(self, str_id, lines):
-        now_timestamp = str(datetime.now())
-        if self.str_id_already_exists(str_id):
-            self.conn.execute(f"UPDATE {self.TABLE_NAME} SET lines=?, timestamp=? WHERE str_id = ?",
-                              (lines, now_timestamp, str_id))
+        if self.group_commit:
+            self.save_in_group_commit(str_id, lines)
         else:
-            self.conn.execute(f"INSERT INTO {self.TABLE_NAME} (str_id, lines, timestamp) VALUES (?, ?, ?)",
-                              (str_id, lines, now_timestamp))
-        self.conn.commit()
+            self.save_many([(str_id, lines)])
+
+    # Save the lines under a short str_id derived from them and return it
+    def save_lines(self, lines: str) -> str:
+        if self.group_commit:
+            return self.save_in_group_commit(None, lines)
+
+        return self.save_many([(None, lines)])[0]
+
+    # All the (str_id, lines) are saved in one transaction. A None str_id is derived from the lines: the first
+    # SHORT_STR_ID_LENGTH characters of their short str id, more of them if these collide with other lines'.
+    # Return the str_ids.
+    def save_many(self, str_ids_and_lines: Iterable[Tuple[Union[str, None], str]]) -> List[str]:
+        now_timestamp = str(datetime.now())
+        conn = self.conn
+        str_ids = []
+        with conn:
+            self.begin_write_transaction(conn)
+            for str_id, lines in str_ids_and_lines:
+                blob_hash = self.save_blob(conn, lines)
+                if str_id is None:
+                    str_id = self.get_free_str_id(conn, get_short_str_id(lines), blob_hash)
+                self.save_alias(conn, str_id, blob_hash, now_timestamp)
+                str_ids.append(str_id)
+
+        return str_ids
+
+    # Same as save_lines() but for lines that have already been compressed as they came. Return the str_id.
+    def save_compressed_lines(self, compressed_lines: 'CompressedLines') -> str:
+        blob_hash = compressed_lines.sha256.hexdigest()
+        conn = self.conn
+        with conn:
+            self.begin_write_transaction(conn)
+            self.insert_blob(conn, blob_hash, compressed_lines.size, compressed_lines.get_data)
+            str_id = self.get_free_str_id(conn, convert_md5_str_into_short_str_id(compressed_lines.md5.hexdigest()),
+                                          blob_hash)
+            self.save_alias(conn, str_id, blob_hash, str(datetime.now()))
+
+        return str_id
+
+    # The write lock is taken from the start so that what's read by the transaction, e.g. whether a blob is already
+    # stored, can't be changed by another one (e.g. an eviction) before it writes
+    @staticmethod
+    def begin_write_transaction(conn: sqlite3.Connection) -> None:
+        conn.execute('BEGIN IMMEDIATE')
+
+    def save_blob(self, conn: sqlite3.Connection, lines: str) -> str:
+        data = lines.encode()
+        blob_hash = hashlib.sha256(data).hexdigest()
+        self.insert_blob(conn, blob_hash, len(data), lambda: compress(data))
+
+        return blob_hash
+
+    # The data is only gotten, i.e. compressed, if these lines aren't stored yet
+    def insert_blob(self, conn: sqlite3.Connection, blob_hash: str, size: int, get_data: Callable[[], bytes]) -> None:
+        if not conn.execute(f"SELECT 1 FROM {self.BLOBS_TABLE_NAME} WHERE hash = ?", (blob_hash,)).fetchone():
+            conn.execute(f"INSERT INTO {self.BLOBS_TABLE_NAME} (hash, codec, size, data) VALUES (?, ?, ?, ?)",
+                         (blob_hash, CODEC_ZLIB_FIX_ZDICT_1, size, get_data()))
+
+    def save_alias(self, conn: sqlite3.Connection, str_id: str, blob_hash: str, now_timestamp: str) -> None:
+        conn.execute(f"INSERT INTO {self.ALIASES_TABLE_NAME} (str_id, hash, timestamp, last_accessed) "
+                     f"VALUES (?, ?, ?, ?) ON CONFLICT(str_id) DO UPDATE SET hash=excluded.hash, "
+                     f"timestamp=excluded.timestamp, last_accessed=excluded.last_accessed",
+                     (str_id, blob_hash, now_timestamp, now_timestamp))
+
+    # The full_str_id is the short str id of the lines
+    def get_free_str_id(self, conn: sqlite3.Connection, full_str_id: str, blob_hash: str) -> str:
+        for length in range(SHORT_STR_ID_LENGTH, len(full_str_id) + 1):
+            str_id = full_str_id[:length]
+            row = conn.execute(f"SELECT hash FROM {self.ALIASES_TABLE_NAME} WHERE str_id = ?", (str_id,)).fetchone()
+            if row is None or row[0] == blob_hash:
+                return str_id
+
+        # the whole md5 collides: fall back on the sha256
+        return blob_hash
+
+    def save_in_group_commit(self, str_id, lines) -> str:
+        if self.writer_pid != os.getpid():
+            self.start_writer_thread()
+
+        pending_save = PendingSave(str_id, lines)
+        self.save_queue.put(pending_save)
+        pending_save.done.wait()
+        if pending_save.error:
+            raise pending_save.error
+
+        return pending_save.str_id
+
+    def start_writer_thread(self) -> None:
+        with STORE_LOCK:
+            if self.writer_pid != os.getpid():
+                self.save_queue = queue.Queue()
+                self.writer_thread = threading.Thread(target=self.write_queued_saves, args=(self.save_queue,),
+                                                      name='store-writer', daemon=True)
+                self.writer_thread.start()
+                self.writer_pid = os.getpid()
+
+    # Run by the writer thread
+    def write_queued_saves(self, save_queue: queue.Queue) -> None:
+        while True:
+            pending_saves = [save_queue.get()]
+            try:
+                while len(pending_saves) < GROUP_COMMIT_MAX_SIZE:
+                    pending_saves.append(save_queue.get_nowait())
+            except queue.Empty:
+                pass
+            # queued by close(), after all the saves
+            stopping = pending_saves[-1] is None
+            if stopping:
+                pending_saves.pop()
+
+            # any error goes to the callers, which must always be released, and the thread keeps on writing
+            try:
+                str_ids = self.save_many((pending_save.str_id, pending_save.lines) for pending_save in pending_saves)
+                for pending_save, str_id in zip(pending_saves, str_ids):
+                    pending_save.str_id = str_id
+            except Exception as e:
+                for pending_save in pending_saves:
+                    pending_save.error = e
+            finally:
+                for pending_save in pending_saves:
+                    pending_save.done.set()
+            if stopping:
+                self.conn.close()
+                return
+
+    # Stop the writer thread once it has written the saves queued so far and close the connections of this thread
+    def close(self) -> None:
+        if self.writer_pid == os.getpid():
+            self.save_queue.put(None)
+            self.writer_thread.join()
+            self.save_queue = self.writer_thread = self.writer_pid = None
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+        self.main_conn.close()
 
     def get(self, str_id):
-        self.curs.execute(f"SELECT lines, timestamp FROM {self.TABLE_NAME} WHERE str_id = ?", (str_id,))
-        rows = self.curs.fetchall()
-        if len(rows) == 1:
-            return rows[0]
+        row = self.conn.execute(f"SELECT b.codec, b.data, a.timestamp, a.last_accessed "
+                                f"FROM {self.ALIASES_TABLE_NAME} a JOIN {self.BLOBS_TABLE_NAME} b ON b.hash = a.hash "
+                                f"WHERE a.str_id = ?", (str_id,)).fetchone()
+        if row:
+            codec, data, timestamp, last_accessed = row
+            self.update_last_accessed(str_id, last_accessed)
+            return decompress(data, codec).decode(), timestamp
         else:
             print(f"ERROR: not data found for str_id:{str_id}")
             return None, None
 
+    # Hash of the lines of the str_id, None if there's no such str_id. It changes whenever the str_id is saved with
+    # other lines so that it can be used to key what's derived from the lines.
+    def get_hash(self, str_id) -> Union[str, None]:
+        row = self.conn.execute(f"SELECT hash, last_accessed FROM {self.ALIASES_TABLE_NAME} WHERE str_id = ?",
+                                (str_id,)).fetchone()
+        if row is None:
+            return None
+        blob_hash, last_accessed = row
+        self.update_last_accessed(str_id, last_accessed)
+
+        return blob_hash
+
+    def update_last_accessed(self, str_id, last_accessed: str) -> None:
+        now = datetime.now()
+        if last_accessed < str(now - LAST_ACCESS_UPDATE_INTERVAL):
+            with self.conn:
+                self.conn.execute(f"UPDATE {self.ALIASES_TABLE_NAME} SET last_accessed = ? WHERE str_id = ?",
+                                  (str(now), str_id))
+
     def str_id_already_exists(self, str_id):
-        self.curs.execute(f"SELECT str_id FROM {self.TABLE_NAME} WHERE str_id = ?", (str_id,))
-        rows = self.curs.fetchall()
+        row = self.conn.execute(f"SELECT 1 FROM {self.ALIASES_TABLE_NAME} WHERE str_id = ?", (str_id,)).fetchone()
+
+        return row is not None
+
+    # Bytes used by the store's data, i.e. without its free pages
+    def get_used_size(self) -> int:
+        page_count = self.conn.execute('PRAGMA page_count').fetchone()[0]
+        freelist_count = self.conn.execute('PRAGMA freelist_count').fetchone()[0]
+        page_size = self.conn.execute('PRAGMA page_size').fetchone()[0]
+
+        return (page_count - freelist_count) * page_size
+
+    # Delete what the retention policy doesn't keep, EVICTION_BATCH_SIZE aliases per transaction, and return the
+    # number of deleted aliases
+    def evict(self, retention_policy: RetentionPolicy) -> int:
+        evicted_count = 0
+        if retention_policy.max_age_days is not None:
+            cutoff = str(datetime.now() - timedelta(days=retention_policy.max_age_days))
+            while True:
+                batch_count = self.delete_least_recently_accessed(cutoff)
+                evicted_count += batch_count
+                if batch_count < EVICTION_BATCH_SIZE:
+                    break
+
+        if retention_policy.max_size_bytes is not None:
+            while True:
+                excess_size = self.get_used_size() - retention_policy.max_size_bytes
+                if excess_size <= 0:
+                    break
+                batch_count = self.delete_least_recently_accessed(size_to_free=excess_size)
+                evicted_count += batch_count
+                if batch_count == 0:
+                    break
+
+        return evicted_count
+
+    # Delete (up to) EVICTION_BATCH_SIZE of the least recently accessed aliases, along with their blobs unless other
+    # aliases still use them:
+    #  . only those accessed before the cutoff, if any
+    #  . only as many as needed for their blobs to add up to size_to_free, if any
+    def delete_least_recently_accessed(self, cutoff: str = None, size_to_free: int = None) -> int:
+        where = "WHERE a.last_accessed < ?" if cutoff else ''
+        params = (cutoff,) if cutoff else ()
+        with self.conn as conn:
+            self.begin_write_transaction(conn)
+            rows = conn.execute(f"SELECT a.str_id, a.hash, length(b.data) FROM {self.ALIASES_TABLE_NAME} a "
+                                f"JOIN {self.BLOBS_TABLE_NAME} b ON b.hash = a.hash {where} "
+                                f"ORDER BY a.last_accessed LIMIT {EVICTION_BATCH_SIZE}", params).fetchall()
+            if size_to_free is not None:
+                for row_count, (_, _, blob_size) in enumerate(rows, 1):
+                    size_to_free -= blob_size
+                    if size_to_free <= 0:
+                        rows = rows[:row_count]
+                        break
+            conn.executemany(f"DELETE FROM {self.ALIASES_TABLE_NAME} WHERE str_id = ?",
+                             ((str_id,) for str_id, _, _ in rows))
+            conn.executemany(f"DELETE FROM {self.BLOBS_TABLE_NAME} WHERE hash = ? AND NOT EXISTS "
+                             f"(SELECT 1 FROM {self.ALIASES_TABLE_NAME} WHERE hash = ?)",
+                             ((blob_hash, blob_hash) for blob_hash in set(blob_hash for _, blob_hash, _ in rows)))
+
+        return len(rows)
+
+    # Give the free pages back to the file system, COMPACTION_BATCH_SIZE of them per transaction, and return how many
+    def compact(self) -> int:
+        conn = self.conn
+        compacted_page_count = 0
+        while True:
+            freelist_count = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if freelist_count == 0:
+                break
+            conn.execute(f'PRAGMA incremental_vacuum({COMPACTION_BATCH_SIZE})').fetchall()
+            compacted_page_count += min(freelist_count, COMPACTION_BATCH_SIZE)
+        # doesn't wait for the readers: the WAL file is truncated (down to JOURNAL_SIZE_LIMIT) once it's all copied
+        conn.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchall()
+
+        return compacted_page_count
+
+    # Take (or renew) the lease for duration seconds unless another owner holds it. Return whether it's taken
+    def take_lease(self, name: str, duration: float) -> bool:
+        now = datetime.now()
+        with self.conn as conn:
+            self.begin_write_transaction(conn)
+            row = conn.execute(f"SELECT owner, expires FROM {self.LEASES_TABLE_NAME} WHERE name = ?",
+                               (name,)).fetchone()
+            if row is not None and row[0] != self.lease_owner and row[1] > str(now):
+                return False
+            conn.execute(f"INSERT INTO {self.LEASES_TABLE_NAME} (name, owner, expires) VALUES (?, ?, ?) "
+                         f"ON CONFLICT(name) DO UPDATE SET owner=excluded.owner, expires=excluded.expires",
+                         (name, self.lease_owner, str(now + timedelta(seconds=duration))))
+
+        return True
+
+    # Meant to be called explicitly by the process(es) serving the store, never as a side effect of an import
+    def start_eviction_thread(self, retention_policy: RetentionPolicy, interval: float = EVICTION_INTERVAL) -> None:
+        self.eviction_thread = threading.Thread(target=self.evict_periodically, args=(retention_policy, interval),
+                                                name='store-eviction', daemon=True)
+        self.eviction_thread.start()
+
+    # Run by the eviction thread
+    def evict_periodically(self, retention_policy: RetentionPolicy, interval: float) -> None:
+        while True:
+            try:
+                if self.take_lease(EVICTION_LEASE_NAME, interval * EVICTION_LEASE_INTERVAL_COUNT):
+                    self.evict_and_compact(retention_policy)
+            except Exception as e:
+                # whatever goes wrong, the thread keeps going: it's retried at the next interval
+                print(f"ERROR: evicting from store:{self.store_path} with exception:{e!r}")
+            time.sleep(interval)
+
+    def evict_and_compact(self, retention_policy: RetentionPolicy) -> None:
+        evicted_count = self.evict(retention_policy)
+        compacted_page_count = self.compact()
+        if evicted_count or compacted_page_count:
+            print(f"Evicted {evicted_count} ids from store:{self.store_path} and gave back "
+                  f"{compacted_page_count} pages")
+
+
+class PendingSave:
+    def __init__(self, str_id, lines) -> None:
+        self.str_id = str_id
+        self.lines = lines
+        self.done = threading.Event()
+        self.error = None
+
+
+# Lines hashed and compressed as they're added, e.g. as they're received, so that only their compressed form is held
+# in memory. The lines are joined by \n like the lines passed to Store.save_lines().
+class CompressedLines:
+    def __init__(self) -> None:
+        self.sha256 = hashlib.sha256()
+        self.md5 = hashlib.md5()
+        self.compressor = zlib.compressobj(ZLIB_LEVEL, zdict=FIX_ZDICT_1)
+        self.compressed_chunks: List[bytes] = []
+        self.size = 0
+        self.line_count = 0
+        self.data = None
+
+    def add_line(self, line: str) -> None:
+        data = line.encode() if self.line_count == 0 else b'\n' + line.encode()
+        self.line_count += 1
+        self.size += len(data)
+        self.sha256.update(data)
+        self.md5.update(data)
+        self.compressed_chunks.append(self.compressor.compress(data))
+
+    # no line can be added once the data has been gotten
+    def get_data(self) -> bytes:
+        if self.data is None:
+            self.compressed_chunks.append(self.compressor.flush())
+            self.data = b''.join(self.compressed_chunks)
+            self.compressed_chunks = []
+
+        return self.data
+
+
+def get_retention_policy() -> RetentionPolicy:
+    max_age_days = get_cfg_for_key(CFG_FILE_KEY_STORE_MAX_AGE_DAYS, None)
+    max_size_mb = get_cfg_for_key(CFG_FILE_KEY_STORE_MAX_SIZE_MB, None)
+
+    return RetentionPolicy(float(max_age_days) if max_age_days else None,
+                           int(float(max_size_mb) * 1024 * 1024) if max_size_mb else None)
+
+
+def compress(data: bytes) -> bytes:
+    compressor = zlib.compressobj(ZLIB_LEVEL, zdict=FIX_ZDICT_1)
+
+    return compressor.compress(data) + compressor.flush()
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec != CODEC_ZLIB_FIX_ZDICT_1:
+        raise ValueError(f"Unknown codec:{codec}")
+    decompressor = zlib.decompressobj(zdict=FIX_ZDICT_1)
 
-        return len(rows) == 1
+    return decompressor.decompress(data) + decompressor.flush()
 
 
 def commit(self) -> None:
@@ -61,7 +578,6 @@ def commit(self) -> None:
 if __name__ == "__main__":
     store = Store(get_store_path())
     str_to_encode = sys.argv[1] if len(sys.argv) > 1 else 'A quick brown fox\njumps over the\nlazy dog'
-    str_id_ = get_short_str_id(str_to_encode, length=8)
-    store.save(str_id_, str_to_encode)
+    str_id_ = store.save_lines(str_to_encode)
     lines_, timestamp = store.get(str_id_)
     print(f"str_id:{str_id_} lines:{lines_} timestamp:{timestamp}")
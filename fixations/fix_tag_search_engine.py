@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# Ranked search of the FIX tags of several FIX versions at once, e.g. for fix_tags, fix_explore and webfix's /search.
+# A tag matches a query, from the best to the worst rank, by:
+#  . its exact id
+#  . its name, starting with or containing the query
+#  . the name of one of its enum values
+#  . its description
+#  . a name or an enum value name similar to the query, i.e. a typo of it: they share enough of their trigrams
+# Within a rank, the closest matches come first: the ones whose matched text is mostly the query, or the most similar.
+# The names and enum value names are compared without their case, spaces and punctuation, e.g. "new order" matches
+# NewOrderSingle and NEW_ORDER, the descriptions without their case only.
+#
+# The index is built once for all the versions: a tag is mostly the same from one version to the next, so each
+# distinct text (name, enum value name, description) is stored once along with the tags it belongs to and the bitmap
+# of the versions they come from. The texts of each kind are lowercased and joined into one string that str.find()
+# scans for the query, which is much faster than checking each text in turn.
+import re
+import sys
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Tuple, Union, Iterator, Callable, Set
+
+from fixations.fix_utils import FixTag, extract_info_for_fix_version, get_list_of_available_fix_versions
+
+RANK_ID = 0
+RANK_NAME_PREFIX = 1
+RANK_NAME = 2
+RANK_ENUM_NAME = 3
+RANK_DESCRIPTION = 4
+RANK_SIMILAR = 5
+RANK_NAMES = ['id', 'name prefix', 'name', 'enum name', 'description', 'similar']
+
+NGRAM_SIZE = 3
+MIN_SIMILARITY = 0.3
+DEFAULT_LIMIT = 50
+TEXT_SEPARATOR = '\x00'
+NON_ALPHANUMERIC_PATTERN = re.compile(r'[^0-9a-z]+')
+
+
+@dataclass
+class FixTagSearchResult:
+    fix_tag_id: str
+    name: str
+    rank: int
+    # the share of the matched text that's the query, or the similarity for a similar one
+    score: float
+    # e.g. the name, or the "value: name" of the matched enum value
+    match: str
+    fix_versions: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        return {'fix_tag_id': self.fix_tag_id, 'name': self.name, 'rank': RANK_NAMES[self.rank],
+                'score': round(self.score, 3), 'match': self.match, 'fix_versions': self.fix_versions}
+
+
+# Distinct texts of a kind, each with the (tag id, tag order, match, version mask) of the tags it comes from, where the
+# tag order is the position of the tag id among the sorted ones and the version mask the bitmap of their versions
+class SearchedTexts:
+    def __init__(self, normalize: Callable[[str], str]) -> None:
+        self.normalize = normalize
+        self.texts: List[str] = []
+        # (tag id, match) -> version mask, until frozen into the refs
+        self.version_masks_by_tag_match: List[Dict[Tuple[str, str], int]] = []
+        self.refs: List[Tuple[Tuple[str, int, str, int], ...]] = []
+        self.text_indexes_by_text: Dict[str, int] = {}
+        self.joined_texts = ''
+        self.text_starts: List[int] = []
+        self.sorted_texts: List[str] = []
+        self.sorted_text_indexes: List[int] = []
+
+    def add(self, text: str, fix_tag_id: str, match: str, version_mask: int) -> None:
+        text = self.normalize(text)
+        text_index = self.text_indexes_by_text.get(text)
+        if text_index is None:
+            text_index = self.text_indexes_by_text[text] = len(self.texts)
+            self.texts.append(text)
+            self.version_masks_by_tag_match.append({})
+        version_masks = self.version_masks_by_tag_match[text_index]
+        version_masks[(fix_tag_id, match)] = version_masks.get((fix_tag_id, match), 0) | version_mask
+
+    # The texts are ordered by the smallest tag id they belong to, so that the scan finds them in roughly tag id order
+    def freeze(self, tag_orders_by_tag_id: Dict[str, int]) -> None:
+        refs = [tuple(sorted((fix_tag_id, tag_orders_by_tag_id[fix_tag_id], match, version_mask)
+                             for (fix_tag_id, match), version_mask in version_masks.items()))
+                for version_masks in self.version_masks_by_tag_match]
+        order = sorted(range(len(self.texts)), key=lambda text_index: min(ref[1] for ref in refs[text_index]))
+        self.texts = [self.texts[i] for i in order]
+        self.refs = [refs[i] for i in order]
+        self.version_masks_by_tag_match = []
+        self.text_indexes_by_text = {text: text_index for text_index, text in enumerate(self.texts)}
+
+        self.joined_texts = TEXT_SEPARATOR.join(self.texts)
+        self.text_starts = []
+        text_start = 0
+        for text in self.texts:
+            self.text_starts.append(text_start)
+            text_start += len(text) + 1
+        self.sorted_text_indexes = sorted(range(len(self.texts)), key=lambda text_index: self.texts[text_index])
+        self.sorted_texts = [self.texts[text_index] for text_index in self.sorted_text_indexes]
+
+    # The (index, offset of the query) of each text containing the query, which can't contain TEXT_SEPARATOR
+    def find(self, query: str) -> Iterator[Tuple[int, int]]:
+        joined_texts, text_starts = self.joined_texts, self.text_starts
+        text_count = len(text_starts)
+        position = joined_texts.find(query)
+        while position != -1:
+            text_index = bisect_right(text_starts, position) - 1
+            yield text_index, position - text_starts[text_index]
+            if text_index + 1 == text_count:
+                break
+            position = joined_texts.find(query, text_starts[text_index + 1])
+
+    def find_prefix(self, query: str) -> Iterator[int]:
+        start = bisect_left(self.sorted_texts, query)
+        end = bisect_left(self.sorted_texts, query + '\uffff', start)
+        return iter(self.sorted_text_indexes[start:end])
+
+
+class FixTagSearchEngine:
+    def __init__(self, fix_tag_dicts_by_version: Dict[str, Dict[str, FixTag]]) -> None:
+        self.fix_versions = list(fix_tag_dicts_by_version)
+        self.version_masks_by_version = {fix_version: 1 << bit for bit, fix_version in enumerate(self.fix_versions)}
+        self.all_versions_mask = (1 << len(self.fix_versions)) - 1
+
+        self.version_masks_by_tag_id: Dict[str, int] = {}
+        # (name, version mask) per tag, the names of the newest versions last
+        self.names_by_tag_id: Dict[str, List[Tuple[str, int]]] = {}
+        self.names = SearchedTexts(normalize_name)
+        self.enum_names = SearchedTexts(normalize_name)
+        self.descriptions = SearchedTexts(normalize_description)
+        for fix_version, fix_tag_dict in fix_tag_dicts_by_version.items():
+            version_mask = self.version_masks_by_version[fix_version]
+            for fix_tag_id, fix_tag in fix_tag_dict.items():
+                version_masks_by_tag_id = self.version_masks_by_tag_id
+                version_masks_by_tag_id[fix_tag_id] = version_masks_by_tag_id.get(fix_tag_id, 0) | version_mask
+                names = self.names_by_tag_id.setdefault(fix_tag_id, [])
+                if names and names[-1][0] == fix_tag.name:
+                    names[-1] = (fix_tag.name, names[-1][1] | version_mask)
+                else:
+                    names.append((fix_tag.name, version_mask))
+                self.names.add(fix_tag.name, fix_tag_id, fix_tag.name, version_mask)
+                self.descriptions.add(fix_tag.desc, fix_tag_id, fix_tag.desc, version_mask)
+                for fix_tag_value in fix_tag.values.values():
+                    self.enum_names.add(fix_tag_value.name, fix_tag_id, f"{fix_tag_value.value}: {fix_tag_value.name}",
+                                        version_mask)
+
+        self.sorted_tag_ids = sorted(self.version_masks_by_tag_id, key=get_tag_id_sort_key)
+        self.tag_orders_by_tag_id = {fix_tag_id: tag_order for tag_order, fix_tag_id in enumerate(self.sorted_tag_ids)}
+        for searched_texts in (self.names, self.enum_names, self.descriptions):
+            searched_texts.freeze(self.tag_orders_by_tag_id)
+
+        self.similar_texts: List[Tuple[SearchedTexts, int]] = []
+        self.similar_ngram_counts: List[int] = []
+        self.similar_text_indexes_by_ngram: Dict[str, List[int]] = {}
+        for searched_texts in (self.names, self.enum_names):
+            for text_index, text in enumerate(searched_texts.texts):
+                ngrams = get_padded_ngrams(text)
+                similar_text_index = len(self.similar_texts)
+                self.similar_texts.append((searched_texts, text_index))
+                self.similar_ngram_counts.append(len(ngrams))
+                for ngram in ngrams:
+                    self.similar_text_indexes_by_ngram.setdefault(ngram, []).append(similar_text_index)
+
+    def get_version_mask(self, fix_versions: Union[None, List[str]]) -> int:
+        if fix_versions is None:
+            return self.all_versions_mask
+
+        version_mask = 0
+        for fix_version in fix_versions:
+            version_mask |= self.version_masks_by_version.get(fix_version, 0)
+
+        return version_mask
+
+    def get_versions(self, version_mask: int) -> List[str]:
+        return [fix_version for fix_version in self.fix_versions
+                if version_mask & self.version_masks_by_version[fix_version]]
+
+    # The best match of each tag, the best first. Only the tags of the fix_versions, if any, are searched
+    def search(self, query: str, fix_versions: Union[None, List[str]] = None,
+               limit: Union[int, None] = DEFAULT_LIMIT) -> List[FixTagSearchResult]:
+        fix_tag_id = query.strip()
+        name_query = normalize_name(query)
+        description_query = normalize_description(query.strip())
+        version_mask = self.get_version_mask(fix_versions)
+        if not description_query or not version_mask:
+            return []
+
+        # tag id -> (rank, -score, tag order, match, version mask): the best matches are the smallest
+        best_matches: Dict[str, Tuple[int, float, int, str, int]] = {}
+
+        def is_full() -> bool:
+            return limit is not None and len(best_matches) >= limit
+
+        # The matches are added from the best to the worst so that the first match of a tag is its best one, and so
+        # that the search stops as soon as there are enough of them: the next ones couldn't be any better
+        def add_matches(refs: Tuple[Tuple[str, int, str, int], ...], rank: int, negative_score: float) -> None:
+            for ref_tag_id, tag_order, match, match_version_mask in refs:
+                match_version_mask &= version_mask
+                if match_version_mask and ref_tag_id not in best_matches:
+                    best_matches[ref_tag_id] = (rank, negative_score, tag_order, match, match_version_mask)
+
+        # the candidates are (rank, -score, text index) tuples
+        def add_best_matches(searched_texts: SearchedTexts, candidates: List[Tuple[int, float, int]]) -> None:
+            refs = searched_texts.refs
+            for rank, negative_score, text_index in sorted(candidates):
+                if is_full():
+                    break
+                add_matches(refs[text_index], rank, negative_score)
+
+        id_version_mask = self.version_masks_by_tag_id.get(fix_tag_id, 0) & version_mask
+        if id_version_mask:
+            best_matches[fix_tag_id] = (RANK_ID, -1.0, self.tag_orders_by_tag_id[fix_tag_id], fix_tag_id,
+                                        id_version_mask)
+
+        name_query_length = len(name_query)
+        if len(description_query) < NGRAM_SIZE:
+            # a character or two is found in most texts: only the names and enum value names starting with it match
+            if name_query:
+                for searched_texts, rank in ((self.names, RANK_NAME_PREFIX), (self.enum_names, RANK_ENUM_NAME)):
+                    texts = searched_texts.texts
+                    add_best_matches(searched_texts, [(rank, -name_query_length / len(texts[text_index]), text_index)
+                                                      for text_index in searched_texts.find_prefix(name_query)])
+        else:
+            if name_query:
+                texts = self.names.texts
+                add_best_matches(self.names, [(RANK_NAME if offset else RANK_NAME_PREFIX,
+                                               -name_query_length / len(texts[text_index]), text_index)
+                                              for text_index, offset in self.names.find(name_query)])
+                if not is_full():
+                    texts = self.enum_names.texts
+                    add_best_matches(self.enum_names, [(RANK_ENUM_NAME, -name_query_length / len(texts[text_index]),
+                                                        text_index)
+                                                       for text_index, _ in self.enum_names.find(name_query)])
+            # the descriptions are found in roughly tag id order, which is their order within their rank
+            refs = self.descriptions.refs
+            for text_index, _ in self.descriptions.find(description_query):
+                if is_full():
+                    break
+                add_matches(refs[text_index], RANK_DESCRIPTION, 0.0)
+            if name_query and not is_full():
+                similar_texts = self.similar_texts
+                for negative_similarity, similar_text_index in self.get_similar_candidates(name_query):
+                    if is_full():
+                        break
+                    searched_texts, text_index = similar_texts[similar_text_index]
+                    add_matches(searched_texts.refs[text_index], RANK_SIMILAR, negative_similarity)
+
+        sorted_best_matches = sorted(best_matches.values())
+        results = []
+        for rank, negative_score, tag_order, match, match_version_mask in \
+                sorted_best_matches if limit is None else sorted_best_matches[:limit]:
+            fix_tag_id = self.sorted_tag_ids[tag_order]
+            results.append(FixTagSearchResult(fix_tag_id, self.get_name(fix_tag_id, match_version_mask), rank,
+                                              0.0 - negative_score, match, self.get_versions(match_version_mask)))
+
+        return results
+
+    # The (-similarity, similar text index) of the names and enum value names similar to the query, the most first
+    def get_similar_candidates(self, query: str) -> List[Tuple[float, int]]:
+        query_ngrams = get_padded_ngrams(query)
+        shared_ngram_counts = Counter()
+        for ngram in query_ngrams:
+            shared_ngram_counts.update(self.similar_text_indexes_by_ngram.get(ngram, ()))
+        query_ngram_count = len(query_ngrams)
+        min_shared_ngram_count = MIN_SIMILARITY * query_ngram_count
+        similar_ngram_counts = self.similar_ngram_counts
+        # Jaccard index of the two sets of trigrams
+        similarities = [(-shared_ngram_count / (query_ngram_count + similar_ngram_counts[similar_text_index] -
+                                                shared_ngram_count), similar_text_index)
+                        for similar_text_index, shared_ngram_count in shared_ngram_counts.items()
+                        if shared_ngram_count >= min_shared_ngram_count]
+
+        return sorted(similarity for similarity in similarities if similarity[0] <= -MIN_SIMILARITY)
+
+    # The name of the tag in the newest of the versions
+    def get_name(self, fix_tag_id: str, version_mask: int) -> str:
+        for name, name_version_mask in reversed(self.names_by_tag_id[fix_tag_id]):
+            if name_version_mask & version_mask:
+                return name
+
+        return self.names_by_tag_id[fix_tag_id][-1][0]
+
+
+def get_tag_id_sort_key(fix_tag_id: str) -> Tuple[int, str]:
+    return (int(fix_tag_id), fix_tag_id) if fix_tag_id.isdigit() else (sys.maxsize, fix_tag_id)
+
+
+def normalize_name(text: str) -> str:
+    return NON_ALPHANUMERIC_PATTERN.sub('', text.lower())
+
+
+def normalize_description(text: str) -> str:
+    return text.lower().replace(TEXT_SEPARATOR, ' ')
+
+
+# The trigrams of a normalized name, padded so that its start and end count more
+def get_padded_ngrams(text: str) -> Set[str]:
+    text = f"  {text} "
+
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+# Built once, for all the available versions
+@lru_cache()
+def get_fix_tag_search_engine() -> FixTagSearchEngine:
+    return FixTagSearchEngine({fix_version: extract_info_for_fix_version(fix_version).fix_tags_by_tag_id
+                               for fix_version in get_list_of_available_fix_versions()})
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    fix_tag_search_engine = get_fix_tag_search_engine()
+    print(f"Indexed {len(fix_tag_search_engine.version_masks_by_tag_id)} tags of "
+          f"{len(fix_tag_search_engine.fix_versions)} versions in {time.time() - start_time:.3f}s")
+    for query_ in sys.argv[1:]:
+        start_time = time.time()
+        results_ = fix_tag_search_engine.search(query_)
+        print(f"{query_}: {len(results_)} tags in {(time.time() - start_time) * 1000:.2f}ms")
+        for result_ in results_[:5]:
+            print(f"  {result_.fix_tag_id} {result_.name} ({RANK_NAMES[result_.rank]}:{result_.score:.2f}) "
+                  f"{result_.match[:60]!r} {','.join(result_.fix_versions)}")
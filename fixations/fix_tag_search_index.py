@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# Index of the FIX tags of a version for the interactive search of fix_tags, built once so that each keystroke only
+# costs a lookup:
+#  . the searched text of each tag (id + name + description + enum values/names) is lowercased once
+#  . an inverted index maps each trigram of these texts to the tags containing it: the candidates of a query are
+#    the intersection of the tags of its trigrams, which are then checked for the whole query
+#  . a query that contains the previous one (e.g. typing one more character) only checks the previous results
+#  . the whole grid is tabulated once and split into the lines of each tag so that the grid of any subset of tags
+#    is just a selection of these lines
+import sys
+import time
+from typing import Dict, List, Set, Tuple
+
+from tabulate import tabulate
+
+from fixations.fix_utils import FixTag, extract_info_for_fix_version
+
+NGRAM_SIZE = 3
+MAX_DESCRIPTION_LENGTH = 80
+HEADERS = ["ID", "NAME", "TYPE", "DESCRIPTION", "VALUES"]
+# the ids aligned like numbers without tabulate having to guess the type of every cell
+COLUMN_ALIGNMENTS = ("right", "left", "left", "left", "left")
+
+
+class FixTagSearchIndex:
+    def __init__(self, fix_tag_dict: Dict[str, FixTag], grid_style: str = 'grid') -> None:
+        self.fix_tag_ids = sorted(fix_tag_dict, key=int)
+        rows = []
+        self.searched_texts: List[str] = []
+        for fix_tag_id in self.fix_tag_ids:
+            fix_tag = fix_tag_dict[fix_tag_id]
+            values = "\n".join([f"{v.value}: {v.name}" for v in fix_tag.values.values()])
+            description = fix_tag.desc
+            if len(description) > MAX_DESCRIPTION_LENGTH:
+                description = description[:MAX_DESCRIPTION_LENGTH - 1] + '…'
+            rows.append([fix_tag_id, fix_tag.name, fix_tag.type, description, values])
+            self.searched_texts.append((fix_tag_id + fix_tag.name + fix_tag.desc + values).lower())
+
+        self.tag_indexes_by_ngram: Dict[str, Set[int]] = {}
+        for tag_index, searched_text in enumerate(self.searched_texts):
+            for ngram in get_ngrams(searched_text):
+                self.tag_indexes_by_ngram.setdefault(ngram, set()).add(tag_index)
+
+        self.header_lines, self.row_lines = split_grid_into_rows(
+            tabulate(rows, headers=HEADERS, tablefmt=grid_style, disable_numparse=True, colalign=COLUMN_ALIGNMENTS)
+            .splitlines(), len(rows))
+
+        self.previous_search = ''
+        self.previous_tag_indexes = list(range(len(self.fix_tag_ids)))
+
+    # The indexes, in tag id order, of the tags whose text contains the (case insensitive) search
+    def search(self, search: str) -> List[int]:
+        search = search.lower()
+        if self.previous_search in search:
+            candidates = self.previous_tag_indexes
+        elif len(search) >= NGRAM_SIZE:
+            candidates = self.get_candidates(search)
+        else:
+            candidates = range(len(self.fix_tag_ids))
+
+        searched_texts = self.searched_texts
+        tag_indexes = [tag_index for tag_index in candidates if search in searched_texts[tag_index]]
+        self.previous_search, self.previous_tag_indexes = search, tag_indexes
+
+        return tag_indexes
+
+    def get_candidates(self, search: str) -> List[int]:
+        # the rarest trigrams first to keep the intersection small
+        tag_index_sets = sorted((self.tag_indexes_by_ngram.get(ngram, set()) for ngram in get_ngrams(search)), key=len)
+        candidates = set(tag_index_sets[0])
+        for tag_index_set in tag_index_sets[1:]:
+            if not candidates:
+                break
+            candidates &= tag_index_set
+
+        return sorted(candidates)
+
+    # The lines of the grid of the tags, i.e. its top border and headers followed by the lines of each tag
+    def get_grid_lines(self, tag_indexes: List[int]) -> List[str]:
+        grid_lines = list(self.header_lines)
+        for tag_index in tag_indexes:
+            grid_lines.extend(self.row_lines[tag_index])
+
+        return grid_lines
+
+
+def get_ngrams(text: str) -> Set[str]:
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+# Each row of a grid (e.g. 'grid' style) is followed by a separator line: the lines of the header are those before
+# the first row, i.e. up to the header separator
+def split_grid_into_rows(grid_lines: List[str], row_count: int) -> Tuple[List[str], List[List[str]]]:
+    separator_indexes = [i for i, line in enumerate(grid_lines) if line.startswith('+')]
+    # the top border, the header separator and the separator following each row
+    first_row_start = separator_indexes[-row_count - 1] + 1 if row_count else len(grid_lines)
+    header_lines = grid_lines[:first_row_start]
+    row_lines = []
+    row_start = first_row_start
+    for separator_index in separator_indexes[-row_count:] if row_count else []:
+        row_lines.append(grid_lines[row_start:separator_index + 1])
+        row_start = separator_index + 1
+
+    return header_lines, row_lines
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    fix_tag_search_index = FixTagSearchIndex(extract_info_for_fix_version(sys.argv[1]).fix_tags_by_tag_id)
+    print(f"Indexed {len(fix_tag_search_index.fix_tag_ids)} tags in {time.time() - start_time:.3f}s")
+    for search_ in sys.argv[2:]:
+        start_time = time.time()
+        tag_indexes_ = fix_tag_search_index.search(search_)
+        print(f"{search_}: {len(tag_indexes_)} tags in {(time.time() - start_time) * 1000:.2f}ms")
@@ -6,53 +6,167 @@ import urwid
 from tabulate import tabulate
 from termcolor import colored
 
+from fixations.fix_tag_search_engine import FixTagSearchEngine, DEFAULT_LIMIT
+from fixations.fix_tag_search_index import FixTagSearchIndex
 from fixations.fix_utils import extract_info_for_fix_version, DEFAULT_FIX_VERSION
 
 DEFAULT_VERSION = "4.2"
 
 
+# Keys that scroll the search results while the search keeps the keyboard
+SCROLL_KEYS = ('up', 'down', 'page up', 'page down')
+
+
+# The search results are a list of one row per tag, below the search and the grid's headers. The rows are only
+# created, and their matches highlighted, as they come into view (see FixTagRowWalker) so that a keystroke costs
+# the same whether it matches a handful of tags or all of them. Besides typing the search:
+#  . up/down and page up/page down scroll the results, ctrl home/ctrl end go to the first/last one
+#  . enter clears the search and jumps to the tag best matching it (see FixTagSearchEngine), e.g. its id or its name
 class Urwid:
-    def __init__(self, fix_tag_dict):
+    def __init__(self, fix_tag_dict, fix_version=DEFAULT_FIX_VERSION):
+        self.fix_tag_dict = fix_tag_dict
+        self.fix_version = fix_version
+        self.fix_tag_search_index = FixTagSearchIndex(fix_tag_dict)
+        self.tag_indexes_by_tag_id = {fix_tag_id: tag_index for tag_index, fix_tag_id in
+                                      enumerate(self.fix_tag_search_index.fix_tag_ids)}
+        # only built when jumping to a tag
+        self.fix_tag_search_engine = None
+        self.search = ''
+
+        self.search_str = urwid.Edit(('input', u"Search for (ENTER to jump to the tag, CTRL-C to exit): "))
+        grid_headers_text = urwid.Text('\n'.join(self.fix_tag_search_index.header_lines))
+        self.search_results = FixTagRowWalker(self.create_row_widget)
+        self.search_results.set_tag_indexes(self.fix_tag_search_index.search(''))
+        self.list_box = urwid.ListBox(self.search_results)
+        self.top = SearchFrame(self.list_box, header=urwid.Pile([self.search_str, grid_headers_text]),
+                               focus_part='header')
+
+        urwid.connect_signal(self.search_str, 'change', self.on_search_change)
+
+    def run(self):
         palette = [(None, 'white', 'default'),
                    ('input', 'light green', 'default'),
                    ('highlight', 'light green', 'default')]
-        search_str = urwid.Edit((input, u"Search for (CTRL-C to exit): "))
-        search_results_text = urwid.Text(get_data_grid_for_search(fix_tag_dict))
-        lw = urwid.SimpleFocusListWalker([search_results_text])
-        search_results_ba = urwid.BoxAdapter(urwid.ListBox(lw), 1000)
-        pile = urwid.Pile([search_str, search_results_ba])
-        top = urwid.Filler(pile, valign='top')
-
-        urwid.connect_signal(search_str, 'change', self.on_search_change, user_args=[fix_tag_dict, search_results_text])
         try:
-            urwid.MainLoop(top, palette).run()
+            urwid.MainLoop(self.top, palette, unhandled_input=self.on_unhandled_input).run()
         except KeyboardInterrupt:
             print("Exit requested.")
         except Exception as e:
             print("Issue with urwid...")
             raise e
 
-    def on_search_change(self, fix_tag_dict, search_results_text, search_str, search_str_text):
-        text = get_data_grid_for_search(fix_tag_dict, search_str_text)
-        text_chunks = create_highlighted_text(text, search_str_text, 'highlight')
-        search_results_text.set_text(text_chunks)
-
-
-def get_data_grid_for_search(fix_tag_dict, search=None):
+    def on_search_change(self, search_str, search_str_text):
+        self.search = search_str_text
+        self.search_results.set_tag_indexes(self.fix_tag_search_index.search(search_str_text))
+
+    def on_unhandled_input(self, key):
+        if key == 'enter':
+            self.jump_to_tag(self.search)
+        elif key == 'ctrl home' and len(self.search_results):
+            self.focus_on_position(0, 'top')
+        elif key == 'ctrl end' and len(self.search_results):
+            self.focus_on_position(len(self.search_results) - 1, 'bottom')
+
+    def jump_to_tag(self, search):
+        if self.fix_tag_search_engine is None:
+            self.fix_tag_search_engine = FixTagSearchEngine({self.fix_version: self.fix_tag_dict})
+        results = self.fix_tag_search_engine.search(search, limit=1)
+        if results:
+            # all the tags are listed, in tag id order
+            self.search_str.set_edit_text('')
+            self.focus_on_position(self.tag_indexes_by_tag_id[results[0].fix_tag_id], 'top')
+
+    def focus_on_position(self, position, valign):
+        self.list_box.set_focus(position)
+        self.list_box.set_focus_valign(valign)
+
+    def create_row_widget(self, tag_index):
+        return urwid.Text(create_highlighted_text('\n'.join(self.fix_tag_search_index.row_lines[tag_index]),
+                                                  self.search, 'highlight'))
+
+
+# Walks the rows of the tags of the search results, creating each row widget when the list box first asks for it
+# (i.e. when it's about to be displayed) and keeping it until the results change
+class FixTagRowWalker(urwid.ListWalker):
+    def __init__(self, create_row_widget):
+        self.create_row_widget = create_row_widget
+        self.tag_indexes = []
+        self.row_widgets = {}
+        self.focus = 0
+
+    def set_tag_indexes(self, tag_indexes):
+        self.tag_indexes = tag_indexes
+        self.row_widgets = {}
+        self.focus = 0
+        self._modified()
+
+    def get_row_widget(self, position):
+        if position < 0 or position >= len(self.tag_indexes):
+            return None, None
+        row_widget = self.row_widgets.get(position)
+        if row_widget is None:
+            row_widget = self.row_widgets[position] = self.create_row_widget(self.tag_indexes[position])
+
+        return row_widget, position
+
+    def get_focus(self):
+        return self.get_row_widget(self.focus)
+
+    def set_focus(self, position):
+        self.focus = position
+        self._modified()
+
+    def get_next(self, position):
+        return self.get_row_widget(position + 1)
+
+    def get_prev(self, position):
+        return self.get_row_widget(position - 1)
+
+    def positions(self, reverse=False):
+        return range(len(self.tag_indexes) - 1, -1, -1) if reverse else range(len(self.tag_indexes))
+
+    def __len__(self):
+        return len(self.tag_indexes)
+
+
+# The scroll keys go to the search results even though the search has the focus
+class SearchFrame(urwid.Frame):
+    def keypress(self, size, key):
+        if key in SCROLL_KEYS:
+            maxcol, maxrow = size
+            (header_row_count, footer_row_count), _ = self.frame_top_bottom((maxcol, maxrow), True)
+            return self.body.keypress((maxcol, maxrow - header_row_count - footer_row_count), key)
+
+        return super().keypress(size, key)
+
+
+# The tags whose text contains the (case insensitive) search, as FixTagSearchIndex finds them, the best matches first
+# (see FixTagSearchEngine) and then in tag id order. The engine's other matches (e.g. typos) come last, at most
+# DEFAULT_LIMIT of them since the search can't be highlighted in them
+def get_data_grid_for_search(fix_tag_dict, search=None, fix_version=DEFAULT_FIX_VERSION):
+    if search:
+        fix_tag_search_index = FixTagSearchIndex(fix_tag_dict)
+        matching_fix_ids = [fix_tag_search_index.fix_tag_ids[tag_index]
+                            for tag_index in fix_tag_search_index.search(search)]
+        ranked_fix_ids = [result.fix_tag_id for result in
+                          FixTagSearchEngine({fix_version: fix_tag_dict}).search(search, limit=None)]
+        matching_fix_id_set = set(matching_fix_ids)
+        best_fix_ids = [fix_id for fix_id in ranked_fix_ids if fix_id in matching_fix_id_set]
+        best_fix_id_set = set(best_fix_ids)
+        other_fix_ids = [fix_id for fix_id in ranked_fix_ids if fix_id not in matching_fix_id_set]
+        fix_ids = (best_fix_ids + [fix_id for fix_id in matching_fix_ids if fix_id not in best_fix_id_set]
+                   + other_fix_ids[:DEFAULT_LIMIT])
+    else:
+        fix_ids = sorted(fix_tag_dict, key=lambda k: int(k))
     rows = []
-    for fix_id in sorted(fix_tag_dict, key=lambda k: int(k)):
+    for fix_id in fix_ids:
         fix_tag = fix_tag_dict[fix_id]
         desc = fix_tag.desc
         if len(desc) > 80:
             desc = desc[:79] + '…'
         value_rows = "\n".join([f"{v.value}: {v.name}" for v in fix_tag.values.values()])
-        if search:
-            include = search.lower() in (fix_id + fix_tag.name + fix_tag.desc + value_rows).lower()
-        else:
-            include = True
-        if include:
-            row = [fix_id, fix_tag.name, fix_tag.type, desc, value_rows]
-            rows.append(row)
+        row = [fix_id, fix_tag.name, fix_tag.type, desc, value_rows]
+        rows.append(row)
 
     return tabulate(rows, headers=["ID", "NAME", "TYPE", "DESCRIPTION", "VALUES"], tablefmt='grid')
 
@@ -61,17 +175,18 @@ def create_highlighted_text(text, text_to_highlight, highlight_attr):
     tth_lc = text_to_highlight.lower()
     tth_len = len(text_to_highlight)
     if tth_len > 0:
+        # the text is lowercased once and searched from the end of the previous match
+        text_lc = text.lower()
         chunks = []
-        stop = False
-        while not stop:
-            tth_pos = text.lower().find(tth_lc)
+        start = 0
+        while True:
+            tth_pos = text_lc.find(tth_lc, start)
             if tth_pos == -1:
-                stop = True
-                chunks.append(text)
-            else:
-                chunks.append(text[:tth_pos])
-                chunks.append((highlight_attr, text[tth_pos:tth_pos + tth_len]))
-                text = text[tth_pos + tth_len:]
+                chunks.append(text[start:])
+                break
+            chunks.append(text[start:tth_pos])
+            chunks.append((highlight_attr, text[tth_pos:tth_pos + tth_len]))
+            start = tth_pos + tth_len
     else:
         chunks = [text]
 
@@ -104,10 +219,10 @@ def main():
 
     if tag:
         search_str = tag
-        search_results = get_data_grid_for_search(fix_tag_dict, search_str)
+        search_results = get_data_grid_for_search(fix_tag_dict, search_str, cli_args.fix_version)
         print(color_search_string(search_results, search_str, 'red'))
     else:
-        Urwid(fix_tag_dict)
+        Urwid(fix_tag_dict, cli_args.fix_version).run()
 
 
 if __name__ == '__main__':
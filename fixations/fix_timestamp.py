@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# Parsing of the timestamps found in FIX logs and formatting of the deltas between them, without strptime():
+#  . log prefix timestamps (hh:mm:ss with an optional .fraction or ,fraction) and FIX UTCTimestamps
+#    (yyyymmdd-hh:mm:ss with an optional .sss, .ssssss or .sssssssss) are parsed by hand
+#  . a timestamp becomes an integer number of nanoseconds: since the epoch if it has a date (yyyymmdd- or
+#    yyyy-mm-dd), since midnight otherwise. strptime() would silently stop at microseconds
+#  . the parsed timestamps are cached since each one is used twice in a row: as the current and the previous one
+#  . deltas are formatted with integer arithmetic, e.g. +1, -21:57.123, +.123,456 or +1:02:03.000,000,789
+import sys
+from datetime import date
+from functools import lru_cache
+
+NS_PER_US = 1_000
+NS_PER_SECOND = 1_000_000_000
+NS_PER_DAY = 24 * 60 * 60 * NS_PER_SECOND
+MAX_FRACTION_DIGITS = 9
+TIMESTAMP_CACHE_SIZE = 1024
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
+def parse_timestamp(timestamp: str) -> int:
+    # anything before the hh:mm:ss is the date, if any
+    colon_index = timestamp.find(':')
+    hour_index = colon_index
+    while hour_index > 0 and timestamp[hour_index - 1].isdigit():
+        hour_index -= 1
+    time_of_day = timestamp[hour_index:] if colon_index >= 0 else timestamp
+
+    if '.' in time_of_day:
+        hh_mm_ss, separator, fraction = time_of_day.partition('.')
+    elif ',' in time_of_day:
+        hh_mm_ss, separator, fraction = time_of_day.partition(',')
+    else:
+        hh_mm_ss, separator, fraction = time_of_day, '', ''
+
+    parts = hh_mm_ss.split(':')
+    if len(parts) != 3 or not all(is_number(part, 1, 2) for part in parts) or \
+            (separator and not is_number(fraction, 1, MAX_FRACTION_DIGITS)):
+        raise_invalid_time_of_day(time_of_day, separator)
+    hours, minutes, seconds = int(parts[0]), int(parts[1]), int(parts[2])
+    if hours > 23 or minutes > 59 or seconds > 59:
+        raise_invalid_time_of_day(time_of_day, separator)
+
+    timestamp_ns = (hours * 3600 + minutes * 60 + seconds) * NS_PER_SECOND
+    if fraction:
+        timestamp_ns += int(fraction.ljust(MAX_FRACTION_DIGITS, '0'))
+
+    return timestamp_ns + parse_date(timestamp[:hour_index]) * NS_PER_DAY
+
+
+def is_number(value: str, min_length: int, max_length: int) -> bool:
+    return min_length <= len(value) <= max_length and value.isascii() and value.isdigit()
+
+
+# Same message as strptime() so that the errors shown in the grid headers don't change
+def raise_invalid_time_of_day(time_of_day: str, separator: str) -> None:
+    time_format = f"%H:%M:%S{separator}%f" if separator else '%H:%M:%S'
+    raise ValueError(f"time data '{time_of_day}' does not match format '{time_format}'")
+
+
+# Days since the epoch of a yyyymmdd or yyyy-mm-dd date (followed by a separator), 0 if there's no valid date
+def parse_date(date_prefix: str) -> int:
+    date_prefix = date_prefix.rstrip('-T ')
+    if len(date_prefix) == 10 and date_prefix[4] == '-' and date_prefix[7] == '-':
+        date_prefix = date_prefix.replace('-', '')
+    if not is_number(date_prefix, 8, 8):
+        return 0
+
+    try:
+        return date(int(date_prefix[:4]), int(date_prefix[4:6]), int(date_prefix[6:])).toordinal() - EPOCH_ORDINAL
+    except ValueError:
+        return 0
+
+
+def compute_delta_ns(timestamp_ns: int, previous_timestamp_ns: int) -> int:
+    # only compare the times of day if just one of the timestamps has a date
+    if (timestamp_ns < NS_PER_DAY) != (previous_timestamp_ns < NS_PER_DAY):
+        timestamp_ns, previous_timestamp_ns = timestamp_ns % NS_PER_DAY, previous_timestamp_ns % NS_PER_DAY
+
+    return timestamp_ns - previous_timestamp_ns
+
+
+# e.g. +1 (1s), -21:57.123 (21m57.123s), +.123,456 (123.456ms) or +1:02:03.000,000,789
+# the leading 0's and the trailing 0's of the fraction are left out
+def format_delta(delta_ns: int) -> str:
+    sign = '-' if delta_ns < 0 else '+'
+    seconds, fraction_ns = divmod(abs(delta_ns), NS_PER_SECOND)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        hh_mm_ss = f"{hours}:{minutes:02}:{seconds:02}"
+    elif minutes:
+        hh_mm_ss = f"{minutes}:{seconds:02}"
+    elif seconds:
+        hh_mm_ss = str(seconds)
+    else:
+        hh_mm_ss = ''
+
+    if fraction_ns == 0:
+        return sign + hh_mm_ss
+
+    fraction = f"{fraction_ns:09}"
+    millis, micros, nanos = fraction[:3], fraction[3:6], fraction[6:]
+    if nanos != '000':
+        fraction = f"{millis},{micros},{nanos}"
+    elif micros != '000':
+        fraction = f"{millis},{micros}"
+    else:
+        fraction = millis.rstrip('0')
+
+    return f"{sign}{hh_mm_ss}.{fraction}"
+
+
+if __name__ == "__main__":
+    previous_timestamp_ns = None
+    for timestamp_ in sys.argv[1:]:
+        timestamp_ns_ = parse_timestamp(timestamp_)
+        delta_ = '' if previous_timestamp_ns is None else format_delta(compute_delta_ns(timestamp_ns_,
+                                                                                         previous_timestamp_ns))
+        print(f"{timestamp_} -> {timestamp_ns_} {delta_}")
+        previous_timestamp_ns = timestamp_ns_
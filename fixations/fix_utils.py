@@ -1,25 +1,33 @@
 #!/usr/bin/env python3
 
 import configparser
+import gc
+import glob
+import hashlib
 import inspect
 import json
+import mmap
 import os.path
 import pathlib
+import pickle
 import re
+import resource
 import time
 from dataclasses import dataclass, field
-from datetime import datetime, timedelta
+from datetime import timedelta
 from functools import lru_cache
 from importlib.metadata import version
+from itertools import chain
 from string import Template
-from typing import Dict, Union, List, Tuple, Set
-from xml.dom.minicompat import NodeList
-from xml.dom.minidom import parse, Element
+from typing import Dict, Union, List, Tuple, Set, Iterator, Iterable
+from xml.etree import ElementTree
 
 import requests as requests
 import tabulate
 from dataclasses_json import dataclass_json
 
+from fixations.fix_timestamp import parse_timestamp, compute_delta_ns, format_delta, NS_PER_US
+
 DEFAULT_FIX_VERSION = "4.2"
 FIX_VERSION_1_1 = "1.1"
 FIX_VERSION_ALL = "ALL_VERSIONS"
@@ -28,7 +36,13 @@ FIX_TAG_ID_SENDER_COMP_ID = "49"
 FIX_TAG_ID_TARGET_COMP_ID = "56"
 SESSION_LEVEL_TAGS = ['8', '34', '9', '10']
 VERSION_RE = r"8=FIXT*\.([.0-9SP]+)"
+VERSION_PATTERN = re.compile(VERSION_RE)
+COMMENT_PATTERN = re.compile(r'#\s*(.*)')
+COMMAND_PATTERN = re.compile(r'^\s*!\s*(.*)', re.IGNORECASE)
+TIME_OF_DAY_PATTERN = re.compile(r'(\d+:\d+:\d+.*)')
 START_OF_BLOCK_CHARACTER = '\u229F '
+FIX_LINE_SIGNATURE = b'8=FIX'
+DEFAULT_ENCODING = 'utf-8'
 
 # cfg key
 CFG_FILE_SECTION_MAIN = "main"
@@ -36,6 +50,8 @@ CFG_FILE_KEY_DATA_DIR_PATH = "data_dir_path"
 CFG_FILE_KEY_FIX_DEFINITIONS_PATH = "fix_definitions_path"
 CFG_FILE_KEY_FIX_VERSION = "fix_version"
 CFG_FILE_KEY_STORE_PATH = "store_path"
+CFG_FILE_KEY_STORE_MAX_AGE_DAYS = "store_max_age_days"
+CFG_FILE_KEY_STORE_MAX_SIZE_MB = "store_max_size_mb"
 CFG_FILE_KEY_LOOKUP_URL_TEMPLATE = "lookup_url_template"
 CFG_ADDITIONAL_FIX_DEFINITIONS_URL = "additional_fix_definition_url"
 CFG_ADDITIONAL_FIX_DEFINITIONS_CACHE_PATH = "additional_fix_definition_path"
@@ -51,6 +67,11 @@ DEFAULT_STORE_PATH = DEFAULT_DATA_DIR_PATH + '/store.db'
 DEFAULT_LOOKUP_URL_TEMPLATE = 'https://www.onixs.biz/fix-dictionary/${fix_version}/tagnum_${tag_num}.html'
 DEFAULT_ADDITIONAL_FIX_DEFINITIONS_CACHE_PATH = "/tmp/additional_fix_definitions.txt"
 
+# Compiled (pickled) FIX dictionaries, see load_compiled_fix_version_info()
+COMPILED_DICTIONARY_DIR_NAME = "compiled"
+COMPILED_DICTIONARY_FORMAT_VERSION = 1
+FIX_DEFINITION_FILES = ["Fields.xml", "Enums.xml", "Components.xml", "MsgContents.xml"]
+
 # Global variable initialized at the bottom of this file
 Cfg = None
 
@@ -111,6 +132,19 @@ class FixVersionInfo:
     fix_blocks_by_name: Dict[str, 'FixBlock'] = field(default_factory=dict)
     fix_blocks_by_count_tag: Dict[str, 'FixBlock'] = field(default_factory=dict)
 
+    # lazily built by get_decorated_values_by_tag_id()
+    decorated_values_by_tag_id: Dict[str, Dict[str, str]] = field(default=None, init=False, repr=False,
+                                                                  compare=False)
+
+    # {tag_id: {value: "value (name)"}} for all the tags with enum values, to decorate parsed values in one lookup
+    def get_decorated_values_by_tag_id(self) -> Dict[str, Dict[str, str]]:
+        if self.decorated_values_by_tag_id is None:
+            self.decorated_values_by_tag_id = {
+                tag_id: {value: f"{value} ({fix_tag_value.name})" for value, fix_tag_value in fix_tag.values.items()}
+                for tag_id, fix_tag in self.fix_tags_by_tag_id.items() if fix_tag.values}
+
+        return self.decorated_values_by_tag_id
+
     def merge_fix_tags_by_id(self, other_fix_version_info: 'FixVersionInfo') -> List[FixTagValueClash]:
         fix_tag_value_clashes: List[FixTagValueClash] = []
         for fix_tag_id, other_fix_tag in other_fix_version_info.fix_tags_by_tag_id.items():
@@ -118,8 +152,9 @@ class FixVersionInfo:
                 self_fix_tag = self.fix_tags_by_tag_id[fix_tag_id]
                 # use the fields of other (assumed newer) version as starting point
                 # except for the values which are taken from the existing one
+                # (a copy of them, not to modify the tags of the version they come from)
                 merged_fix_tag = FixTag(other_fix_tag.id, other_fix_tag.name, other_fix_tag.type, other_fix_tag.desc,
-                                        self_fix_tag.values)
+                                        dict(self_fix_tag.values))
                 other_values = other_fix_tag.values
                 for other_value in other_values.values():
                     value = other_value.value
@@ -133,17 +168,38 @@ class FixVersionInfo:
                 self.fix_tags_by_tag_id[fix_tag_id] = merged_fix_tag
             else:
                 self.fix_tags_by_tag_id[fix_tag_id] = other_fix_tag
+        self.decorated_values_by_tag_id = None
 
         return fix_tag_value_clashes
 
+    # The blocks of the other (assumed newer) version replace those with the same id but keep the tags these had so
+    # that a block of an older version is still recognized as a whole
+    def merge_fix_blocks_by_id(self, other_fix_version_info: 'FixVersionInfo') -> None:
+        fix_blocks_by_id = self.fix_blocks_by_id
+        for block_id, other_fix_block in other_fix_version_info.fix_blocks_by_id.items():
+            tag_ids = set(other_fix_block.tag_ids)
+            if block_id in fix_blocks_by_id:
+                tag_ids |= fix_blocks_by_id[block_id].tag_ids
+            fix_blocks_by_id[block_id] = FixBlock(other_fix_block.id, other_fix_block.name, other_fix_block.count_tag,
+                                                  other_fix_block.start_tag,
+                                                  dict(other_fix_block.components_by_position), tag_ids)
+
+        # the names and count tags of both versions (the other's winning) point to the blocks as merged
+        self.fix_blocks_by_name = {name: fix_blocks_by_id[fix_block.id] for name, fix_block in
+                                   chain(self.fix_blocks_by_name.items(),
+                                         other_fix_version_info.fix_blocks_by_name.items())}
+        self.fix_blocks_by_count_tag = {tag: fix_blocks_by_id[fix_block.id] for tag, fix_block in
+                                        chain(self.fix_blocks_by_count_tag.items(),
+                                              other_fix_version_info.fix_blocks_by_count_tag.items())}
+
     def merge_with_other_fix_version_info(self, other_fix_version_info: 'FixVersionInfo') -> List[FixTagValueClash]:
         fix_tag_value_clashes: List[FixTagValueClash] = self.merge_fix_tags_by_id(other_fix_version_info)
+        self.merge_fix_blocks_by_id(other_fix_version_info)
 
         return fix_tag_value_clashes
 
 
 # Caches
-Xml_elements_cache: Dict[str, NodeList] = {}
 Additional_tag_cache: Dict[str, Dict[str, FixTag]] = {}
 Additional_tag_cache_expiry_time = 0
 DEFAULT_CACHE_EXPIRY_TIME_OFFSET = 60 * 60  # 1 hour
@@ -179,6 +235,10 @@ def get_cfg_value(key, section=CFG_FILE_SECTION_MAIN, warn_when_missing=True):
     return value
 
 
+def get_data_dir_path():
+    return get_cfg_for_key(CFG_FILE_KEY_DATA_DIR_PATH, DEFAULT_DATA_DIR_PATH)
+
+
 def get_store_path():
     return get_cfg_for_key(CFG_FILE_KEY_STORE_PATH, DEFAULT_STORE_PATH)
 
@@ -191,6 +251,8 @@ def get_lookup_url_template_for_js(fix_version):
     url_template = Template(get_lookup_url_template())
     if fix_version == '1.1':
         fix_version = 'FIXT1.1'
+    elif fix_version == FIX_VERSION_ALL:
+        fix_version = get_list_of_available_fix_versions()[-1]
     url_template_for_js = url_template.substitute({'fix_version': fix_version, 'tag_num': '${tag_num}'})
 
     return url_template_for_js
@@ -280,38 +342,18 @@ def check_for_additional_fix_definitions(additional_fix_definitions_url: str = N
         return {}
 
 
-def get_xml_text(nodelist):
-    rc = []
-    for node in nodelist:
-        if node.nodeType == node.TEXT_NODE:
-            rc.append(node.data)
+def get_xml_text(element: Union[ElementTree.Element, None]) -> str:
+    # only the element's own text, i.e. not the one of its sub-elements, just like the DOM's TEXT_NODE children
+    if element is None:
+        return ''
+    rc = [element.text or '']
+    for sub_element in element:
+        rc.append(sub_element.tail or '')
     return ''.join(rc)
 
 
-def extract_tag_data_from_xml_field(field):
-    return extract_tag_data_from_xml(field, ['Tag', 'Name', 'Type', 'Description'])
-
-
-def extract_tag_data_from_xml_enum(enum):
-    return extract_tag_data_from_xml(enum, ['Tag', 'SymbolicName', 'Value', 'Description'])
-
-
-def extract_tag_data_from_xml_msg_content(msg_content):
-    return extract_tag_data_from_xml(msg_content, ['ComponentID', 'TagText', 'Indent', 'Position'])
-
-
-def extract_tag_data_from_xml(item: Element, tag_names: List[str], tag_attributes: Union[None, List[str]] = None) -> \
-List[str]:
-    data = []
-    for tag_name in tag_names:
-        value = get_xml_text(item.getElementsByTagName(tag_name)[0].childNodes)
-        data.append(value)
-
-    if tag_attributes:
-        for tag_attribute in tag_attributes:
-            data.append(item.getAttribute(tag_attribute))
-
-    return data
+def extract_tag_data_from_xml(item: ElementTree.Element, tag_names: List[str]) -> List[str]:
+    return [get_xml_text(item.find(tag_name)) for tag_name in tag_names]
 
 
 def path_for_fix_version(version=None, file=None):
@@ -344,56 +386,196 @@ def get_list_of_available_fix_versions(include_fix_version_1_1: bool = True) ->
     return sorted(fix_versions)
 
 
-def extract_elements_from_file_by_tag_name(fix_version, file, tag_name) -> NodeList:
-    cache_key = '|'.join([fix_version, file, tag_name])
-    if cache_key in Xml_elements_cache:
-        return Xml_elements_cache[cache_key]
-    else:
-        fields_file = path_for_fix_version(fix_version, file)
-        doc = parse(fields_file)
-        elements = doc.getElementsByTagName(tag_name)
-        Xml_elements_cache[cache_key] = elements
-
-        return elements
+# Stream the XML file and yield the text of the tag_names sub-elements for each of its item_tag_name elements.
+# The items are discarded as soon as they've been processed so that no DOM is kept in memory.
+def extract_items_from_file_by_tag_name(fix_version: str, file: str, item_tag_name: str,
+                                        tag_names: List[str]) -> Iterator[List[str]]:
+    xml_file = path_for_fix_version(fix_version, file)
+    root = None
+    for event, element in ElementTree.iterparse(xml_file, events=('start', 'end')):
+        if root is None:
+            root = element
+        elif event == 'end' and element.tag == item_tag_name:
+            yield extract_tag_data_from_xml(element, tag_names)
+            root.clear()
 
 
+# All the FIX versions (but 1.1, i.e. FIXT, the session level only) merged into one, the newest winning, e.g. to decode
+# logs that mix versions. It's compiled like a single version, see compute_all_fix_versions_hash()
 @lru_cache()
 def extract_info_for_all_fix_versions() -> FixVersionInfo:
-    fix_version = FIX_VERSION_ALL
-    fix_version_info = FixVersionInfo(fix_version)
-
-    all_versions_json_file_path = '/tmp/all_versions_data.json'
-    with open(all_versions_json_file_path, 'r') as file:
-        json_data = json.load(file)
+    fix_versions = get_list_of_available_fix_versions(include_fix_version_1_1=False)
+    additional_tag_dict = check_for_additional_fix_definitions()
+    definitions_hash = compute_all_fix_versions_hash(fix_versions, additional_tag_dict)
+    fix_version_info = load_compiled_fix_version_info(FIX_VERSION_ALL, definitions_hash)
+    if fix_version_info is None:
+        fix_version_info = merge_fix_version_infos([extract_info_for_fix_version(fix_version)
+                                                    for fix_version in fix_versions])
+        save_compiled_fix_version_info(fix_version_info, definitions_hash)
 
-    fix_version_info.fix_tags_by_tag_id = {fix_tag_id: FixTag.from_dict(fix_tag_data) for fix_tag_id, fix_tag_data in
-                                           json_data.items()}
+    return fix_version_info
 
-    additional_tag_dict = check_for_additional_fix_definitions()
-    if len(additional_tag_dict):
-        add_additional_tag_dict(additional_tag_dict, fix_version_info.fix_tags_by_tag_id)
 
-    #    extract_fix_blocks_for_fix_version(fix_version_info)
+# The infos are merged oldest first into a new one, leaving them (which are cached) untouched
+def merge_fix_version_infos(fix_version_infos: List[FixVersionInfo]) -> FixVersionInfo:
+    all_versions_info = FixVersionInfo(FIX_VERSION_ALL)
+    for fix_version_info in fix_version_infos:
+        all_versions_info.merge_with_other_fix_version_info(fix_version_info)
 
-    return fix_version_info
+    return all_versions_info
 
 
 @lru_cache()
 def extract_info_for_fix_version(fix_version=DEFAULT_FIX_VERSION) -> FixVersionInfo:
+    if fix_version == FIX_VERSION_ALL:
+        return extract_info_for_all_fix_versions()
+
     available_versions = get_list_of_available_fix_versions()
     assert fix_version in available_versions, f"The specified FIX version:{fix_version} is not valid. Use one of these {available_versions}"
+
+    additional_tag_dict = check_for_additional_fix_definitions()
+    definitions_hash = compute_fix_definitions_hash(fix_version, additional_tag_dict)
+    fix_version_info = load_compiled_fix_version_info(fix_version, definitions_hash)
+    if fix_version_info is None:
+        fix_version_info = extract_info_for_fix_version_from_xml(fix_version, additional_tag_dict)
+        save_compiled_fix_version_info(fix_version_info, definitions_hash)
+
+    return fix_version_info
+
+
+# Meant to be called once in a parent process (e.g. the gunicorn master) before forking its workers:
+# all the FIX versions, ALL_VERSIONS included, are loaded in the lru_caches of extract_info_for_fix_version() and
+# moved to gc's permanent generation so that the workers' gc doesn't touch (and therefore copy) the pages that hold them.
+def preload_all_fix_versions() -> List[str]:
+    fix_versions = get_list_of_available_fix_versions() + [FIX_VERSION_ALL]
+    for fix_version in fix_versions:
+        extract_info_for_fix_version(fix_version)
+    gc.collect()
+    gc.freeze()
+
+    return fix_versions
+
+
+# The XML parsing of the FIX definitions is slow (seconds per version) so its result is "compiled" into
+# a compact pickle file stored in the data dir. The file name contains a hash of everything that went into it
+# (XML files, additional FIX definitions and cfg) so that any change to these triggers a rebuild.
+#   * tags:   (id, name, type, desc, ((value, name, desc), ...))
+#   * blocks: (id, name, count_tag, start_tag, ((component_id, tag, indent, position), ...), (tag_id, ...))
+#   * block names and count tags are stored as (key, block_id) to rebuild the by_name/by_count_tag dicts
+def compute_fix_definitions_hash(fix_version: str, additional_tag_dict: Dict[str, FixTag]) -> str:
+    definitions_hash = hashlib.sha256(f"{COMPILED_DICTIONARY_FORMAT_VERSION}|{fix_version}".encode())
+    for file in FIX_DEFINITION_FILES:
+        with open(path_for_fix_version(fix_version, file), 'rb') as fd:
+            definitions_hash.update(fd.read())
+    update_hash_with_additional_definitions(definitions_hash, additional_tag_dict)
+
+    return definitions_hash.hexdigest()[:16]
+
+
+# Reading the XML files of all the versions would cost more than loading ALL_VERSIONS itself: only their sizes and
+# modification times are hashed (a rebuild merges the compiled versions, each checked against its own content hash)
+def compute_all_fix_versions_hash(fix_versions: List[str], additional_tag_dict: Dict[str, FixTag]) -> str:
+    definitions_hash = hashlib.sha256(
+        f"{COMPILED_DICTIONARY_FORMAT_VERSION}|{FIX_VERSION_ALL}|{','.join(fix_versions)}".encode())
+    update_hash_with_fix_definition_file_stats(definitions_hash, fix_versions)
+    update_hash_with_additional_definitions(definitions_hash, additional_tag_dict)
+
+    return definitions_hash.hexdigest()[:16]
+
+
+def update_hash_with_fix_definition_file_stats(definitions_hash, fix_versions: List[str]) -> None:
+    for fix_version in fix_versions:
+        for file in FIX_DEFINITION_FILES:
+            file_stat = os.stat(path_for_fix_version(fix_version, file))
+            definitions_hash.update(f"|{fix_version}/{file}:{file_stat.st_size}:{file_stat.st_mtime_ns}".encode())
+
+
+def update_hash_with_additional_definitions(definitions_hash, additional_tag_dict: Dict[str, FixTag]) -> None:
+    for tag_id, fix_tag in sorted(additional_tag_dict.items()):
+        definitions_hash.update(f"|{tag_id}={fix_tag.name}".encode())
+    additional_components_to_blocks = get_cfg_value(CFG_ADDITIONAL_COMPONENTS_IN_BLOCKS, warn_when_missing=False)
+    definitions_hash.update(f"|{additional_components_to_blocks}".encode())
+
+
+def get_compiled_fix_version_info_path(fix_version: str, definitions_hash: str = '*') -> str:
+    return f"{get_data_dir_path()}/{COMPILED_DICTIONARY_DIR_NAME}/FIX.{fix_version}-{definitions_hash}.pickle"
+
+
+def load_compiled_fix_version_info(fix_version: str, definitions_hash: str) -> Union[FixVersionInfo, None]:
+    compiled_path = get_compiled_fix_version_info_path(fix_version, definitions_hash)
+    if not os.path.exists(compiled_path):
+        return None
+
+    # the gc would be triggered over and over by the many objects being created while none of them can be garbage
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return create_fix_version_info_from_compiled(fix_version, compiled_path)
+    except Exception as e:
+        print(f"ERROR: can't load compiled FIX dictionary:{compiled_path}. Rebuilding it. Error:{e}")
+        return None
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def create_fix_version_info_from_compiled(fix_version: str, compiled_path: str) -> FixVersionInfo:
+    with open(compiled_path, 'rb') as fd:
+        tags, blocks, block_names, block_count_tags = pickle.load(fd)
+
+    fix_version_info = FixVersionInfo(fix_version)
+    for tag_id, name, tag_type, desc, values in tags:
+        fix_version_info.fix_tags_by_tag_id[tag_id] = \
+            FixTag(tag_id, name, tag_type, desc, {value[0]: FixTagValue(*value) for value in values})
+    for block_id, name, count_tag, start_tag, components, tag_ids in blocks:
+        components_by_position = {component[3]: FixComponent(*component) for component in components}
+        fix_version_info.fix_blocks_by_id[block_id] = \
+            FixBlock(block_id, name, count_tag, start_tag, components_by_position, set(tag_ids))
+    fix_blocks_by_id = fix_version_info.fix_blocks_by_id
+    fix_version_info.fix_blocks_by_name = {name: fix_blocks_by_id[block_id] for name, block_id in block_names}
+    fix_version_info.fix_blocks_by_count_tag = {tag: fix_blocks_by_id[block_id] for tag, block_id in block_count_tags}
+
+    return fix_version_info
+
+
+def save_compiled_fix_version_info(fix_version_info: FixVersionInfo, definitions_hash: str) -> None:
+    tags = [(t.id, t.name, t.type, t.desc, tuple((v.value, v.name, v.desc) for v in t.values.values()))
+            for t in fix_version_info.fix_tags_by_tag_id.values()]
+    blocks = [(b.id, b.name, b.count_tag, b.start_tag,
+               tuple((c.id, c.tag, c.indent, c.position) for c in b.components_by_position.values()),
+               tuple(b.tag_ids))
+              for b in fix_version_info.fix_blocks_by_id.values()]
+    block_names = [(name, b.id) for name, b in fix_version_info.fix_blocks_by_name.items()]
+    block_count_tags = [(tag, b.id) for tag, b in fix_version_info.fix_blocks_by_count_tag.items()]
+
+    compiled_path = get_compiled_fix_version_info_path(fix_version_info.version, definitions_hash)
+    try:
+        os.makedirs(os.path.dirname(compiled_path), exist_ok=True)
+        # remove the compiled files for this version that are now stale
+        for stale_path in glob.glob(get_compiled_fix_version_info_path(fix_version_info.version)):
+            os.remove(stale_path)
+        # write to a temp file first so that concurrent processes never read a partial file
+        tmp_path = f"{compiled_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as fd:
+            pickle.dump((tags, blocks, block_names, block_count_tags), fd, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, compiled_path)
+    except Exception as e:
+        print(f"ERROR: can't save compiled FIX dictionary:{compiled_path}. Error:{e}")
+
+
+def extract_info_for_fix_version_from_xml(fix_version: str, additional_tag_dict: Dict[str, FixTag]) -> FixVersionInfo:
     fix_version_info = FixVersionInfo(fix_version)
 
     # Extract all FIX tags from Fields XML file
-    fields = extract_elements_from_file_by_tag_name(fix_version, "Fields.xml", "Field")
-    for field_ in fields:
-        tag_id, name, tag_type, desc = extract_tag_data_from_xml_field(field_)
+    fields = extract_items_from_file_by_tag_name(fix_version, "Fields.xml", "Field",
+                                                 ['Tag', 'Name', 'Type', 'Description'])
+    for tag_id, name, tag_type, desc in fields:
         fix_version_info.fix_tags_by_tag_id[tag_id] = FixTag(tag_id, name, tag_type, desc, {})
 
     # Extract all FIX tag values from Enums XML file and attach them to the tag dictionary
-    enums = extract_elements_from_file_by_tag_name(fix_version, "Enums.xml", "Enum")
-    for enum in enums:
-        tag_id, name, value, desc = extract_tag_data_from_xml_enum(enum)
+    enums = extract_items_from_file_by_tag_name(fix_version, "Enums.xml", "Enum",
+                                                ['Tag', 'SymbolicName', 'Value', 'Description'])
+    for tag_id, name, value, desc in enums:
         fix_tag_value = FixTagValue(value, name, desc)
         if tag_id in fix_version_info.fix_tags_by_tag_id:
             fix_version_info.fix_tags_by_tag_id[tag_id].values[value] = fix_tag_value
@@ -402,7 +584,6 @@ def extract_info_for_fix_version(fix_version=DEFAULT_FIX_VERSION) -> FixVersionI
             #            print(f"ERROR: id:{id} for name:{name}, value:{value}, desc:{desc} doesn't exist")
             pass
 
-    additional_tag_dict = check_for_additional_fix_definitions()
     if len(additional_tag_dict):
         add_additional_tag_dict(additional_tag_dict, fix_version_info.fix_tags_by_tag_id)
 
@@ -460,18 +641,17 @@ def extract_info_for_fix_version(fix_version=DEFAULT_FIX_VERSION) -> FixVersionI
 #   (5 more repeated group starting with 448)
 def extract_fix_blocks_for_fix_version(fix_version_info: FixVersionInfo) -> None:
     # Parse the Components and MsgContents XML file to get all groups/blocks and their components
-    blocks = extract_elements_from_file_by_tag_name(fix_version_info.version, "Components.xml", "Component")
-    for block in blocks:
-        block_id, block_type, name = extract_tag_data_from_xml(block, ['ComponentID', 'ComponentType', 'Name'])
+    blocks = extract_items_from_file_by_tag_name(fix_version_info.version, "Components.xml", "Component",
+                                                 ['ComponentID', 'ComponentType', 'Name'])
+    for block_id, block_type, name in blocks:
         if block_type == 'BlockRepeating' or block_type == 'ImplicitBlockRepeating':
             fix_block = FixBlock(block_id, name, '', '', {})
             fix_version_info.fix_blocks_by_id[block_id] = fix_block
             fix_version_info.fix_blocks_by_name[name] = fix_block
 
-    components = extract_elements_from_file_by_tag_name(fix_version_info.version, "MsgContents.xml", "MsgContent")
-    for component in components:
-        block_id, tag, indent, position = extract_tag_data_from_xml(component,
-                                                                    ['ComponentID', 'TagText', 'Indent', 'Position'])
+    components = extract_items_from_file_by_tag_name(fix_version_info.version, "MsgContents.xml", "MsgContent",
+                                                     ['ComponentID', 'TagText', 'Indent', 'Position'])
+    for block_id, tag, indent, position in components:
         if block_id in fix_version_info.fix_blocks_by_id:
             fix_component = FixComponent(block_id, tag, indent, position)
             fix_block = add_fix_component_as_fix_block(fix_version_info, fix_component)
@@ -558,7 +738,7 @@ def save_tag_dict_to_json_file(tag_dict_, json_file):
 def determine_fix_version(str_fix_lines):
     for line in str_fix_lines:
         # FIX.4.2 | FIXT.1.1
-        match = re.search(VERSION_RE, line)
+        match = VERSION_PATTERN.search(line)
         if match:
             version = match.group(1)
             return version
@@ -572,14 +752,14 @@ def determine_fix_version(str_fix_lines):
 
 
 def get_kv_parts_from_line(line: str) -> Tuple[str, List[str], str, str, str]:
-    match = re.search(VERSION_RE, line)
+    match = VERSION_PATTERN.search(line) if '8=FIX' in line else None
     if not match:
         comment = command = ''
-        comment_match = re.search(r'#\s*(.*)', line)
+        comment_match = COMMENT_PATTERN.search(line)
         if comment_match:
             comment = comment_match.group(1)
         else:
-            command_match = re.search(r'^\s*!\s*(.*)', line, re.IGNORECASE)
+            command_match = COMMAND_PATTERN.search(line)
             command = command_match.group(1) if command_match else ''
 
         return '', [], '', comment, command
@@ -599,21 +779,32 @@ def get_kv_parts_from_line(line: str) -> Tuple[str, List[str], str, str, str]:
 # to be used later for formatting
 def encode_key_for_fix_tags(tag_id: str, block_start: FixBlock = None, block_count: int = 0,
                             inner_block_start: FixBlock = None, inner_block_count: int = 0) -> str:
-    key = None
     if block_start:
-        key = f'{int(block_start.count_tag):06} {block_count:02}'
-        if inner_block_start:
-            key += f' {int(inner_block_start.count_tag):06} {inner_block_count:02}'
-    if key:
-        key += ' ' + simple_tag_id_encoding(tag_id)
+        return encode_block_key_prefix(block_start, block_count, inner_block_start, inner_block_count) + \
+            simple_tag_id_encoding(tag_id)
     else:
-        key = simple_tag_id_encoding(tag_id)
+        return simple_tag_id_encoding(tag_id)
+
+
+def encode_block_key_prefix(block_start: FixBlock, block_count: int,
+                            inner_block_start: FixBlock = None, inner_block_count: int = 0) -> str:
+    key_prefix = f'{int(block_start.count_tag):06} {block_count:02} '
+    if inner_block_start:
+        key_prefix += f'{int(inner_block_start.count_tag):06} {inner_block_count:02} '
+
+    return key_prefix
+
 
-    return key
+# The same few hundred tag ids are encoded over and over
+Simple_tag_id_encoding_cache: Dict[str, str] = {}
 
 
 def simple_tag_id_encoding(tag_id: str) -> str:
-    return f'{int(tag_id):06}'
+    encoded_tag_id = Simple_tag_id_encoding_cache.get(tag_id)
+    if encoded_tag_id is None:
+        encoded_tag_id = Simple_tag_id_encoding_cache[tag_id] = f'{int(tag_id):06}'
+
+    return encoded_tag_id
 
 
 def decode_key_for_fix_tags(key: str) -> Tuple[str, str]:
@@ -647,54 +838,55 @@ def parse_fix_line_into_kvs(line: str, fix_version_info: FixVersionInfo) -> Tupl
     _, kv_parts, separator, comment, _ = get_kv_parts_from_line(line)
 
     kvs = {}
-    fix_tags_by_tag_id = fix_version_info.fix_tags_by_tag_id
+    decorated_values_by_tag_id = fix_version_info.get_decorated_values_by_tag_id()
     fix_blocks_by_count_tag = fix_version_info.fix_blocks_by_count_tag
     current_block, current_inner_block = None, None
     current_block_count, current_inner_block_count = 0, 0
+    # block part of the key, to be re-encoded (lazily) whenever the current block/inner block or their count change
+    block_key_prefix = None
     for kv_part in kv_parts:
         if kv_part:
-            kv = re.search(r"^(\d+)=(.*)", kv_part)
-            if kv:
-                tag_id, value = kv.group(1, 2)
-                if tag_id in fix_tags_by_tag_id and value in fix_tags_by_tag_id[tag_id].values:
-                    value = f"{value} ({fix_tags_by_tag_id[tag_id].values[value].name})"
+            tag_id, equal_sign, value = kv_part.partition('=')
+            if equal_sign and tag_id.isdecimal():
+                decorated_values = decorated_values_by_tag_id.get(tag_id)
+                if decorated_values:
+                    value = decorated_values.get(value, value)
 
                 # it's hard to determine when a block (or inner block) is done until we reach the next unrelated tag
                 if current_inner_block and tag_id not in current_inner_block.tag_ids:
-                    current_inner_block = None
+                    current_inner_block = block_key_prefix = None
                 if not current_inner_block and current_block and tag_id not in current_block.tag_ids:
-                    current_block = None
+                    current_block = block_key_prefix = None
 
                 if tag_id in fix_blocks_by_count_tag:
                     # starts of a block or inner block
-                    if current_block:
-                        if tag_id in current_block.tag_ids:
-                            current_inner_block = fix_blocks_by_count_tag[tag_id]
-                            current_inner_block_count = 0
-                        else:
-                            current_block = fix_blocks_by_count_tag[tag_id]
-                            current_block_count = 0
+                    if current_block and tag_id in current_block.tag_ids:
+                        current_inner_block = fix_blocks_by_count_tag[tag_id]
+                        current_inner_block_count = 0
                     else:
                         current_block = fix_blocks_by_count_tag[tag_id]
                         current_block_count = 0
+                    block_key_prefix = None
 
                 if current_block:
                     if tag_id == current_block.start_tag:
                         current_block_count += 1
+                        block_key_prefix = None
 
                     if current_inner_block and tag_id == current_inner_block.start_tag:
                         current_inner_block_count += 1
+                        block_key_prefix = None
 
-                    key = encode_key_for_fix_tags(tag_id, current_block, current_block_count,
-                                                  current_inner_block, current_inner_block_count)
-
+                    if block_key_prefix is None:
+                        block_key_prefix = encode_block_key_prefix(current_block, current_block_count,
+                                                                   current_inner_block, current_inner_block_count)
+                    key = block_key_prefix + simple_tag_id_encoding(tag_id)
                 else:
-                    key = encode_key_for_fix_tags(tag_id)
+                    key = simple_tag_id_encoding(tag_id)
 
                 kvs[key] = value
             else:
                 print(f"ERROR: can't tokenize:'{kv_part}' into a key=value pair using separator:'{separator}'")
-    #    print(f"{fix_line}:\n\t{kvs}")
 
     return kvs, comment
 
@@ -734,32 +926,145 @@ def extract_timestamp(line, fix_tags=None):
             return None, error
 
 
-def extract_fix_lines_from_str_lines(str_fix_lines: List[str]):
+# The optional fix_filter (see fix_filter.FixFilter) only keeps the FIX lines matching it
+def extract_fix_lines_from_str_lines(str_fix_lines: List[str], fix_filter=None):
     if len(str_fix_lines):
         version = extract_version_from_first_fix_line(str_fix_lines)
         if version:
             fix_version_info = extract_info_for_fix_version(version)
-            used_fix_tags = {}
-            fix_lines = []
-            previous_line_comment = ''
-            for line in str_fix_lines:
-                if line is not None and len(line) > 0 and not line.isspace():
-                    fix_tags, comment = parse_fix_line_into_kvs(line.strip(), fix_version_info)
-                    if fix_tags:
-                        timestamp, error = extract_timestamp(line, fix_tags)
-                        if timestamp:
-                            for fix_tag_key in fix_tags.keys():
-                                used_fix_tags[fix_tag_key] = 1
-                            fix_lines.append((timestamp, fix_tags, previous_line_comment))
-                        else:
-                            print(error)
-                    previous_line_comment = comment
+            fix_lines = list(iter_fix_lines_from_str_lines(str_fix_lines, fix_version_info, fix_filter=fix_filter))
+            used_fix_tags = get_used_fix_tags(fix_lines)
 
             return fix_version_info.fix_tags_by_tag_id, fix_lines, used_fix_tags, version
 
     return {}, [], {}, None
 
 
+def get_used_fix_tags(fix_lines: List[Tuple[str, Dict[str, str], str]]) -> Dict[str, int]:
+    used_fix_tags = {}
+    for _, fix_tags, _ in fix_lines:
+        for fix_tag_key in fix_tags.keys():
+            used_fix_tags[fix_tag_key] = 1
+
+    return used_fix_tags
+
+
+# Lazily parse the lines and yield a (timestamp, fix_tags, comment) tuple for each FIX line.
+# The previous_line_comment is the comment of the line preceding the first one, if it's known
+def iter_fix_lines_from_str_lines(str_fix_lines: Iterable[str], fix_version_info: FixVersionInfo,
+                                  previous_line_comment: str = '', fix_filter=None) -> \
+        Iterator[Tuple[str, Dict[str, str], str]]:
+    for line in str_fix_lines:
+        if line is not None and len(line) > 0 and not line.isspace():
+            if fix_filter and not fix_filter.matches(line):
+                # a FIX line: it doesn't carry any comment
+                previous_line_comment = ''
+                continue
+            fix_tags, comment = parse_fix_line_into_kvs(line.strip(), fix_version_info)
+            if fix_tags:
+                timestamp, error = extract_timestamp(line, fix_tags)
+                if timestamp:
+                    yield timestamp, fix_tags, previous_line_comment
+                else:
+                    print(error)
+            previous_line_comment = comment
+
+
+# Streaming equivalent of extract_fix_lines_from_str_lines(): the lines are read and parsed lazily and returned in
+# chunks of (up to) chunk_size FIX lines, each with its own used_fix_tags, so that memory usage is bounded
+# by the chunk size rather than by the number of lines.
+def extract_fix_line_chunks_from_str_lines(str_fix_lines: Iterable[str], chunk_size: int, fix_filter=None):
+    str_fix_lines = iter(str_fix_lines)
+    # the lines up to the one that determines the FIX version must be kept to be parsed once it's known
+    version = None
+    first_lines = []
+    for line in str_fix_lines:
+        first_lines.append(line)
+        version = determine_fix_version([line])
+        if version:
+            break
+    if not version:
+        return
+
+    fix_version_info = extract_info_for_fix_version(version)
+    fix_lines = []
+    used_fix_tags = {}
+    for fix_line in iter_fix_lines_from_str_lines(chain(first_lines, str_fix_lines), fix_version_info,
+                                                  fix_filter=fix_filter):
+        fix_lines.append(fix_line)
+        for fix_tag_key in fix_line[1].keys():
+            used_fix_tags[fix_tag_key] = 1
+        if len(fix_lines) == chunk_size:
+            yield fix_version_info.fix_tags_by_tag_id, fix_lines, used_fix_tags, version
+            fix_lines = []
+            used_fix_tags = {}
+
+    if fix_lines:
+        yield fix_version_info.fix_tags_by_tag_id, fix_lines, used_fix_tags, version
+
+
+# Split the bytes (of a log file, a mmap, an HTTP body...) into lines without decoding them
+def iter_byte_lines(data: Union[bytes, mmap.mmap], start: int = 0, end: int = None) -> Iterator[bytes]:
+    data_end = len(data) if end is None else end
+    while start < data_end:
+        line_end = data.find(b'\n', start, data_end)
+        if line_end < 0:
+            line_end = data_end
+        yield data[start:line_end]
+        start = line_end + 1
+
+
+# Comment of the last non-blank line, or the default comment if there's none. The lines are either a list of lines or
+# the bytes (e.g. an mmap) of the lines ending before the end offset
+def get_comment_of_last_line(lines: Union[List[str], bytes, mmap.mmap], default_comment: str = '',
+                             end: int = None) -> str:
+    for line in (reversed(lines) if isinstance(lines, list) else iter_byte_lines_backwards(lines, end)):
+        line = line.strip()
+        if line:
+            if isinstance(line, bytes):
+                line = line.decode(errors='replace')
+            _, _, _, comment, _ = get_kv_parts_from_line(line)
+            return comment
+
+    return default_comment
+
+
+def iter_byte_lines_backwards(data: Union[bytes, mmap.mmap], end: int = None) -> Iterator[bytes]:
+    end = len(data) if end is None else end
+    while end > 0:
+        line_end = end - 1 if data[end - 1:end] == b'\n' else end
+        line_start = data.rfind(b'\n', 0, line_end) + 1
+        yield data[line_start:line_end]
+        end = line_start
+
+
+# Only decode the lines that matter to the parsing: FIX lines, #comments and !commands. Any other line is skipped
+# without being decoded unless it follows a #comment line since it then resets that comment.
+# With a fix_filter, the FIX lines that can't match it are skipped as well (with the same exception).
+# previous_line_has_comment tells whether the line preceding the first one, if any, has a #comment.
+def iter_str_lines_from_byte_lines(byte_lines: Iterable[bytes], encoding: str = DEFAULT_ENCODING,
+                                   fix_filter=None, previous_line_has_comment: bool = False) -> Iterator[str]:
+    for line in byte_lines:
+        if FIX_LINE_SIGNATURE in line:
+            if fix_filter is None or previous_line_has_comment or fix_filter.might_match(line):
+                yield line.decode(encoding, errors='replace')
+            previous_line_has_comment = False
+        elif b'#' in line:
+            yield line.decode(encoding, errors='replace')
+            previous_line_has_comment = True
+        elif b'!' in line or (previous_line_has_comment and line.strip()):
+            yield line.decode(encoding, errors='replace')
+            previous_line_has_comment = False
+
+
+def decode_fix_lines_from_bytes(data: Union[bytes, mmap.mmap], encoding: str = DEFAULT_ENCODING) -> List[str]:
+    return list(iter_str_lines_from_byte_lines(iter_byte_lines(data), encoding))
+
+
+def extract_fix_lines_from_bytes(data: Union[bytes, mmap.mmap], encoding: str = DEFAULT_ENCODING):
+    return extract_fix_lines_from_str_lines(decode_fix_lines_from_bytes(data, encoding))
+
+
 def create_tag_set(tags_str: str) -> Set[str]:
     if tags_str and len(tags_str):
         tag_set = set(tags_str.split())
@@ -792,9 +1097,8 @@ def obfuscate_tag_values_in_line(line: str, obfuscate_tags: Set[str]) -> str:
     obfuscated_kvs: List = list()
     for kv_part in kv_parts:
         if kv_part:
-            kv = re.search(r"^(\d+)=(.*)", kv_part)
-            if kv:
-                tag_id, value = kv.group(1, 2)
+            tag_id, equal_sign, value = kv_part.partition('=')
+            if equal_sign and tag_id.isdecimal():
                 if tag_id in obfuscate_tags:
                     obfuscated_value = '*' * len(value)
                     kv_part = '='.join((tag_id, obfuscated_value))
@@ -811,18 +1115,29 @@ def obfuscate_tag_values_in_line(line: str, obfuscate_tags: Set[str]) -> str:
     return obfuscated_line
 
 
-def create_header_for_fix_lines(fix_lines: str, show_date: bool) -> List[str]:
+# What the Δ/Σ of the next header depend on, to carry them over from one grid to the next one
+@dataclass
+class HeaderState:
+    previous_timestamp: Union[str, None] = None
+    delta_total_ns: int = 0
+
+
+def create_header_for_fix_lines(fix_lines: str, show_date: bool, header_state: HeaderState = None) -> List[str]:
+    if header_state is None:
+        header_state = HeaderState()
     headers = ['TAG_ID', 'TAG_NAME']
-    previous_timestamp = None
-    delta_total = timedelta()
+    previous_timestamp = header_state.previous_timestamp
+    delta_total_ns = header_state.delta_total_ns
     for (timestamp, fix_tags, _) in fix_lines:
         if show_date is False:
             timestamp = remove_date_from_datetime(timestamp)
-        timestamp_with_delta, delta = get_timestamp_with_delta(timestamp, previous_timestamp, delta_total)
-        if delta:
-            delta_total = delta_total + delta
+        timestamp_with_delta, delta_ns = get_timestamp_with_delta_ns(timestamp, previous_timestamp, delta_total_ns)
+        if delta_ns:
+            delta_total_ns += delta_ns
         previous_timestamp = timestamp
         headers.append(timestamp_with_delta)
+    header_state.previous_timestamp = previous_timestamp
+    header_state.delta_total_ns = delta_total_ns
 
     return headers
 
@@ -844,11 +1159,28 @@ def create_comment_row(fix_lines) -> Union[None, List[str]]:
     return cols if comments_are_present else None
 
 
+# The values of the FIX lines by key (column), built in one pass over the values actually present in the lines
+# instead of looking up every used key in every line
+def create_fix_columns(fix_lines) -> Dict[str, List[str]]:
+    line_count = len(fix_lines)
+    columns = {}
+    for line_index, (_, fix_tags, _) in enumerate(fix_lines):
+        for key, value in fix_tags.items():
+            column = columns.get(key)
+            if column is None:
+                column = columns[key] = [''] * line_count
+            column[line_index] = value
+
+    return columns
+
+
 def create_fix_lines_grid(fix_tag_dict, fix_lines, used_fix_tags,
                           with_session_level_tags=True, top_header_tags=[],
-                          show_date=False, transpose=False):
+                          show_date=False, transpose=False, header_state: HeaderState = None):
     top_header_tags = [simple_tag_id_encoding(fix_tag) for fix_tag in top_header_tags]
     comment_rows = create_comment_row(fix_lines)
+    columns = create_fix_columns(fix_lines)
+    empty_column = [''] * len(fix_lines)
     rows = []
     for key in (*top_header_tags, *sorted(used_fix_tags)):
         fix_tag, formatted_fix_tag = decode_key_for_fix_tags(key)
@@ -858,15 +1190,12 @@ def create_fix_lines_grid(fix_tag_dict, fix_lines, used_fix_tags,
             fix_tag_name = fix_tag_dict[fix_tag].name
         else:
             fix_tag_name = '???'
-        cols = [formatted_fix_tag, fix_tag_name]
-        for (_, fix_tags, comment) in fix_lines:
-            value = fix_tags[key] if key in fix_tags else ''
-            if 'time' in fix_tag_name.lower() and show_date is False:
-                value = remove_date_from_datetime(value)
-            cols.append(value)
-        rows.append(cols)
+        values = columns.get(key, empty_column)
+        if 'time' in fix_tag_name.lower() and show_date is False:
+            values = [remove_date_from_datetime(value) if value else value for value in values]
+        rows.append([formatted_fix_tag, fix_tag_name, *values])
 
-    headers = create_header_for_fix_lines(fix_lines, show_date)
+    headers = create_header_for_fix_lines(fix_lines, show_date, header_state)
 
     if transpose:
         headers, rows = transpose_data_grid(headers, rows)
@@ -874,14 +1203,19 @@ def create_fix_lines_grid(fix_tag_dict, fix_lines, used_fix_tags,
     return headers, rows, comment_rows
 
 
-def transpose_data_grid(headers, rows):
-    transposed = []
-    for c in range(len(headers)):
-        row = [headers[c]]
-        for r in range(len(rows)):
-            row.append(rows[r][c])
-        transposed.append(row)
+# The grid of a web page out of its raw lines in one picklable call, e.g. to have it created by another process:
+# (headers, rows, comment_row, FIX line count, lookup URL template)
+def create_fix_lines_grid_from_str_lines(str_fix_lines: List[str], show_date=False, transpose=False):
+    fix_tag_dict, fix_lines, used_fix_tags, fix_version = extract_fix_lines_from_str_lines(str_fix_lines)
+    headers, rows, comment_row = create_fix_lines_grid(fix_tag_dict, fix_lines, used_fix_tags,
+                                                       with_session_level_tags=False,
+                                                       show_date=show_date, transpose=transpose)
+
+    return headers, rows, comment_row, len(fix_lines), get_lookup_url_template_for_js(fix_version)
 
+
+def transpose_data_grid(headers, rows):
+    transposed = [list(row) for row in zip(headers, *rows)]
     transposed_headers = transposed.pop(0)
 
     return transposed_headers, transposed
@@ -889,64 +1223,41 @@ def transpose_data_grid(headers, rows):
 
 def remove_date_from_datetime(dt_str):
     # assume that the format is ISO 8601-ish and strip anything before the hh:mm:ss
-    found_timestamp = re.search(r'(\d+:\d+:\d+.*)', dt_str)
+    found_timestamp = TIME_OF_DAY_PATTERN.search(dt_str)
     if found_timestamp:
         return found_timestamp.group(1)
     else:
         return dt_str
 
 
-def extract_dt_from_timestamp(timestamp: str) -> datetime:
-    timestamp = remove_date_from_datetime(timestamp)
-    if '.' in timestamp:
-        dt_format = '%H:%M:%S.%f'
-    elif ',' in timestamp:
-        dt_format = '%H:%M:%S,%f'
-    else:
-        dt_format = '%H:%M:%S'
+def get_timestamp_with_delta(timestamp: str, previous_timestamp: Union[str, None], delta_total: timedelta = None) -> \
+        Union[str, Tuple[str, Union[timedelta, None]]]:
+    if delta_total is None:
+        if previous_timestamp:
+            try:
+                delta_ns = compute_delta_ns(parse_timestamp(timestamp), parse_timestamp(previous_timestamp))
+                return f"{timestamp}\n({format_delta(delta_ns)})"
+            except Exception as e:
+                return f"{timestamp}\n(??? {e} ???)"
+        return timestamp
 
-    return datetime.strptime(timestamp, dt_format)
+    delta_total_ns = (delta_total // timedelta(microseconds=1)) * NS_PER_US
+    timestamp_with_delta, delta_ns = get_timestamp_with_delta_ns(timestamp, previous_timestamp, delta_total_ns)
 
+    return timestamp_with_delta, None if delta_ns is None else timedelta(microseconds=delta_ns // NS_PER_US)
 
-def get_timestamp_with_delta(timestamp: str, previous_timestamp: Union[str, None], delta_total: timedelta = None) -> \
-        Union[str, Tuple[str, Union[timedelta, None]]]:
+
+# Same as get_timestamp_with_delta() with a running total of the deltas, all in nanoseconds
+def get_timestamp_with_delta_ns(timestamp: str, previous_timestamp: Union[str, None], delta_total_ns: int) -> \
+        Tuple[str, Union[int, None]]:
     if previous_timestamp:
         try:
-            dt = extract_dt_from_timestamp(timestamp)
-            previous_dt = extract_dt_from_timestamp(previous_timestamp)
-            delta = dt - previous_dt
-            delta_in_hhmmssus = convert_delta_into_hhmmssus(delta)
-
-            if delta_total is None:
-                return f"{timestamp}\n({delta_in_hhmmssus})"
-            else:
-                delta_total = delta_total + delta
-                delta_total_in_us_in_hhmmssus = convert_delta_into_hhmmssus(delta_total)
-                return f"{timestamp}\nΔ:{delta_in_hhmmssus}\nΣ:{delta_total_in_us_in_hhmmssus}", delta
-
+            delta_ns = compute_delta_ns(parse_timestamp(timestamp), parse_timestamp(previous_timestamp))
+            return f"{timestamp}\nΔ:{format_delta(delta_ns)}\nΣ:{format_delta(delta_total_ns + delta_ns)}", delta_ns
         except Exception as e:
             timestamp = f"{timestamp}\n(??? {e} ???)"
 
-    return timestamp if delta_total is None else (timestamp, None)
-
-
-def convert_delta_into_hhmmssus(delta: timedelta) -> str:
-    sign = '-' if delta.total_seconds() < 0 else '+'
-    delta_df = datetime(2000, 1, 1) + abs(delta)
-    delta_in_hhmmssus = delta_df.strftime('%H:%M:%S.%f')
-    delta_in_hhmmssus = re.sub(r"^[0:]+", "", delta_in_hhmmssus)  # strip leading 0:'s
-
-    # if usecs > 1000 add a comma
-    usecs_match = re.search(r'(\d{4,})$', delta_in_hhmmssus)
-    if usecs_match:
-        usecs = int(usecs_match.group(1))
-        if usecs > 0 and usecs % 1_000 > 0:
-            usecs_with_commas = "{:0=7,}".format(usecs)
-            delta_in_hhmmssus = re.sub(r'(\d+)$', usecs_with_commas, delta_in_hhmmssus)
-        else:
-            delta_in_hhmmssus = re.sub(r"[0.,]+$", "", delta_in_hhmmssus)  # strip trailing 0's
-
-    return sign + delta_in_hhmmssus
+    return timestamp, None
 
 
 def display_fix_blocks(fix_version_info: FixVersionInfo):
@@ -956,15 +1267,20 @@ def display_fix_blocks(fix_version_info: FixVersionInfo):
             print(f"\t{position} -> {fix_component}")
 
 
-def create_table_from_fix_lines(fix_lines: List[str], grid_style: str = 'psql') -> str:
-    fix_tag_dict, fix_lines, used_fix_tags, _ = extract_fix_lines_from_str_lines(fix_lines)
+def create_table_from_fix_lines(fix_lines: List[str], grid_style: str = 'psql', fix_filter=None) -> str:
+    fix_tag_dict, fix_lines, used_fix_tags, _ = extract_fix_lines_from_str_lines(fix_lines, fix_filter)
     if len(used_fix_tags) == 0:
         print("Could not find FIX lines.")
         exit(1)
 
+    return create_table_from_parsed_fix_lines(fix_tag_dict, fix_lines, used_fix_tags, grid_style)
+
+
+def create_table_from_parsed_fix_lines(fix_tag_dict, fix_lines, used_fix_tags, grid_style: str = 'psql',
+                                       header_state: HeaderState = None) -> str:
     top_header_tags = [FIX_TAG_ID_SENDER_COMP_ID, FIX_TAG_ID_TARGET_COMP_ID]
     headers, rows, comment_row = create_fix_lines_grid(fix_tag_dict, fix_lines, used_fix_tags,
-                                                       top_header_tags=top_header_tags)
+                                                       top_header_tags=top_header_tags, header_state=header_state)
     if comment_row:
         rows.insert(0, comment_row)
         rows.insert(1, tabulate.SEPARATING_LINE)
@@ -983,12 +1299,29 @@ def get_version():
     return version("fixations")
 
 
+def get_memory_usage() -> Dict[str, int]:
+    # Memory usage of the current process in kB.
+    # Pss (proportional set size) divides the pages shared with other processes, e.g. gunicorn workers,
+    # by the number of processes sharing them which makes it the best number to size a pod.
+    memory_usage = {}
+    try:
+        with open('/proc/self/smaps_rollup') as fd:
+            for line in fd:
+                key, _, value = line.partition(':')
+                if key in ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty'):
+                    memory_usage[f"{key.lower()}_kb"] = int(value.split()[0])
+    except OSError:
+        # not on Linux: only the peak RSS is available (in kB on Linux but in bytes on macOS)
+        memory_usage['max_rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return memory_usage
+
+
 # -- Configuration --------
 Cfg = configparser.ConfigParser()
 cfg_init()
 
 if __name__ == '__main__':
-    # TODO: extract_info_for_all_fix_versions needs more test
     start_time = time.perf_counter()
     fix_version_info = extract_info_for_all_fix_versions()
     print(f"Elapsed time: {time.perf_counter() - start_time} seconds")
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# Presence of the FIX tags and of their enum values across the FIX versions, e.g. for fix_explore:
+#  . each tag, and each of its enum values, has the bitmap of the versions it appears in (bit i for the i-th of
+#    fix_versions) so that which versions have a tag, or what was added/removed between two versions, are just
+#    bitwise operations
+#  . the fields of a tag (name, type, description) and of an enum value (name, description) are stored once per
+#    variant, i.e. per run of versions sharing them, along with the bitmap of these versions, the oldest first
+#  . it's built once from all the available versions and saved in the data dir next to the compiled versions. It's
+#    rebuilt as soon as any of their XML files (size or modification time) or the additional FIX definitions change
+import gc
+import glob
+import hashlib
+import os
+import pickle
+import sys
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Tuple, Union
+
+from fixations.fix_utils import FixTag, FixTagValue, FixTagValueClash, COMPILED_DICTIONARY_DIR_NAME, \
+    extract_info_for_fix_version, get_list_of_available_fix_versions, check_for_additional_fix_definitions, \
+    get_data_dir_path, update_hash_with_fix_definition_file_stats
+
+FIX_VERSION_MATRIX_FORMAT_VERSION = 1
+
+# (fields, version mask) where the fields are (name, type, desc) for a tag and (name, desc) for an enum value
+Variants = List[Tuple[Tuple[str, ...], int]]
+
+
+@dataclass
+class FixVersionDiff:
+    old_fix_version: str
+    new_fix_version: str
+    added_tag_ids: List[str] = field(default_factory=list)
+    removed_tag_ids: List[str] = field(default_factory=list)
+    # the name, type or description changed
+    changed_tag_ids: List[str] = field(default_factory=list)
+    # the enum values of the tags in both versions: (tag id, value, name) and (tag id, value, old name, new name)
+    added_values: List[Tuple[str, str, str]] = field(default_factory=list)
+    removed_values: List[Tuple[str, str, str]] = field(default_factory=list)
+    renamed_values: List[Tuple[str, str, str, str]] = field(default_factory=list)
+
+
+@dataclass
+class FixVersionMatrix:
+    fix_versions: List[str]
+    # tag id -> version mask, sorted by tag id
+    tag_version_masks: Dict[str, int]
+    tag_variants: Dict[str, Variants]
+    # tag id -> {value -> version mask}, sorted by value
+    value_version_masks: Dict[str, Dict[str, int]]
+    value_variants: Dict[str, Dict[str, Variants]]
+
+    def get_version_mask(self, fix_versions: Union[None, List[str]] = None) -> int:
+        if fix_versions is None:
+            return (1 << len(self.fix_versions)) - 1
+
+        version_mask = 0
+        for fix_version in fix_versions:
+            version_mask |= 1 << self.fix_versions.index(fix_version)
+
+        return version_mask
+
+    def get_versions(self, version_mask: int) -> List[str]:
+        return [fix_version for bit, fix_version in enumerate(self.fix_versions) if version_mask >> bit & 1]
+
+    # The ids of the tags in any of the versions, in tag id order
+    def get_tag_ids(self, version_mask: int) -> List[str]:
+        return [fix_tag_id for fix_tag_id, tag_version_mask in self.tag_version_masks.items()
+                if tag_version_mask & version_mask]
+
+    # The (name, type, desc) of the tag in the newest of the versions that has it
+    def get_tag_fields(self, fix_tag_id: str, version_mask: int) -> Union[Tuple[str, ...], None]:
+        return get_newest_fields(self.tag_variants[fix_tag_id], version_mask)
+
+    # The tag as it is in the newest of the versions that has it, with the enum values of all the versions (each as it
+    # is in the newest one that has it), i.e. the tag of these versions merged. The values are sorted
+    def get_fix_tag(self, fix_tag_id: str, version_mask: int) -> Union[FixTag, None]:
+        tag_fields = self.get_tag_fields(fix_tag_id, version_mask)
+        if tag_fields is None:
+            return None
+
+        values: Dict[str, FixTagValue] = {}
+        value_variants = self.value_variants[fix_tag_id]
+        for value, value_version_mask in self.value_version_masks[fix_tag_id].items():
+            if value_version_mask & version_mask:
+                values[value] = FixTagValue(value, *get_newest_fields(value_variants[value], version_mask))
+
+        return FixTag(fix_tag_id, *tag_fields, values)
+
+    # The (value, name) of the tag's enum values in the version, sorted by value
+    def get_values(self, fix_tag_id: str, fix_version: str) -> List[Tuple[str, str]]:
+        version_mask = self.get_version_mask([fix_version])
+        value_variants = self.value_variants[fix_tag_id]
+
+        return [(value, get_newest_fields(value_variants[value], version_mask)[0])
+                for value, value_version_mask in self.value_version_masks[fix_tag_id].items()
+                if value_version_mask & version_mask]
+
+    # The enum values that changed name from one version to a newer one, as found when merging them oldest first
+    def get_value_clashes(self, version_mask: int) -> List[FixTagValueClash]:
+        clashes: List[Tuple[int, int, str, FixTagValueClash]] = []
+        for tag_order, (fix_tag_id, value_variants_by_value) in enumerate(self.value_variants.items()):
+            for value, value_variants in value_variants_by_value.items():
+                previous_name = None
+                for (name, _), value_version_mask in value_variants:
+                    value_version_mask &= version_mask
+                    if not value_version_mask:
+                        continue
+                    if previous_name is not None and name != previous_name:
+                        bit = (value_version_mask & -value_version_mask).bit_length() - 1
+                        clashes.append((bit, tag_order, value, FixTagValueClash(fix_tag_id, value, previous_name,
+                                                                                self.fix_versions[bit], name)))
+                    previous_name = name
+
+        return [clash for _, _, _, clash in sorted(clashes, key=lambda clash: clash[:3])]
+
+    def diff(self, old_fix_version: str, new_fix_version: str) -> FixVersionDiff:
+        old_version_mask = self.get_version_mask([old_fix_version])
+        new_version_mask = self.get_version_mask([new_fix_version])
+        fix_version_diff = FixVersionDiff(old_fix_version, new_fix_version)
+        for fix_tag_id, tag_version_mask in self.tag_version_masks.items():
+            in_old_version = tag_version_mask & old_version_mask
+            in_new_version = tag_version_mask & new_version_mask
+            if not in_old_version:
+                if in_new_version:
+                    fix_version_diff.added_tag_ids.append(fix_tag_id)
+                continue
+            if not in_new_version:
+                fix_version_diff.removed_tag_ids.append(fix_tag_id)
+                continue
+
+            tag_variants = self.tag_variants[fix_tag_id]
+            if len(tag_variants) > 1 and get_newest_fields(tag_variants, old_version_mask) != \
+                    get_newest_fields(tag_variants, new_version_mask):
+                fix_version_diff.changed_tag_ids.append(fix_tag_id)
+            value_variants = self.value_variants[fix_tag_id]
+            for value, value_version_mask in self.value_version_masks[fix_tag_id].items():
+                in_old_version = value_version_mask & old_version_mask
+                in_new_version = value_version_mask & new_version_mask
+                if in_old_version and in_new_version:
+                    if len(value_variants[value]) > 1:
+                        old_name = get_newest_fields(value_variants[value], old_version_mask)[0]
+                        new_name = get_newest_fields(value_variants[value], new_version_mask)[0]
+                        if old_name != new_name:
+                            fix_version_diff.renamed_values.append((fix_tag_id, value, old_name, new_name))
+                elif in_old_version:
+                    fix_version_diff.removed_values.append(
+                        (fix_tag_id, value, get_newest_fields(value_variants[value], old_version_mask)[0]))
+                elif in_new_version:
+                    fix_version_diff.added_values.append(
+                        (fix_tag_id, value, get_newest_fields(value_variants[value], new_version_mask)[0]))
+
+        return fix_version_diff
+
+
+def get_newest_fields(variants: Variants, version_mask: int) -> Union[Tuple[str, ...], None]:
+    for fields, variant_version_mask in reversed(variants):
+        if variant_version_mask & version_mask:
+            return fields
+
+    return None
+
+
+def add_variant(variants: Variants, fields: Tuple[str, ...], version_mask: int) -> None:
+    if variants and variants[-1][0] == fields:
+        variants[-1] = (fields, variants[-1][1] | version_mask)
+    else:
+        variants.append((fields, version_mask))
+
+
+# The fix_tag_dicts are those of the versions, the oldest first
+def create_fix_version_matrix(fix_tag_dicts_by_version: Dict[str, Dict[str, FixTag]]) -> FixVersionMatrix:
+    tag_variants: Dict[str, Variants] = {}
+    value_variants: Dict[str, Dict[str, Variants]] = {}
+    for bit, fix_tag_dict in enumerate(fix_tag_dicts_by_version.values()):
+        version_mask = 1 << bit
+        for fix_tag_id, fix_tag in fix_tag_dict.items():
+            add_variant(tag_variants.setdefault(fix_tag_id, []), (fix_tag.name, fix_tag.type, fix_tag.desc),
+                        version_mask)
+            value_variants_by_value = value_variants.setdefault(fix_tag_id, {})
+            for value, fix_tag_value in fix_tag.values.items():
+                add_variant(value_variants_by_value.setdefault(value, []), (fix_tag_value.name, fix_tag_value.desc),
+                            version_mask)
+
+    sorted_tag_ids = sorted(tag_variants, key=int)
+    tag_variants = {fix_tag_id: tag_variants[fix_tag_id] for fix_tag_id in sorted_tag_ids}
+    value_variants = {fix_tag_id: {value: value_variants[fix_tag_id][value]
+                                   for value in sorted(value_variants[fix_tag_id])}
+                      for fix_tag_id in sorted_tag_ids}
+
+    return create_fix_version_matrix_from_variants(list(fix_tag_dicts_by_version), tag_variants, value_variants)
+
+
+def create_fix_version_matrix_from_variants(fix_versions: List[str], tag_variants: Dict[str, Variants],
+                                            value_variants: Dict[str, Dict[str, Variants]]) -> FixVersionMatrix:
+    tag_version_masks = {fix_tag_id: get_version_mask_of_variants(variants)
+                         for fix_tag_id, variants in tag_variants.items()}
+    value_version_masks = {fix_tag_id: {value: get_version_mask_of_variants(variants)
+                                        for value, variants in value_variants_by_value.items()}
+                           for fix_tag_id, value_variants_by_value in value_variants.items()}
+
+    return FixVersionMatrix(fix_versions, tag_version_masks, tag_variants, value_version_masks, value_variants)
+
+
+def get_version_mask_of_variants(variants: Variants) -> int:
+    version_mask = 0
+    for _, variant_version_mask in variants:
+        version_mask |= variant_version_mask
+
+    return version_mask
+
+
+# Only the sizes and modification times of the XML files are checked: unlike their content (see
+# compute_fix_definitions_hash()), they don't need to be read to tell whether the saved matrix is still valid
+def compute_fix_version_matrix_key(fix_versions: List[str], additional_tag_dict: Dict[str, FixTag]) -> str:
+    key_hash = hashlib.sha256(f"{FIX_VERSION_MATRIX_FORMAT_VERSION}|{','.join(fix_versions)}".encode())
+    update_hash_with_fix_definition_file_stats(key_hash, fix_versions)
+    for tag_id, fix_tag in sorted(additional_tag_dict.items()):
+        key_hash.update(f"|{tag_id}={fix_tag.name}".encode())
+
+    return key_hash.hexdigest()[:16]
+
+
+def get_fix_version_matrix_path(matrix_key: str = '*') -> str:
+    return f"{get_data_dir_path()}/{COMPILED_DICTIONARY_DIR_NAME}/FIX_VERSION_MATRIX-{matrix_key}.pickle"
+
+
+def load_fix_version_matrix(matrix_key: str) -> Union[FixVersionMatrix, None]:
+    matrix_path = get_fix_version_matrix_path(matrix_key)
+    if not os.path.exists(matrix_path):
+        return None
+
+    # the gc would be triggered over and over by the many tuples being created while none of them can be garbage
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(matrix_path, 'rb') as fd:
+            fix_versions, tag_variants, value_variants = pickle.load(fd)
+    except Exception as e:
+        print(f"ERROR: can't load FIX version matrix:{matrix_path}. Rebuilding it. Error:{e}")
+        return None
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    return create_fix_version_matrix_from_variants(fix_versions, tag_variants, value_variants)
+
+
+def save_fix_version_matrix(fix_version_matrix: FixVersionMatrix, matrix_key: str) -> None:
+    matrix_path = get_fix_version_matrix_path(matrix_key)
+    try:
+        os.makedirs(os.path.dirname(matrix_path), exist_ok=True)
+        for stale_path in glob.glob(get_fix_version_matrix_path()):
+            os.remove(stale_path)
+        # write to a temp file first so that concurrent processes never read a partial file
+        tmp_path = f"{matrix_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as fd:
+            pickle.dump((fix_version_matrix.fix_versions, fix_version_matrix.tag_variants,
+                         fix_version_matrix.value_variants), fd, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, matrix_path)
+    except Exception as e:
+        print(f"ERROR: can't save FIX version matrix:{matrix_path}. Error:{e}")
+
+
+# The matrix of all the available versions, loaded from the data dir or built (and saved) when it's missing or stale
+@lru_cache()
+def get_fix_version_matrix() -> FixVersionMatrix:
+    fix_versions = get_list_of_available_fix_versions()
+    matrix_key = compute_fix_version_matrix_key(fix_versions, check_for_additional_fix_definitions())
+    fix_version_matrix = load_fix_version_matrix(matrix_key)
+    if fix_version_matrix is None:
+        fix_version_matrix = create_fix_version_matrix(
+            {fix_version: extract_info_for_fix_version(fix_version).fix_tags_by_tag_id for fix_version in fix_versions})
+        save_fix_version_matrix(fix_version_matrix, matrix_key)
+
+    return fix_version_matrix
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    fix_version_matrix_ = get_fix_version_matrix()
+    print(f"{len(fix_version_matrix_.tag_version_masks)} tags of {len(fix_version_matrix_.fix_versions)} versions "
+          f"in {(time.time() - start_time) * 1000:.1f}ms")
+    if len(sys.argv) == 3:
+        start_time = time.time()
+        fix_version_diff_ = fix_version_matrix_.diff(sys.argv[1], sys.argv[2])
+        print(f"diff in {(time.time() - start_time) * 1000:.1f}ms: {len(fix_version_diff_.added_tag_ids)} added tags, "
+              f"{len(fix_version_diff_.removed_tag_ids)} removed, {len(fix_version_diff_.changed_tag_ids)} changed, "
+              f"{len(fix_version_diff_.added_values)} added values, {len(fix_version_diff_.removed_values)} removed, "
+              f"{len(fix_version_diff_.renamed_values)} renamed")
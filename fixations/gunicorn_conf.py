@@ -0,0 +1,31 @@
+# gunicorn configuration to share the FIX versions' info among all the workers
+#   $ gunicorn -c python:fixations.gunicorn_conf fixations.wsgi:app
+#
+# All FIX versions are loaded once by the master before it forks its workers, so they all share the same (read-only)
+# memory pages instead of each holding its own copy. The memory usage of each process is logged when it starts
+# and it can also be obtained at any time with: curl http://127.0.0.1:8000/stats
+from fixations.fix_tag_search_engine import get_fix_tag_search_engine
+from fixations.fix_utils import preload_all_fix_versions, get_memory_usage
+
+preload_app = True
+
+
+def on_starting(server):
+    server.log.info(f"Master memory usage before preloading the FIX versions: {get_memory_usage()}")
+    # the search index of /search is built from them and shared the same way
+    get_fix_tag_search_engine()
+    fix_versions = preload_all_fix_versions()
+    server.log.info(f"Master memory usage after preloading FIX versions {', '.join(fix_versions)}: "
+                    f"{get_memory_usage()}")
+
+
+def post_fork(server, worker):
+    from fixations.webfix import store, start_store_eviction
+    store.reconnect()
+    # the workers take turns evicting (see Store.take_lease()): not in the master, whose threads wouldn't survive the
+    # forks of the workers it (re)starts
+    start_store_eviction()
+
+
+def post_worker_init(worker):
+    worker.log.info(f"Worker pid:{worker.pid} memory usage: {get_memory_usage()}")
@@ -28,17 +28,27 @@ def get_short_str_id(str_to_encode=None, alphabet=None, randomize=None, length=N
     if randomize:
         random.shuffle(alphabet_list)
 
-    base = len(alphabet)
     md5_str = md5(str_to_encode.encode()).hexdigest()
+    short_str_id = convert_md5_str_into_short_str_id(md5_str, alphabet_list)
+
+    if length is not None and len(short_str_id) > length:
+        short_str_id = short_str_id[:length]
+
+    return short_str_id
+
+
+# The long division part, e.g. for an md5 computed incrementally
+def convert_md5_str_into_short_str_id(md5_str, alphabet_list=None):
+    if alphabet_list is None:
+        alphabet_list = list(DEFAULT_ALPHABET)
+
+    base = len(alphabet_list)
     q = int(md5_str, 16)
     short_str_id = ''
     while q > 0:
         q, r = divmod(q, base)
         short_str_id += alphabet_list[r]
 
-    if length is not None and len(short_str_id) > length:
-        short_str_id = short_str_id[:length]
-
     return short_str_id
 
 
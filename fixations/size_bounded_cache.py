@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# Thread-safe LRU cache bounded by the total size of its values rather than by their number, e.g. for rendered
+# pages whose sizes vary by orders of magnitude.
+import sys
+import threading
+from collections import OrderedDict
+from typing import Hashable, Union, Any
+
+
+class SizeBoundedCache:
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.size = 0
+        # key -> (value, size), from the least to the most recently used
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+        self.hit_count = 0
+        self.miss_count = 0
+
+    def get(self, key: Hashable) -> Union[Any, None]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.miss_count += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hit_count += 1
+
+            return entry[0]
+
+    # A value bigger than the whole cache isn't cached
+    def put(self, key: Hashable, value: Any, size: int) -> None:
+        with self.lock:
+            self.remove(key)
+            if size > self.max_size:
+                return
+            self.entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_size:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def invalidate(self, key: Hashable) -> None:
+        with self.lock:
+            self.remove(key)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    # the lock must be held
+    def remove(self, key: Hashable) -> None:
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.size -= entry[1]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+if __name__ == "__main__":
+    cache = SizeBoundedCache(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
+    for word in sys.stdin.read().split():
+        if cache.get(word) is None:
+            cache.put(word, word, len(word))
+    print(f"entries:{len(cache)} size:{cache.size} hits:{cache.hit_count} misses:{cache.miss_count}")
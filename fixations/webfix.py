@@ -1,16 +1,21 @@
 #!/usr/bin/env python3
+import hashlib
+import os
 import urllib.parse
-from typing import List, Tuple, Dict
+from concurrent.futures import Executor
+from typing import List, Tuple, Dict, Union, Iterator, Iterable
 from urllib.parse import unquote
 
-from flask import Flask, render_template
+from flask import Flask, render_template, jsonify, make_response, Response, stream_with_context, url_for
 from flask import request
 
-from fixations.fix_store import Store
-from fixations.fix_utils import extract_fix_lines_from_str_lines, create_fix_lines_grid, get_store_path, \
-    get_lookup_url_template_for_js, obfuscate_lines, create_table_from_fix_lines, get_version, \
-    create_tag_set, create_tag_list
-from fixations.short_str_id import get_short_str_id
+from fixations.fix_grid import FixGrid
+from fixations.fix_store import Store, get_retention_policy, CompressedLines
+from fixations.fix_tag_search_engine import get_fix_tag_search_engine, DEFAULT_LIMIT
+from fixations.size_bounded_cache import SizeBoundedCache
+from fixations.fix_utils import create_fix_lines_grid_from_str_lines, get_store_path, obfuscate_lines, \
+    get_version, create_tag_set, create_tag_list, get_memory_usage, iter_str_lines_from_byte_lines, \
+    extract_fix_line_chunks_from_str_lines, create_table_from_parsed_fix_lines, HeaderState, DEFAULT_ENCODING
 
 app = Flask(__name__)
 
@@ -18,55 +23,167 @@ FORM_ID = 'id'
 FORM_FIX_LINES = 'fix_lines'
 FORM_UPLOAD = 'upload'
 
-store = Store(get_store_path())
+store = Store(get_store_path(), group_commit=True)
 
 DEFAULT_TOP_TAGS_STR = "49 56 35 39 150 11"
 DEFAULT_TOP_TAGS = DEFAULT_TOP_TAGS_STR.split()
 
+# the pages rendered for the ?id= links, which are shared and hit many times, by
+# (str_id, hash of its lines, show_date, transpose, top_tags cookie)
+RENDER_CACHE_MAX_SIZE = 64 * 1024 * 1024
+render_cache = SizeBoundedCache(RENDER_CACHE_MAX_SIZE)
 
+# the grids with at least VIRTUAL_GRID_MIN_CELL_COUNT cells aren't rendered as a whole: the page only holds their first
+# window and then fetches the windows in view from /grid. They're cached by the same key as the rendered pages
+VIRTUAL_GRID_MIN_CELL_COUNT = 20_000
+INITIAL_WINDOW_ROW_COUNT = 100
+INITIAL_WINDOW_COLUMN_COUNT = 30
+GRID_CACHE_MAX_SIZE = 256 * 1024 * 1024
+grid_cache = SizeBoundedCache(GRID_CACHE_MAX_SIZE)
+
+# Set by the ASGI app (see asgi.py): the large payloads are then parsed by its process pool instead of holding the GIL
+parse_executor: Union[Executor, None] = None
+OFFLOAD_MIN_CHAR_COUNT = 64 * 1024
+
+# /stdin reads its body STDIN_READ_SIZE bytes at a time and sends back one table per STDIN_TABLE_SIZE FIX lines
+STDIN_READ_SIZE = 64 * 1024
+STDIN_TABLE_SIZE = 100
+
+
+# The body is read, parsed and sent back as tables (chunked) as it comes, followed by the URL of its lines once they're
+# all stored, so that memory usage is bounded by the chunk sizes rather than by the size of the body
 @app.route('/stdin', methods=['POST'])
 def receive_data():
-    data = request.get_data().decode()
-    data = urllib.parse.unquote_plus(data)
-    fix_lines = data.splitlines()
+    return Response(stream_with_context(iter_tables_from_stdin(request.stream)), mimetype='text/plain')
+
+
+def iter_tables_from_stdin(stream) -> Iterator[str]:
+    # the whole body is stored compressed as it's parsed, as store_fix_lines() would have stored it, but only its FIX
+    # lines (and comments) get parsed
+    compressed_lines = CompressedLines()
+    lines = iter_str_lines_from_byte_lines(iter_and_compress_lines(iter_byte_lines_from_body(stream),
+                                                                   compressed_lines))
+    header_state = HeaderState()
+    found_fix_lines = False
+    for fix_tag_dict, fix_lines, used_fix_tags, _ in \
+            extract_fix_line_chunks_from_str_lines(lines, STDIN_TABLE_SIZE):
+        yield create_table_from_parsed_fix_lines(fix_tag_dict, fix_lines, used_fix_tags,
+                                                 header_state=header_state) + '\n'
+        found_fix_lines = True
+    if not found_fix_lines:
+        yield "Could not find FIX lines!"
+        return
+
+    str_id = store.save_compressed_lines(compressed_lines)
+    url = get_url_for_str_id(str_id)
 
-    table = create_table_from_fix_lines(fix_lines)
-    if not table:
-        return "Could not find FIX lines!"
+    yield f"{url}\n"
 
-    str_id = store_fix_lines(data)
-    url = get_url_for_str_id(str_id)
 
-    return f"{table}\n{url}\n"
+# Same as urllib.parse.unquote_to_bytes() on the whole body but split into lines
+def iter_byte_lines_from_body(stream) -> Iterator[bytes]:
+    undecoded_data = partial_line = b''
+    while True:
+        data = stream.read(STDIN_READ_SIZE)
+        if not data:
+            break
+        data = undecoded_data + data.replace(b'+', b' ')
+        # a %xx escape split over 2 reads is decoded with the next one
+        escape_index = data.find(b'%', len(data) - 2)
+        end = escape_index if escape_index >= 0 else len(data)
+        data, undecoded_data = data[:end], data[end:]
+
+        lines = (partial_line + urllib.parse.unquote_to_bytes(data)).split(b'\n')
+        partial_line = lines.pop()
+        yield from lines
+
+    # even if empty, so that joining the lines gives back the whole body
+    yield partial_line + urllib.parse.unquote_to_bytes(undecoded_data)
+
+
+def iter_and_compress_lines(lines: Iterable[bytes], compressed_lines: CompressedLines) -> Iterator[bytes]:
+    for line in lines:
+        compressed_lines.add_line(line.decode(DEFAULT_ENCODING, errors='replace'))
+        yield line
 
 
 @app.route("/", methods=['POST', 'GET'])
 def home():
     params = get_request_params(request)
+    render_cache_key = get_render_cache_key(params)
+    if render_cache_key is None:
+        return render_home(params)
+
+    # the ETag only depends on the cache key so that a browser's copy can be validated without rendering anything
+    etag = hashlib.sha1(repr((render_cache_key, get_version())).encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        page = render_cache.get(render_cache_key)
+        if page is None:
+            page = render_home(params)
+            render_cache.put(render_cache_key, page, len(page))
+        response = make_response(page)
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+
+    return response
+
 
+# Only the GET of an ?id= link, as is, can be cached: its page doesn't change until the id is saved with other lines
+def get_render_cache_key(params: Dict[str, str]) -> Union[Tuple, None]:
+    str_id = params.get(FORM_ID)
+    if request.method != 'GET' or not str_id or params.get('obfuscate_tags') or params.get(FORM_UPLOAD) or \
+            params.get(FORM_FIX_LINES):
+        return None
+
+    return get_grid_cache_key(str_id, bool(params.get('show_date', False)), bool(params.get('transpose', False)))
+
+
+# What the grid of an id depends on: the hash of its lines, the options and the top tags cookie
+def get_grid_cache_key(str_id: str, show_date: bool, transpose: bool) -> Union[Tuple, None]:
+    blob_hash = store.get_hash(str_id) if str_id else None
+    if blob_hash is None:
+        return None
+
+    return str_id, blob_hash, show_date, transpose, request.cookies.get('top_tags')
+
+
+def render_home(params: Dict[str, str]) -> str:
     show_date = True if params.get('show_date', False) else False
     transpose = True if params.get('transpose', False) else False
 
-    headers = comment_row = fix_lines_list = fix_lines = []
+    headers = comment_row = fix_lines_list = []
     id_str = lookup_url_template_for_js = error = None
-    char_count = 0
+    char_count = fix_line_count = 0
     try:
         fix_lines_list, id_str, char_count, error = get_fix_lines_list(params)
         if params.get(FORM_UPLOAD, False):
             uploaded_url = get_url_for_str_id(id_str)
             return uploaded_url
 
-        fix_tag_dict, fix_lines, used_fix_tags, fix_version = extract_fix_lines_from_str_lines(fix_lines_list)
-        headers, rows, comment_row = create_fix_lines_grid(fix_tag_dict, fix_lines, used_fix_tags,
-                                                           with_session_level_tags=False,
-                                                           show_date=show_date, transpose=transpose)
-        lookup_url_template_for_js = get_lookup_url_template_for_js(fix_version)
+        headers, rows, comment_row, fix_line_count, lookup_url_template_for_js = \
+            run_parsing(char_count, create_fix_lines_grid_from_str_lines, fix_lines_list, show_date, transpose)
     except Exception as e:
         error = e
         rows = []
 
     top_tags, rows = set_top_rows(request, transpose, rows)
 
+    virtual_grid = None
+    fix_grid = create_fix_grid(headers, rows, comment_row, transpose)
+    if fix_grid.cell_count >= VIRTUAL_GRID_MIN_CELL_COUNT:
+        grid_cache_key = get_grid_cache_key(id_str, show_date, transpose)
+        if grid_cache_key is not None:
+            grid_cache.put(grid_cache_key, fix_grid, fix_grid.get_size())
+            virtual_grid = fix_grid.get_window(0, INITIAL_WINDOW_ROW_COUNT, 0, INITIAL_WINDOW_COLUMN_COUNT)
+            rows = []
+    # the lines of a virtual grid are too many to be in the page: they're fetched from /lines once it's loaded
+    fix_lines_url = None
+    if virtual_grid:
+        fix_lines_list = []
+        fix_lines_url = url_for('stored_lines', id=id_str)
+
     context = {'headers': headers,
                'rows': rows,
                'comment_row': comment_row,
@@ -77,15 +194,113 @@ def home():
                'DEFAULT_TOP_TAGS_STR': DEFAULT_TOP_TAGS_STR,
 
                'fix_lines_list': [line.replace('"', '\\"') for line in fix_lines_list],  # Escape "
+               'fix_lines_url': fix_lines_url,
                'str_id': id_str,
                'lookup_url_template': lookup_url_template_for_js,
-               'size': f"{len(fix_lines)} lines / {char_count} chars",
+               'size': f"{fix_line_count} lines / {char_count} chars",
+               'virtual_grid': virtual_grid,
+               'virtual_grid_url': url_for('grid_window', id=id_str, show_date=show_date or None,
+                                           transpose=transpose or None),
                'version': get_version(),
                'error': error
                }
     return render_template("index.html", **context)
 
 
+# The window of rows x columns of an id's grid, e.g.
+#   /grid?id=...&transpose=true&row_start=100&row_count=50&column_start=20&column_count=10
+@app.route('/grid', methods=['GET'])
+def grid_window():
+    params = get_request_params(request)
+    str_id = params.get(FORM_ID)
+    show_date = True if params.get('show_date', False) else False
+    transpose = True if params.get('transpose', False) else False
+    try:
+        window_bounds = [int(params.get(name, 0)) for name in
+                         ('row_start', 'row_count', 'column_start', 'column_count')]
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    grid_cache_key = get_grid_cache_key(str_id, show_date, transpose)
+    if grid_cache_key is None:
+        return jsonify({'error': f"There's no record for id:{str_id}!"}), 404
+    fix_grid = grid_cache.get(grid_cache_key)
+    if fix_grid is None:
+        fix_lines_str, _ = store.get(str_id)
+        if fix_lines_str is None:
+            return jsonify({'error': f"There's no record for id:{str_id}!"}), 404
+        headers, rows, comment_row, _, _ = run_parsing(len(fix_lines_str), create_fix_lines_grid_from_str_lines,
+                                                       fix_lines_str.splitlines(), show_date, transpose)
+        _, rows = set_top_rows(request, transpose, rows)
+        fix_grid = create_fix_grid(headers, rows, comment_row, transpose)
+        grid_cache.put(grid_cache_key, fix_grid, fix_grid.get_size())
+
+    return jsonify(fix_grid.get_window(*window_bounds))
+
+
+# The stored lines of an id, e.g. /lines?id=...
+@app.route('/lines', methods=['GET'])
+def stored_lines():
+    str_id = get_request_params(request).get(FORM_ID)
+    fix_lines_str, _ = store.get(str_id) if str_id else (None, None)
+    if fix_lines_str is None:
+        return Response(f"There's no record for id:{str_id}!", status=404, mimetype='text/plain')
+
+    return Response(fix_lines_str, mimetype='text/plain')
+
+
+# The FIX tags best matching a query (id, name, enum value name, description or a typo of these), e.g.
+#   /search?q=ordtype&fix_versions=4.2,4.4&limit=10
+@app.route('/search', methods=['GET'])
+def search():
+    params = get_request_params(request)
+    query = params.get('q', '')
+    try:
+        limit = int(params.get('limit', DEFAULT_LIMIT))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    fix_tag_search_engine = get_fix_tag_search_engine()
+    fix_versions = params['fix_versions'].split(',') if params.get('fix_versions') else None
+    invalid_fix_versions = [fix_version for fix_version in fix_versions or []
+                            if fix_version not in fix_tag_search_engine.fix_versions]
+    if invalid_fix_versions:
+        return jsonify({'error': f"Invalid FIX version(s):{', '.join(invalid_fix_versions)}"}), 400
+
+    results = fix_tag_search_engine.search(query, fix_versions, max(limit, 0))
+
+    return jsonify({'query': query, 'results': [result.to_dict() for result in results]})
+
+
+# The TAG_ID and TAG_NAME columns are fixed, and so is the first column (timestamps) of a transposed grid whose
+# comments aren't displayed
+def create_fix_grid(headers: List[str], rows: List[List[str]], comment_row: List[str], transpose: bool) -> FixGrid:
+    if transpose:
+        return FixGrid(headers, rows, None, 1)
+
+    return FixGrid(headers, rows, comment_row, 2)
+
+
+# Small payloads are parsed right away, the cost of handing them over to another process would dwarf their parsing
+def run_parsing(char_count: int, parse_function, *args):
+    if parse_executor is not None and char_count >= OFFLOAD_MIN_CHAR_COUNT:
+        return parse_executor.submit(parse_function, *args).result()
+
+    return parse_function(*args)
+
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    # per-worker memory usage, e.g. to compare gunicorn with/without the preloaded FIX versions
+    return jsonify({'pid': os.getpid(),
+                    'memory_usage': get_memory_usage(),
+                    'render_cache': {'entries': len(render_cache), 'size': render_cache.size,
+                                     'hits': render_cache.hit_count, 'misses': render_cache.miss_count},
+                    'grid_cache': {'entries': len(grid_cache), 'size': grid_cache.size,
+                                   'hits': grid_cache.hit_count, 'misses': grid_cache.miss_count},
+                    'version': get_version()})
+
+
 def get_request_params(req) -> Dict[str, str]:
     params = {}
 
@@ -153,10 +368,7 @@ def get_fix_lines_list(params: Dict[str, str]):
 
 
 def store_fix_lines(fix_lines_str: str) -> str:
-    str_id = get_short_str_id(fix_lines_str, length=8)
-    store.save(str_id, fix_lines_str)
-
-    return str_id
+    return store.save_lines(fix_lines_str)
 
 
 def get_url_for_str_id(id_str: str) -> str:
@@ -165,7 +377,16 @@ def get_url_for_str_id(id_str: str) -> str:
     return url
 
 
+# Started by the server (see main(), wsgi.py, asgi.py and gunicorn_conf.py), not when this module is imported. The
+# processes serving the same store take turns through a lease so that only one of them evicts at a time
+def start_store_eviction() -> None:
+    retention_policy = get_retention_policy()
+    if retention_policy.is_enabled() and store.eviction_thread is None:
+        store.start_eviction_thread(retention_policy)
+
+
 def main():
+    start_store_eviction()
     app.run(debug=True, port=7979)
 
 
@@ -1,6 +1,7 @@
-from fixations.webfix import app
+from fixations.webfix import app, start_store_eviction
 
 if __name__ == "__main__":
+   start_store_eviction()
    app.run()
 
    
@@ -0,0 +1,21 @@
+import pytest
+
+from fixations import webfix
+from fixations.fix_store import Store, RetentionPolicy
+from fixations.fix_utils import FixTag, FixTagValue
+
+
+
+def create_fix_tag(fix_tag_id, name, desc='A tag', values=()):
+    return FixTag(fix_tag_id, name, 'STRING', desc, {value: FixTagValue(value, value_name, '')
+                                                     for value, value_name in values})
+
+
+# webfix with a store of its own instead of the user's one, and without any eviction
+@pytest.fixture
+def webfix_store(tmp_path, monkeypatch):
+    store = Store(str(tmp_path / 'store.db'), group_commit=True)
+    monkeypatch.setattr(webfix, 'store', store)
+    monkeypatch.setattr(webfix, 'get_retention_policy', lambda: RetentionPolicy())
+    yield store
+    store.close()
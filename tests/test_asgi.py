@@ -0,0 +1,65 @@
+import asyncio
+import urllib.parse
+
+import pytest
+
+from fixations import asgi, webfix
+
+pytestmark = pytest.mark.usefixtures('webfix_store')
+
+LINE = "12:00:00.001 8=FIX.4.2|9=10|35=D|49=BUYER|56=SELLER|11=ORD1|55=IBM|10=001"
+
+
+async def request(method, path, query_string=b'', body=b'', content_type=b'text/plain'):
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query_string, 'http_version': '1.1',
+             'scheme': 'http', 'server': ('127.0.0.1', 8000), 'client': ('127.0.0.1', 1234),
+             'headers': [(b'host', b'127.0.0.1:8000'), (b'content-type', content_type)]}
+    # the body is received in 2 chunks
+    messages = [{'type': 'http.request', 'body': body[:10], 'more_body': True},
+                {'type': 'http.request', 'body': body[10:]}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi.app(scope, receive, send)
+    assert sent[0]['type'] == 'http.response.start'
+
+    assert not sent[-1].get('more_body', False)
+
+    return sent[0]['status'], b''.join(message['body'] for message in sent[1:])
+
+
+async def run_requests():
+    lifespan_messages = asyncio.Queue()
+    lifespan_sent = asyncio.Queue()
+    lifespan = asyncio.create_task(asgi.app({'type': 'lifespan'}, lifespan_messages.get, lifespan_sent.put))
+    await lifespan_messages.put({'type': 'lifespan.startup'})
+    assert await lifespan_sent.get() == {'type': 'lifespan.startup.complete'}
+    assert webfix.parse_executor is not None
+    try:
+        # small enough to be parsed in place
+        status, body = await request('POST', '/stdin', body=LINE.encode())
+        assert status == 200 and b'ORD1' in body
+        str_id = body.decode().split('?id=')[1].strip()
+        status, body = await request('GET', '/', query_string=f"id={str_id}".encode())
+        assert status == 200 and b'ORD1' in body and b'1 lines' in body
+
+        # big enough to be parsed by the process pool
+        lines = '\n'.join([LINE.replace('ORD1', 'ORD2')] * 1000)
+        assert len(lines) >= webfix.OFFLOAD_MIN_CHAR_COUNT
+        body = urllib.parse.urlencode({'fix_lines': lines}).encode()
+        status, body = await request('POST', '/', body=body, content_type=b'application/x-www-form-urlencoded')
+        assert status == 200 and b'ORD2' in body and b'1000 lines' in body
+    finally:
+        await lifespan_messages.put({'type': 'lifespan.shutdown'})
+        assert await lifespan_sent.get() == {'type': 'lifespan.shutdown.complete'}
+        await lifespan
+    assert webfix.parse_executor is None
+
+
+def test_asgi_app():
+    asyncio.run(run_requests())
@@ -0,0 +1,88 @@
+import pytest
+
+from fixations.fix_filter import FixFilter, FixFilterError
+from fixations.fix_utils import extract_fix_lines_from_str_lines, decode_fix_lines_from_bytes, \
+    iter_str_lines_from_byte_lines
+
+NEW_ORDER = "20111107-10:52:57.601: 8=FIX.4.2|9=10|35=D|49=BUYER|56=SELLER|11=ABC1|55=IBM|38=100|10=001"
+EXEC_REPORT = "20111107-10:52:57.868: 8=FIX.4.2|9=10|35=8|49=SELLER|56=BUYER|11=ABC1|37=X1|55=IBM|39=2|10=002"
+CANCEL = "20111107-10:53:01.002: 8=FIX.4.2|9=10|35=F|49=BUYER|56=SELLER|11=XYZ2|41=ABC1|55=MSFT|10=003"
+LINES = [NEW_ORDER, EXEC_REPORT, CANCEL]
+
+
+def filter_lines(expression):
+    fix_filter = FixFilter(expression)
+    return [line for line in LINES if fix_filter.might_match(line.encode()) and fix_filter.matches(line)]
+
+
+def test_conditions():
+    assert filter_lines("35=D") == [NEW_ORDER]
+    assert filter_lines("35 != D") == [EXEC_REPORT, CANCEL]
+    assert filter_lines("35 in (D,8)") == [NEW_ORDER, EXEC_REPORT]
+    assert filter_lines("11~^ABC") == [NEW_ORDER, EXEC_REPORT]
+    assert filter_lines("11 !~ '^ABC'") == [CANCEL]
+    assert filter_lines("38 >= 100") == [NEW_ORDER]
+    assert filter_lines("38 > 99.5") == [NEW_ORDER]
+    assert filter_lines("41=ABC1") == [CANCEL]
+    assert filter_lines("37!=X1") == [NEW_ORDER, CANCEL]
+
+
+def test_boolean_operators():
+    assert filter_lines("35 in (D,8,F) and 55=IBM and 11~^ABC") == [NEW_ORDER, EXEC_REPORT]
+    assert filter_lines("(49=BUYER and 56=SELLER) or (49=SELLER AND 56=BUYER and 39=2)") == LINES
+    assert filter_lines("not 55=IBM") == [CANCEL]
+    assert filter_lines("55=IBM and not (35=8 or 35=F)") == [NEW_ORDER]
+
+
+def test_time_windows():
+    assert filter_lines("time >= 10:52:57.7") == [EXEC_REPORT, CANCEL]
+    assert filter_lines("time >= 10:52:57 and time < 10:53") == [NEW_ORDER, EXEC_REPORT]
+    assert filter_lines("time < '20111107-10:52:57.700'") == [NEW_ORDER]
+
+
+# The times are compared as instants, not as strings
+def test_times_of_different_formats():
+    assert filter_lines("time < 9:30") == []
+    assert filter_lines("time > 9:30") == LINES
+    assert filter_lines("time >= 10:52:57.868000") == [EXEC_REPORT, CANCEL]
+    assert filter_lines("time > 10:52:57.868000001") == [CANCEL]
+    assert filter_lines("time = 10:52:57.6010") == [NEW_ORDER]
+    assert filter_lines("time in (10:52:57.601, '20111107-10:53:01.002')") == [NEW_ORDER, CANCEL]
+    assert filter_lines("time != 10:53:01.002") == [NEW_ORDER, EXEC_REPORT]
+    assert filter_lines("time ~ ':57'") == [NEW_ORDER, EXEC_REPORT]
+
+    for expression in ("time < 10h30", "time >= 25:00", "time in (10:52, soon)", "time = ''"):
+        with pytest.raises(FixFilterError, match="Invalid time"):
+            FixFilter(expression)
+
+
+def test_bytes_prefilter():
+    fix_filter = FixFilter("35 in (D,F) and 55=IBM")
+    assert fix_filter.might_match(NEW_ORDER.encode())
+    assert not fix_filter.might_match(EXEC_REPORT.encode())
+    assert not fix_filter.might_match(CANCEL.encode())
+    # negations and regexes can't be checked on the bytes
+    assert FixFilter("not 35=D or 11~X").might_match(b"8=FIX.4.2|35=D")
+
+    # comments are kept, and carried over only to the FIX line that follows them
+    lines = ["# the new order", NEW_ORDER, "# the exec report", EXEC_REPORT, CANCEL]
+    str_lines = list(iter_str_lines_from_byte_lines((line.encode() for line in lines), fix_filter=FixFilter("35=8")))
+    assert str_lines == ["# the new order", NEW_ORDER, "# the exec report", EXEC_REPORT]
+    _, fix_lines, _, _ = extract_fix_lines_from_str_lines(str_lines, FixFilter("35=8"))
+    assert [(fix_tags['000035'], comment) for _, fix_tags, comment in fix_lines] == \
+           [('8 (ExecutionReport)', 'the exec report')]
+
+
+def test_filter_fix_lines():
+    fix_filter = FixFilter("35 in (D,F)")
+    data = '\n'.join(["# the cancel", *LINES]).encode()
+    _, fix_lines, _, version = extract_fix_lines_from_str_lines(decode_fix_lines_from_bytes(data), fix_filter)
+    assert version == '4.2'
+    assert [(fix_tags['000035'], comment) for _, fix_tags, comment in fix_lines] == \
+           [('D (NewOrderSingle)', 'the cancel'), ('F (OrderCancelRequest)', '')]
+
+
+@pytest.mark.parametrize("expression", ["35 in (D", "foo=1", "35=", "35 D", "and 35=D", "35=D or", "11~(", "(35=D"])
+def test_invalid_expressions(expression):
+    with pytest.raises(FixFilterError):
+        FixFilter(expression)
@@ -0,0 +1,64 @@
+import os
+
+from fixations.fix_log_follower import FixLogFollower
+
+LINES = [
+    "# first order\n",
+    "12:00:00.001 8=FIX.4.2|9=10|35=D|49=BUYER|56=SELLER|11=ORD1|55=IBM|10=001\n",
+    "12:00:00.002 8=FIX.4.2|9=10|35=8|49=SELLER|56=BUYER|11=ORD1|37=EX1|39=0|10=002\n",
+    "# second order\n",
+    "12:00:00.004 8=FIX.4.2|9=10|35=D|49=BUYER|56=OTHER|11=ORD2|55=MSFT|10=003\n",
+    "12:00:01.004 8=FIX.4.2|9=10|35=D|49=BUYER|56=OTHER|11=ORD3|55=MSFT|10=004\n",
+]
+
+
+def get_cl_ord_ids(fix_lines):
+    return [fix_tags['000011'] for _, fix_tags, _ in fix_lines]
+
+
+def test_follow_appended_lines(tmp_path):
+    log_path = tmp_path / 'session.log'
+    log_path.write_text(''.join(LINES[:2]))
+    fix_log_follower = FixLogFollower(str(log_path))
+    fix_lines = fix_log_follower.read_new_fix_lines()
+    assert get_cl_ord_ids(fix_lines) == ['ORD1']
+    assert fix_lines[0][2] == 'first order'
+    fix_log_follower.create_table(fix_lines)
+    assert fix_log_follower.read_new_fix_lines() == []
+
+    # a partial line is only parsed once it's complete, the comment is carried over
+    with open(log_path, 'a') as fd:
+        fd.write(LINES[2] + LINES[3] + LINES[4][:20])
+    fix_lines = fix_log_follower.read_new_fix_lines()
+    assert get_cl_ord_ids(fix_lines) == ['ORD1']
+    fix_log_follower.create_table(fix_lines)
+    with open(log_path, 'a') as fd:
+        fd.write(LINES[4][20:])
+    fix_lines = fix_log_follower.read_new_fix_lines()
+    assert get_cl_ord_ids(fix_lines) == ['ORD2']
+    assert fix_lines[0][2] == 'second order'
+
+    # the Δ/Σ follow on from the previous tables, whose tags are kept as well
+    table = fix_log_follower.create_table(fix_lines)
+    assert 'Δ:+.002' in table and 'Σ:+.003' in table
+    assert 'OrdStatus' in table
+    fix_log_follower.close()
+
+
+def test_follow_rotated_file(tmp_path):
+    log_path = tmp_path / 'session.log'
+    log_path.write_text(''.join(LINES[:2]))
+    fix_log_follower = FixLogFollower(str(log_path))
+    assert get_cl_ord_ids(fix_log_follower.read_new_fix_lines()) == ['ORD1']
+
+    # the rest of the old file is read before following the new one from its beginning
+    with open(log_path, 'a') as fd:
+        fd.write(LINES[2])
+    os.rename(log_path, tmp_path / 'session.log.1')
+    log_path.write_text(''.join(LINES[4:]))
+    assert get_cl_ord_ids(fix_log_follower.read_new_fix_lines()) == ['ORD1', 'ORD2', 'ORD3']
+
+    # truncated in place
+    log_path.write_text(LINES[1])
+    assert get_cl_ord_ids(fix_log_follower.read_new_fix_lines()) == ['ORD1']
+    fix_log_follower.close()
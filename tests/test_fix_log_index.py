@@ -0,0 +1,55 @@
+from fixations.fix_log_index import FixLogIndex
+
+LINES = [
+    "12:00:00.001 8=FIX.4.2|9=10|35=D|49=BUYER|56=SELLER|11=ORD1|55=IBM|10=001\n",
+    "# some comment\n",
+    "12:00:00.002 8=FIX.4.2|9=10|35=8|49=SELLER|56=BUYER|11=ORD1|37=EX1|39=0|10=002\n",
+    "12:00:00.003 8=FIX.4.2|9=10|35=D|49=BUYER|56=OTHER|11=ORD2|55=MSFT|10=003\n",
+]
+
+
+def create_index(tmp_path, lines):
+    log_path = tmp_path / 'session.log'
+    log_path.write_text(''.join(lines))
+
+    return log_path, FixLogIndex(str(log_path))
+
+
+def test_index_and_find_lines(tmp_path):
+    _, fix_log_index = create_index(tmp_path, LINES)
+    assert fix_log_index.update() == 3
+    assert fix_log_index.update() == 0
+
+    assert list(fix_log_index.iter_lines()) == [LINES[0].rstrip(), LINES[2].rstrip(), LINES[3].rstrip()]
+    assert list(fix_log_index.iter_lines(msg_types=['8'])) == [LINES[2].rstrip()]
+    assert list(fix_log_index.iter_lines(ids=['EX1'])) == [LINES[2].rstrip()]
+    assert list(fix_log_index.iter_lines(ids=['ORD1'], msg_types=['D'])) == [LINES[0].rstrip()]
+    assert list(fix_log_index.iter_lines(comp_ids=['OTHER'])) == [LINES[3].rstrip()]
+    assert list(fix_log_index.iter_lines(ids=['NOPE'])) == []
+
+
+def test_incremental_update(tmp_path):
+    log_path, fix_log_index = create_index(tmp_path, LINES[:2])
+    assert fix_log_index.update() == 1
+
+    # a partial line is only indexed once it's complete
+    with open(log_path, 'a') as fd:
+        fd.write(LINES[2] + LINES[3][:20])
+    assert fix_log_index.update() == 1
+    with open(log_path, 'a') as fd:
+        fd.write(LINES[3][20:])
+    assert fix_log_index.update() == 1
+    assert len(fix_log_index.find_lines()) == 3
+
+    # the index survives across runs
+    fix_log_index.close()
+    assert FixLogIndex(str(log_path)).update() == 0
+
+
+def test_rotated_file_is_reindexed(tmp_path):
+    log_path, fix_log_index = create_index(tmp_path, LINES)
+    assert fix_log_index.update() == 3
+
+    log_path.write_text(LINES[3] + LINES[3])
+    assert fix_log_index.update() == 2
+    assert list(fix_log_index.iter_lines(ids=['ORD1'])) == []
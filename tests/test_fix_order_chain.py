@@ -0,0 +1,55 @@
+from fixations.fix_order_chain import OrderChainIndex, create_tables_for_order_chains
+from fixations.fix_utils import extract_fix_lines_from_str_lines
+
+LINES = [
+    "12:00:00.001 8=FIX.4.2|9=10|35=D|49=BUYER|56=SELLER|11=ORD1|55=IBM|10=001",
+    "12:00:00.002 8=FIX.4.2|9=10|35=8|49=SELLER|56=BUYER|11=ORD1|37=EX1|39=0|10=002",
+    "12:00:00.003 8=FIX.4.2|9=10|35=D|49=BUYER|56=SELLER|11=OTHER|55=MSFT|10=003",
+    "12:00:00.004 8=FIX.4.2|9=10|35=G|49=BUYER|56=SELLER|11=ORD2|41=ORD1|55=IBM|10=004",
+    "12:00:00.005 8=FIX.4.2|9=10|35=8|49=SELLER|56=BUYER|11=ORD2|37=EX1|39=5|10=005",
+    "12:00:00.006 8=FIX.4.2|9=10|35=F|49=BUYER|56=SELLER|11=ORD3|41=ORD2|55=IBM|10=006",
+    "12:00:00.007 8=FIX.4.2|9=10|35=8|49=SELLER|56=BUYER|11=ORD3|37=EX1|39=4|10=007",
+    "12:00:00.008 8=FIX.4.2|9=10|35=8|49=SELLER|56=BUYER|11=REJ|37=NONE|39=8|10=008",
+]
+SESSION = ('BUYER', 'SELLER')
+
+
+def get_msg_types(fix_lines):
+    return [fix_tags['000035'].split()[0] for _, fix_tags, _ in fix_lines]
+
+
+def get_chains_msg_types(order_chain_index, order_id):
+    return [(session, get_msg_types(fix_lines)) for session, fix_lines in order_chain_index.get_chains(order_id)]
+
+
+def test_order_chain():
+    fix_tag_dict, fix_lines, _, _ = extract_fix_lines_from_str_lines(LINES)
+    order_chain_index = OrderChainIndex(fix_lines)
+
+    # any id of the chain gives the whole chain, in the original order
+    for order_id in ('ORD1', 'ORD2', 'ORD3', 'EX1'):
+        assert get_chains_msg_types(order_chain_index, order_id) == [(SESSION, ['D', '8', 'G', '8', 'F', '8'])]
+    assert get_chains_msg_types(order_chain_index, 'OTHER') == [(SESSION, ['D'])]
+    # 37=NONE doesn't link the rejected order to anything
+    assert get_chains_msg_types(order_chain_index, 'REJ') == [(SESSION, ['8'])]
+    assert order_chain_index.get_chains('NONE') == []
+    assert order_chain_index.get_chains('UNKNOWN') == []
+
+    assert create_tables_for_order_chains(fix_tag_dict, order_chain_index, 'UNKNOWN') == []
+    [(session, table)] = create_tables_for_order_chains(fix_tag_dict, order_chain_index, 'EX1')
+    assert session == SESSION and 'ORD3' in table and 'OTHER' not in table
+
+
+# The same ids used by another session are another chain
+def test_order_chains_of_sessions_reusing_ids():
+    other_session_lines = [line.replace('BUYER', 'FUND').replace('12:00:00.', '12:00:01.') for line in LINES]
+    _, fix_lines, _, _ = extract_fix_lines_from_str_lines(LINES + other_session_lines)
+    order_chain_index = OrderChainIndex(fix_lines)
+
+    msg_types = ['D', '8', 'G', '8', 'F', '8']
+    for order_id in ('ORD1', 'EX1'):
+        assert get_chains_msg_types(order_chain_index, order_id) == [(SESSION, msg_types),
+                                                                     (('FUND', 'SELLER'), msg_types)]
+    [(_, buyer_fix_lines), (_, fund_fix_lines)] = order_chain_index.get_chains('ORD3')
+    assert all(fix_tags['000049'] in SESSION and fix_tags['000056'] in SESSION for _, fix_tags, _ in buyer_fix_lines)
+    assert all('FUND' in (fix_tags['000049'], fix_tags['000056']) for _, fix_tags, _ in fund_fix_lines)
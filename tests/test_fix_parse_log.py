@@ -0,0 +1,45 @@
+import fixations.fix_parse_log
+from fixations.fix_parse_log import extract_fix_lines_from_files_in_parallel, iter_lines_from_files, \
+    print_tables_by_chunk
+from fixations.fix_utils import extract_fix_lines_from_str_lines
+
+
+def create_log_files(tmp_path):
+    lines = []
+    for i in range(200):
+        if i % 3 == 0:
+            lines.append(f"# comment {i}")
+        if i % 7 == 0:
+            lines.append("some junk")
+        if i % 11 == 0:
+            lines.append("")
+        lines.append(f"12:34:56.{i:03} 8=FIX.4.2|9=10|35=D|49=MY_SCID|56=MY_TCID|11=ORD{i}|{100 + i % 5}=X|10=042")
+    log_path_1 = tmp_path / 'session_1.log'
+    log_path_1.write_text('\n'.join(lines[:300]) + '\n# comment carried over to the next file')
+    log_path_2 = tmp_path / 'session_2.log'
+    log_path_2.write_text('\n'.join(lines[300:]) + '\n')
+
+    return [str(log_path_1), str(log_path_2)]
+
+
+def test_extract_fix_lines_from_files_in_parallel(tmp_path, monkeypatch):
+    files = create_log_files(tmp_path)
+    # force many small byte ranges
+    monkeypatch.setattr(fixations.fix_parse_log, 'MIN_RANGE_SIZE', 500)
+
+    expected = extract_fix_lines_from_str_lines(list(iter_lines_from_files(files)))
+    fix_tag_dict, fix_lines, used_fix_tags, version = extract_fix_lines_from_files_in_parallel(files, 3)
+    assert version == expected[3] == '4.2'
+    assert fix_lines == expected[1]
+    assert used_fix_tags == expected[2]
+    assert any(comment for _, _, comment in fix_lines)
+
+
+def test_print_tables_by_chunk(capsys):
+    lines = [f"12:00:00.00{i} 8=FIX.4.2|9=10|35=D|49=BUYER|56=SELLER|11=ORD{i}|10=042" for i in range(1, 4)]
+    print_tables_by_chunk(iter(lines), 1, 'psql')
+
+    # one table per line, the Δ/Σ following on from the previous table
+    tables = capsys.readouterr().out
+    assert tables.count('ORD') == 3
+    assert 'Δ:+.001' in tables and 'Σ:+.002' in tables
@@ -0,0 +1,246 @@
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from fixations.fix_store import Store, RetentionPolicy, CompressedLines
+
+
+def test_save_and_get(tmp_path):
+    store = Store(str(tmp_path / 'store.db'))
+    store.save('id1', 'lines 1')
+    assert tuple(store.get('id1'))[0] == 'lines 1'
+    store.save('id1', 'lines 1 updated')
+    assert tuple(store.get('id1'))[0] == 'lines 1 updated'
+    assert store.get('unknown') == (None, None)
+
+    store.save_many([('id2', 'lines 2'), ('id3', 'lines 3')])
+    assert store.str_id_already_exists('id2') and store.str_id_already_exists('id3')
+
+    # the saves are committed, i.e. visible from another connection
+    assert tuple(Store(str(tmp_path / 'store.db')).get('id3'))[0] == 'lines 3'
+
+
+def test_concurrent_saves_with_group_commit(tmp_path):
+    store = Store(str(tmp_path / 'store.db'), group_commit=True)
+
+    def save_lines(thread_index: int) -> None:
+        for i in range(20):
+            store.save(f"{thread_index}-{i}", f"lines {thread_index}-{i}")
+
+    threads = [threading.Thread(target=save_lines, args=(thread_index,)) for thread_index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(store.str_id_already_exists(f"{thread_index}-{i}") for thread_index in range(8) for i in range(20))
+    assert tuple(store.get('7-19'))[0] == 'lines 7-19'
+
+
+def test_group_commit_error_is_raised_to_the_caller(tmp_path, monkeypatch):
+    store = Store(str(tmp_path / 'store.db'), group_commit=True)
+
+    def fail(str_ids_and_lines):
+        raise UnicodeEncodeError('utf-8', 'lines', 0, 1, 'surrogates not allowed')
+
+    monkeypatch.setattr(store, 'save_many', fail)
+    with pytest.raises(UnicodeEncodeError):
+        store.save('id1', 'lines 1')
+
+    # the writer thread is still there for the next saves
+    monkeypatch.undo()
+    store.save('id2', 'lines 2')
+    assert store.writer_thread.is_alive()
+    assert tuple(store.get('id2'))[0] == 'lines 2'
+
+
+def test_in_memory_store_is_shared_by_threads(tmp_path):
+    store = Store(str(tmp_path / 'no_such_dir' / 'store.db'))
+    thread = threading.Thread(target=store.save, args=('id1', 'lines 1'))
+    thread.start()
+    thread.join()
+    assert tuple(store.get('id1'))[0] == 'lines 1'
+
+
+def test_identical_lines_are_stored_once(tmp_path):
+    store = Store(str(tmp_path / 'store.db'))
+    lines = "12:00:00.001 8=FIX.4.2|9=10|35=D|49=BUYER|56=SELLER|11=ORD1|55=IBM|10=001\n" * 100
+    str_id = store.save_lines(lines)
+    assert len(str_id) == 8
+    assert store.save_lines(lines) == str_id
+    store.save('other_id', lines)
+    assert tuple(store.get('other_id'))[0] == lines
+
+    blobs = store.conn.execute(f"SELECT size, length(data) FROM {Store.BLOBS_TABLE_NAME}").fetchall()
+    assert len(blobs) == 1
+    assert blobs[0][0] == len(lines) and blobs[0][1] < len(lines) / 10
+
+
+def test_compressed_lines_are_saved_like_lines(tmp_path):
+    store = Store(str(tmp_path / 'store.db'))
+    lines = [f"12:00:00.{i:03} 8=FIX.4.2|35=D|11=ORD{i}" for i in range(100)]
+    compressed_lines = CompressedLines()
+    for line in lines:
+        compressed_lines.add_line(line)
+
+    str_id = store.save_compressed_lines(compressed_lines)
+    assert tuple(store.get(str_id))[0] == '\n'.join(lines)
+    assert store.save_lines('\n'.join(lines)) == str_id
+    assert store.conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 1
+
+
+def test_colliding_short_str_id(tmp_path):
+    store = Store(str(tmp_path / 'store.db'))
+    lines = "some lines"
+    # the short str_id of these lines is already used by other lines
+    str_id = store.save_lines(lines)
+    store.save(str_id, "other lines")
+
+    longer_str_id = store.save_lines(lines)
+    assert longer_str_id != str_id and longer_str_id.startswith(str_id)
+    assert tuple(store.get(longer_str_id))[0] == lines
+    assert tuple(store.get(str_id))[0] == "other lines"
+
+
+def test_legacy_store_is_migrated(tmp_path):
+    store_path = str(tmp_path / 'store.db')
+    conn = sqlite3.connect(store_path)
+    conn.execute("CREATE TABLE str_id_to_lines (str_id TEXT NOT NULL PRIMARY KEY, lines TEXT NOT NULL, "
+                 "timestamp TEXT NOT NULL)")
+    conn.executemany("INSERT INTO str_id_to_lines VALUES (?, ?, ?)",
+                     [('id1', 'lines 1', '2020-01-01'), ('id2', 'lines 2', '2020-01-02'),
+                      ('id3', 'lines 1', '2020-01-03')])
+    conn.commit()
+    conn.close()
+
+    store = Store(store_path)
+    assert tuple(store.get('id1')) == ('lines 1', '2020-01-01')
+    assert tuple(store.get('id3')) == ('lines 1', '2020-01-03')
+    assert store.conn.execute(f"SELECT COUNT(*) FROM {Store.BLOBS_TABLE_NAME}").fetchone()[0] == 2
+    assert store.conn.execute("SELECT name FROM sqlite_master WHERE name = 'str_id_to_lines'").fetchone() is None
+
+    # already migrated
+    assert tuple(Store(store_path).get('id2')) == ('lines 2', '2020-01-02')
+
+
+def set_last_accessed(store, str_id, last_accessed):
+    with store.conn:
+        store.conn.execute(f"UPDATE {Store.ALIASES_TABLE_NAME} SET last_accessed = ? WHERE str_id = ?",
+                           (last_accessed, str_id))
+
+
+def test_evict_by_age(tmp_path):
+    store = Store(str(tmp_path / 'store.db'))
+    store.save_many([('old', 'old lines'), ('recent', 'recent lines'), ('old_but_read', 'old lines')])
+    set_last_accessed(store, 'old', '2000-01-01 00:00:00')
+    set_last_accessed(store, 'old_but_read', '2000-01-01 00:00:00')
+    # reading an id keeps it
+    assert tuple(store.get('old_but_read'))[0] == 'old lines'
+
+    assert store.evict(RetentionPolicy(max_age_days=30)) == 1
+    assert not store.str_id_already_exists('old')
+    assert store.str_id_already_exists('recent') and store.str_id_already_exists('old_but_read')
+    # the blob is still used by another id
+    assert tuple(store.get('old_but_read'))[0] == 'old lines'
+    assert store.evict(RetentionPolicy()) == 0
+
+
+def test_evict_by_size_and_compact(tmp_path):
+    store_path = str(tmp_path / 'store.db')
+    store = Store(store_path)
+    store.save_many((str(i), os.urandom(8192).hex()) for i in range(200))
+    for i in range(200):
+        set_last_accessed(store, str(i), f"2000-01-01 00:00:{i // 60:02}.{i % 60:02}")
+    size = store.get_used_size()
+    store.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    file_size = os.path.getsize(store_path)
+
+    store.evict(RetentionPolicy(max_size_bytes=size // 2))
+    assert store.get_used_size() <= size // 2
+    # the least recently accessed ids are evicted first
+    assert not store.str_id_already_exists('0') and store.str_id_already_exists('199')
+
+    assert store.compact() > 0
+    store.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    assert os.path.getsize(store_path) < file_size * 0.6
+
+
+def test_format_2_store_is_migrated(tmp_path):
+    store_path = str(tmp_path / 'store.db')
+    conn = sqlite3.connect(store_path)
+    conn.execute("CREATE TABLE str_id_aliases (str_id TEXT NOT NULL PRIMARY KEY, hash TEXT NOT NULL, "
+                 "timestamp TEXT NOT NULL)")
+    conn.execute("INSERT INTO str_id_aliases VALUES ('id1', 'hash1', '2020-01-01')")
+    conn.execute("PRAGMA user_version = 2")
+    conn.commit()
+    conn.close()
+
+    store = Store(store_path)
+    assert store.conn.execute("SELECT last_accessed FROM str_id_aliases").fetchone()[0] == '2020-01-01'
+    assert store.conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+
+
+# An eviction running while the same lines are saved again can't delete their blob from under the new alias
+def test_eviction_during_save_of_same_lines(tmp_path, monkeypatch):
+    store = Store(str(tmp_path / 'store.db'))
+    store.save('old', 'same lines')
+    set_last_accessed(store, 'old', '2000-01-01 00:00:00')
+
+    eviction_started = threading.Event()
+
+    def evict():
+        eviction_started.set()
+        store.evict(RetentionPolicy(max_age_days=30))
+
+    eviction_thread = threading.Thread(target=evict)
+    save_alias = store.save_alias
+
+    # the blob is found already stored: the eviction runs before the alias is saved
+    def save_alias_after_eviction(*args):
+        eviction_thread.start()
+        eviction_started.wait()
+        time.sleep(0.2)
+        save_alias(*args)
+
+    monkeypatch.setattr(store, 'save_alias', save_alias_after_eviction)
+    store.save('new', 'same lines')
+    eviction_thread.join()
+
+    assert not store.str_id_already_exists('old')
+    assert tuple(store.get('new'))[0] == 'same lines'
+
+
+# The processes using the same db take turns evicting: only the holder of the lease evicts until it's expired
+def test_eviction_lease(tmp_path):
+    store_path = str(tmp_path / 'store.db')
+    store, other_store = Store(store_path), Store(store_path)
+    assert store.take_lease('eviction', 60)
+    assert not other_store.take_lease('eviction', 60)
+    # renewed by its holder
+    assert store.take_lease('eviction', 0)
+    assert other_store.take_lease('eviction', 60)
+    assert not store.take_lease('eviction', 60)
+
+    # a forked process is another holder
+    other_store.reconnect()
+    assert not other_store.take_lease('eviction', 60)
+
+
+# The eviction thread keeps going whatever goes wrong
+def test_eviction_thread_survives_errors(tmp_path, monkeypatch):
+    store = Store(str(tmp_path / 'store.db'))
+    evicted = threading.Event()
+    errors = [ValueError("not a sqlite error")]
+
+    def evict_and_compact(_):
+        if errors:
+            raise errors.pop()
+        evicted.set()
+
+    monkeypatch.setattr(store, 'evict_and_compact', evict_and_compact)
+    store.start_eviction_thread(RetentionPolicy(), interval=0.01)
+    assert evicted.wait(5)
+    assert store.eviction_thread.is_alive()
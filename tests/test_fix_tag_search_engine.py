@@ -0,0 +1,50 @@
+from fixations.fix_tag_search_engine import FixTagSearchEngine, RANK_ID, RANK_NAME_PREFIX, RANK_NAME, \
+    RANK_ENUM_NAME, RANK_DESCRIPTION, RANK_SIMILAR
+from tests.conftest import create_fix_tag
+
+
+OLD_FIX_TAGS = {tag.id: tag for tag in [
+    create_fix_tag('35', 'MsgType', 'Type of message', [('D', 'NewOrderSingle'), ('8', 'ExecutionReport')]),
+    create_fix_tag('40', 'OrdType', 'Type of order', [('1', 'Market'), ('2', 'Limit')]),
+    create_fix_tag('63', 'SettlmntTyp', 'Settlement period of the order'),
+]}
+NEW_FIX_TAGS = {tag.id: tag for tag in [
+    create_fix_tag('35', 'MsgType', 'Type of message', [('D', 'NewOrderSingle'), ('8', 'ExecutionReport')]),
+    create_fix_tag('40', 'OrdType', 'Type of order', [('1', 'Market'), ('2', 'Limit'), ('P', 'Pegged')]),
+    create_fix_tag('1237', 'NoOrdTypeRules', 'Number of order types'),
+    create_fix_tag('1111', 'TriggerOrderType', 'The OrdType the order should have after the trigger has hit'),
+]}
+
+
+def search(query, fix_versions=None, limit=None):
+    fix_tag_search_engine = FixTagSearchEngine({'4.2': OLD_FIX_TAGS, '5.0': NEW_FIX_TAGS})
+    return [(result.fix_tag_id, result.rank, result.match, result.fix_versions)
+            for result in fix_tag_search_engine.search(query, fix_versions, limit)]
+
+
+def test_results_are_ranked():
+    assert search('OrdType') == [('40', RANK_NAME_PREFIX, 'OrdType', ['4.2', '5.0']),
+                                 ('1237', RANK_NAME, 'NoOrdTypeRules', ['5.0']),
+                                 ('1111', RANK_DESCRIPTION,
+                                  'The OrdType the order should have after the trigger has hit', ['5.0'])]
+    assert search('40')[0] == ('40', RANK_ID, '40', ['4.2', '5.0'])
+    # the closest name first
+    assert [fix_tag_id for fix_tag_id, *_ in search('Type')][:4] == ['35', '40', '1237', '1111']
+    assert search('new order single') == [('35', RANK_ENUM_NAME, 'D: NewOrderSingle', ['4.2', '5.0'])]
+    assert search('peg') == [('40', RANK_ENUM_NAME, 'P: Pegged', ['5.0'])]
+    # only the names starting with a short query
+    assert search('Or') == [('40', RANK_NAME_PREFIX, 'OrdType', ['4.2', '5.0'])]
+    assert search('') == [] and search('xyzzy') == []
+
+
+def test_typos_match_similar_names():
+    assert search('ordtpye')[0][:3] == ('40', RANK_SIMILAR, 'OrdType')
+    assert search('settlment type')[0][:3] == ('63', RANK_SIMILAR, 'SettlmntTyp')
+
+
+def test_fix_versions_and_limit():
+    assert search('OrdType', ['4.2']) == [('40', RANK_NAME_PREFIX, 'OrdType', ['4.2'])]
+    assert search('peg', ['4.2']) == []
+    assert search('OrdType', ['9.9']) == []
+    assert len(search('order', limit=2)) == 2
+    assert search('order', limit=2) == search('order')[:2]
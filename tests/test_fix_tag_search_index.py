@@ -0,0 +1,31 @@
+from fixations.fix_tag_search_index import FixTagSearchIndex
+from fixations.fix_tags import create_highlighted_text
+from fixations.fix_utils import extract_info_for_fix_version
+
+
+def test_search_matches_substring_search():
+    fix_tag_dict = extract_info_for_fix_version('4.2').fix_tags_by_tag_id
+    fix_tag_search_index = FixTagSearchIndex(fix_tag_dict)
+
+    def search_naively(search):
+        return [fix_tag_id for fix_tag_id, searched_text in
+                zip(fix_tag_search_index.fix_tag_ids, fix_tag_search_index.searched_texts)
+                if search.lower() in searched_text]
+
+    # typing, deleting and retyping
+    for search in ['', 'o', 'or', 'ord', 'orde', 'order', 'ordertype', 'ord', 'typ', 'xyzzy', '35', 'D', '', 'ClOrd']:
+        tag_indexes = fix_tag_search_index.search(search)
+        assert [fix_tag_search_index.fix_tag_ids[tag_index] for tag_index in tag_indexes] == search_naively(search)
+
+    assert [fix_tag_search_index.fix_tag_ids[i] for i in fix_tag_search_index.search('OrdType')] == ['40']
+    grid_lines = fix_tag_search_index.get_grid_lines(fix_tag_search_index.search('OrdType'))
+    # top border, headers, header separator, the OrdType row and its values, and the final separator
+    assert grid_lines[1].split('|')[1].strip() == 'ID'
+    assert '| OrdType' in grid_lines[3] and grid_lines[-1].startswith('+-')
+    assert len(grid_lines) == 3 + len(fix_tag_dict['40'].values) + 1
+
+
+def test_create_highlighted_text():
+    assert create_highlighted_text("Order ORDER order", "order", 'hl') == \
+           ['', ('hl', 'Order'), ' ', ('hl', 'ORDER'), ' ', ('hl', 'order'), '']
+    assert create_highlighted_text("abc", "", 'hl') == ["abc"]
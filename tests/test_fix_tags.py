@@ -0,0 +1,66 @@
+import re
+
+from fixations.fix_tags import Urwid, get_data_grid_for_search
+from fixations.fix_utils import extract_info_for_fix_version
+
+SIZE = (160, 40)
+
+
+def get_rendered_text(fix_tags_urwid):
+    return '\n'.join(line.decode() for line in fix_tags_urwid.top.render(SIZE, focus=True).text)
+
+
+def test_rows_are_created_as_they_come_into_view():
+    fix_tag_dict = extract_info_for_fix_version('4.4').fix_tags_by_tag_id
+    fix_tags_urwid = Urwid(fix_tag_dict, '4.4')
+    search_results = fix_tags_urwid.search_results
+
+    assert len(search_results) == len(fix_tag_dict)
+    get_rendered_text(fix_tags_urwid)
+    # only the rows on screen (at least one line each)
+    assert 0 < len(search_results.row_widgets) < SIZE[1]
+
+    fix_tags_urwid.search_str.set_edit_text('order')
+    assert len(search_results.row_widgets) == 0
+    assert 'order' in get_rendered_text(fix_tags_urwid).lower()
+    assert 0 < len(search_results.row_widgets) < SIZE[1] < len(search_results)
+
+    # the results are scrolled while the search keeps the keyboard
+    assert fix_tags_urwid.top.keypress(SIZE, 'page down') is None
+    assert fix_tags_urwid.top.keypress(SIZE, 'down') is None
+    assert search_results.focus > 0
+    assert len(search_results.row_widgets) < 2 * SIZE[1]
+    fix_tags_urwid.on_unhandled_input('ctrl end')
+    assert search_results.focus == len(search_results) - 1
+    fix_tags_urwid.on_unhandled_input('ctrl home')
+    assert search_results.focus == 0
+
+
+def test_jump_to_tag():
+    fix_tags_urwid = Urwid(extract_info_for_fix_version('4.4').fix_tags_by_tag_id, '4.4')
+    fix_tags_urwid.search_str.set_edit_text('ordtpye')
+    fix_tags_urwid.on_unhandled_input('enter')
+
+    # all the tags are listed again, the focus on the one best matching the typo
+    assert fix_tags_urwid.search == '' and len(fix_tags_urwid.search_results) > 100
+    fix_tag_search_index = fix_tags_urwid.fix_tag_search_index
+    assert fix_tag_search_index.fix_tag_ids[fix_tags_urwid.search_results.get_focus()[1]] == '40'
+    assert '| OrdType' in get_rendered_text(fix_tags_urwid)
+
+
+def get_grid_tag_ids(grid):
+    return re.findall(r'^\| +(\d+) +\|', grid, re.MULTILINE)
+
+
+def test_data_grid_for_search():
+    fix_tag_dict = extract_info_for_fix_version('4.4').fix_tags_by_tag_id
+
+    # whatever contains the search, however short
+    assert len(get_grid_tag_ids(get_data_grid_for_search(fix_tag_dict, 'px', '4.4'))) == 31
+    assert len(get_grid_tag_ids(get_data_grid_for_search(fix_tag_dict, 'ab', '4.4'))) == 71
+    assert len(get_grid_tag_ids(get_data_grid_for_search(fix_tag_dict, '1: ', '4.4'))) == 185
+
+    # the best match first, the typos last
+    fix_tag_ids = get_grid_tag_ids(get_data_grid_for_search(fix_tag_dict, 'lastpx', '4.4'))
+    assert fix_tag_ids[0] == '31' and len(fix_tag_ids) == 10
+    assert get_grid_tag_ids(get_data_grid_for_search(fix_tag_dict, 'ordtpye', '4.4'))[0] == '40'
@@ -0,0 +1,33 @@
+import pytest
+
+from fixations.fix_timestamp import parse_timestamp, compute_delta_ns, format_delta, NS_PER_SECOND, NS_PER_DAY
+
+
+def test_parse_timestamp():
+    assert parse_timestamp("00:00:01") == NS_PER_SECOND
+    assert parse_timestamp("12:34:56.1") == parse_timestamp("12:34:56,100") == 45_296_100_000_000
+    assert parse_timestamp("12:34:56.123456789") == 45_296_123_456_789
+    # FIX UTCTimestamp and ISO 8601-ish dates are since the epoch
+    assert parse_timestamp("19700102-00:00:00.000000001") == NS_PER_DAY + 1
+    assert parse_timestamp("1970-01-02T00:00:00") == parse_timestamp("1970-01-02 00:00:00") == NS_PER_DAY
+
+    for bad_timestamp in ("12:34:57.", "12:34", "24:00:00", "12:34:56Z", "12:34:56.1234567890", "junk"):
+        with pytest.raises(ValueError):
+            parse_timestamp(bad_timestamp)
+
+
+def test_compute_delta_ns():
+    assert compute_delta_ns(parse_timestamp("20200102-00:00:01"), parse_timestamp("20200101-23:59:59")) == \
+           2 * NS_PER_SECOND
+    # only the time of day when just one of them has a date
+    assert compute_delta_ns(parse_timestamp("12:00:01"), parse_timestamp("20200101-12:00:00")) == NS_PER_SECOND
+
+
+def test_format_delta():
+    assert format_delta(0) == '+'
+    assert format_delta(10 * NS_PER_SECOND) == '+10'
+    assert format_delta(-(3600 + 2 * 60 + 3) * NS_PER_SECOND) == '-1:02:03'
+    assert format_delta(120_000_000) == '+.12'
+    assert format_delta(123_456_000) == '+.123,456'
+    assert format_delta(NS_PER_SECOND + 789) == '+1.000,000,789'
+    assert format_delta(25 * 3600 * NS_PER_SECOND) == '+25:00:00'
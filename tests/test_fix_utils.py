@@ -9,7 +9,10 @@ from fixations.fix_utils import extract_fix_lines_from_str_lines, extract_info_f
     extract_version_from_first_fix_line, extract_timestamp, FIX_TAG_ID_SENDING_TIME, path_for_fix_version, \
     get_list_of_available_fix_versions, \
     check_for_additional_fix_definitions, Additional_tag_cache, transpose_data_grid, get_timestamp_with_delta, \
-    get_fix_definition_dir
+    get_fix_definition_dir, extract_info_for_fix_version_from_xml, compute_fix_definitions_hash, \
+    load_compiled_fix_version_info, save_compiled_fix_version_info, FixTag, parse_fix_line_into_kvs, \
+    extract_fix_lines_from_bytes, extract_fix_line_chunks_from_str_lines, create_fix_lines_grid, FIX_VERSION_ALL, \
+    extract_info_for_all_fix_versions, compute_all_fix_versions_hash, get_comment_of_last_line
 
 ADDITIONAL_FIX_TAGS_URL = 'https://raw.githubusercontent.com/jeromegit/fixations/main/data/additional_fixtags.txt'
 
@@ -67,6 +70,74 @@ def test_fix_versions_available():
     assert "1.1" in versions
 
 
+def test_compiled_fix_version_info(tmp_path, monkeypatch):
+    monkeypatch.setattr(fixations.fix_utils, 'get_data_dir_path', lambda: str(tmp_path))
+    fix_version = '4.4'
+    fix_version_info = extract_info_for_fix_version_from_xml(fix_version, {})
+    definitions_hash = compute_fix_definitions_hash(fix_version, {})
+    save_compiled_fix_version_info(fix_version_info, definitions_hash)
+    assert load_compiled_fix_version_info(fix_version, definitions_hash) == fix_version_info
+
+    # any change to the additional FIX definitions must lead to a different compiled file
+    additional_tag_dict = {'8005': FixTag('8005', 'MyTag', 'String', '', {})}
+    assert compute_fix_definitions_hash(fix_version, additional_tag_dict) != definitions_hash
+    assert load_compiled_fix_version_info(fix_version, compute_fix_definitions_hash(fix_version,
+                                                                                     additional_tag_dict)) is None
+
+
+def test_all_fix_versions_info(tmp_path, monkeypatch):
+    monkeypatch.setattr(fixations.fix_utils, 'get_data_dir_path', lambda: str(tmp_path))
+    # ALL_VERSIONS is cached by both
+    extract_info_for_fix_version.cache_clear()
+    extract_info_for_all_fix_versions.cache_clear()
+    try:
+        all_versions_info = extract_info_for_fix_version(FIX_VERSION_ALL)
+        assert all_versions_info.version == FIX_VERSION_ALL
+        assert len(list((tmp_path / 'compiled').glob(f'FIX.{FIX_VERSION_ALL}-*.pickle'))) == 1
+
+        # the tags and blocks of all versions, the newest winning
+        fix_version_info_42 = extract_info_for_fix_version('4.2')
+        fix_version_info_50sp2 = extract_info_for_fix_version('5.0SP2')
+        assert '20' in fix_version_info_42.fix_tags_by_tag_id and '20' not in fix_version_info_50sp2.fix_tags_by_tag_id
+        assert all_versions_info.fix_tags_by_tag_id['20'] == fix_version_info_42.fix_tags_by_tag_id['20']
+        assert all_versions_info.fix_tags_by_tag_id['40'].name == fix_version_info_50sp2.fix_tags_by_tag_id['40'].name
+        assert all_versions_info.fix_tags_by_tag_id['150'].values['2'].name == 'Fill'
+        assert set(fix_version_info_50sp2.fix_blocks_by_id) <= set(all_versions_info.fix_blocks_by_id)
+        assert all_versions_info.fix_blocks_by_count_tag['453'].tag_ids >= \
+               fix_version_info_50sp2.fix_blocks_by_count_tag['453'].tag_ids
+
+        # loaded back as is, without being rebuilt
+        extract_info_for_all_fix_versions.cache_clear()
+        monkeypatch.setattr(fixations.fix_utils, 'merge_fix_version_infos', None)
+        assert extract_info_for_all_fix_versions() == all_versions_info
+    finally:
+        extract_info_for_fix_version.cache_clear()
+        extract_info_for_all_fix_versions.cache_clear()
+
+    # any change to the XML files must lead to a different compiled file
+    xml_path = tmp_path / 'Fields.xml'
+    xml_path.write_text('<Fields/>')
+    monkeypatch.setattr(fixations.fix_utils, 'path_for_fix_version', lambda fix_version, file: str(xml_path))
+    definitions_hash = compute_all_fix_versions_hash(['4.2'], {})
+    xml_path.write_text('<Fields><Field/></Fields>')
+    assert compute_all_fix_versions_hash(['4.2'], {}) != definitions_hash
+
+
+# ALL_VERSIONS (e.g. set by a command line) decodes the lines of any version
+def test_parse_fix_lines_of_mixed_versions():
+    lines = [f"! version={FIX_VERSION_ALL}",
+             "10:00:00 8=FIX.4.2|9=10|35=8|20=0|150=2|10=000",
+             "10:00:01 8=FIXT.1.1|9=10|35=8|1128=9|150=F|453=1|448=A|447=D|452=1|10=000"]
+    fix_tag_dict, fix_lines, used_fix_tags, version = extract_fix_lines_from_str_lines(lines)
+    assert version == FIX_VERSION_ALL
+    assert [fix_tags for _, fix_tags, _ in fix_lines] == [
+        {'000008': 'FIX.4.2 (FIX42)', '000009': '10', '000035': '8 (ExecutionReport)', '000020': '0 (New)',
+         '000150': '2 (Fill)', '000010': '000'},
+        {'000008': 'FIXT.1.1 (FIXT11)', '000009': '10', '000035': '8 (ExecutionReport)', '001128': '9 (FIX50SP2)',
+         '000150': 'F (Trade)', '000453 00 000453': '1', '000453 01 000448': 'A',
+         '000453 01 000447': 'D (Proprietary)', '000453 01 000452': '1 (ExecutingFirm)', '000010': '000'}]
+
+
 def test_match():
     VERSION_TO_TEST = '8.8'
     with pytest.raises(AssertionError, match=rf"The specified FIX version:{VERSION_TO_TEST} is not valid.*"):
@@ -141,6 +212,61 @@ def assert_lines_with_timestamp(timestamp_prefix):
                                         '10': 1}
 
 
+def test_parse_fix_line_with_repeating_blocks():
+    line = "8=FIX.4.4|9=10|35=8|453=2|448=A|447=D|452=1|802=1|523=X|803=4|448=B|447=D|452=3|55=IBM|10=000"
+    kvs, comment = parse_fix_line_into_kvs(line, extract_info_for_fix_version('4.4'))
+    assert comment == ''
+    assert kvs == {'000008': 'FIX.4.4',
+                   '000009': '10',
+                   '000035': '8 (ExecutionReport)',
+                   '000453 00 000453': '2',
+                   '000453 01 000448': 'A',
+                   '000453 01 000447': 'D (Proprietary)',
+                   '000453 01 000452': '1 (ExecutingFirm)',
+                   '000453 01 000802 00 000802': '1',
+                   '000453 01 000802 01 000523': 'X',
+                   '000453 01 000802 01 000803': '4 (Application)',
+                   '000453 02 000448': 'B',
+                   '000453 02 000447': 'D (Proprietary)',
+                   '000453 02 000452': '3 (ClientID)',
+                   '000055': 'IBM',
+                   '000010': '000'}
+
+
+def test_extract_fix_lines_from_bytes():
+    lines = ["# first comment",
+             "some junk that resets the first comment",
+             "12:34:56.789 8=FIX.4.2|9=10|35=D|49=MY_SCID|56=MY_TCID|55=GOOG|10=042",
+             "",
+             "# second comment",
+             " \t ",
+             "12:34:57.789 8=FIX.4.2|9=10|35=F|49=MY_SCID|56=MY_TCID|55=GOOG|10=042",
+             "more junk"]
+    data = '\n'.join(lines).encode()
+    assert extract_fix_lines_from_bytes(data) == extract_fix_lines_from_str_lines(lines)
+    _, fix_lines, _, version = extract_fix_lines_from_bytes(data)
+    assert version == '4.2'
+    assert [comment for _, _, comment in fix_lines] == ['', 'second comment']
+
+
+def test_extract_fix_line_chunks_from_str_lines():
+    lines = ["some junk before the first FIX line"]
+    for i in range(5):
+        lines.append(f"# comment {i}")
+        lines.append(f"12:34:5{i}.789 8=FIX.4.2|9=10|35=D|49=MY_SCID|56=MY_TCID|{100 + i}=X|10=042")
+    _, all_fix_lines, all_used_fix_tags, _ = extract_fix_lines_from_str_lines(lines)
+
+    chunks = list(extract_fix_line_chunks_from_str_lines(iter(lines), 2))
+    assert [len(fix_lines) for _, fix_lines, _, _ in chunks] == [2, 2, 1]
+    assert [fix_line for _, fix_lines, _, _ in chunks for fix_line in fix_lines] == all_fix_lines
+    assert all(version == '4.2' for _, _, _, version in chunks)
+    # each chunk only has its own used tags
+    assert '000100' in chunks[0][2] and '000102' not in chunks[0][2]
+    assert set(key for _, _, used_fix_tags, _ in chunks for key in used_fix_tags) == set(all_used_fix_tags)
+
+    assert list(extract_fix_line_chunks_from_str_lines(["no FIX line", "here"], 2)) == []
+
+
 def test_dont_choke_on_emptyish_lines():
     lines = [
         "20220215-14:30:01.870 8=FIX.4.2 | 9=0192 | 35=D | 34=000006393| 49=MY_SCID | 56=MY_TCID | " +
@@ -174,6 +300,29 @@ def test_transpose_data_grid():
     assert expected_rows == actual_rows
 
 
+def test_create_fix_lines_grid():
+    lines = ["12:00:00.001 8=FIX.4.2|9=10|35=D|49=MY_SCID|56=MY_TCID|52=20200101-12:00:00.001|55=IBM|10=001",
+             "12:00:00.002 8=FIX.4.2|9=10|35=D|49=MY_SCID|56=MY_TCID|60=20200101-12:00:00.002|10=002"]
+    fix_tag_dict, fix_lines, used_fix_tags, _ = extract_fix_lines_from_str_lines(lines)
+
+    headers, rows, comment_row = create_fix_lines_grid(fix_tag_dict, fix_lines, used_fix_tags,
+                                                       with_session_level_tags=False, top_header_tags=['49'])
+    assert comment_row is None
+    assert len(headers) == 4
+    rows_by_tag_id = {row[0]: row for row in rows[1:]}
+    assert rows[0] == ['49', 'SenderCompID', 'MY_SCID', 'MY_SCID']
+    assert '9' not in rows_by_tag_id
+    assert rows_by_tag_id['55'] == ['55', 'Symbol', 'IBM', '']
+    # the date of the time tags is removed unless show_date is set
+    assert rows_by_tag_id['52'] == ['52', 'SendingTime', '12:00:00.001', '']
+    assert rows_by_tag_id['60'] == ['60', 'TransactTime', '', '12:00:00.002']
+
+    _, rows, _ = create_fix_lines_grid(fix_tag_dict, fix_lines, used_fix_tags, show_date=True, transpose=True)
+    assert len(rows) == 3
+    assert rows[1][1:] == [row[2] for row in create_fix_lines_grid(fix_tag_dict, fix_lines, used_fix_tags,
+                                                                   show_date=True)[1]]
+
+
 def test_additional_fixtags_with_http_url():
     fixtags = check_for_additional_fix_definitions(ADDITIONAL_FIX_TAGS_URL)
     assert '8005' in fixtags
@@ -255,3 +404,16 @@ def tuple_equal(expected, actual):
         return True
     else:
         return False
+
+
+def test_get_comment_of_last_line():
+    lines = ["# first", "12:00:00.001 8=FIX.4.2|35=D|10=001", "# second", "  "]
+    assert get_comment_of_last_line(lines) == 'second'
+    assert get_comment_of_last_line(lines[:2], 'default') == ''
+    assert get_comment_of_last_line([], 'default') == 'default'
+
+    # the same out of the bytes of the lines ending before the end offset
+    data = '\n'.join(lines).encode()
+    assert get_comment_of_last_line(data) == 'second'
+    assert get_comment_of_last_line(data, end=data.index(b'12:')) == 'first'
+    assert get_comment_of_last_line(data, 'default', end=0) == 'default'
@@ -0,0 +1,93 @@
+import pickle
+
+from fixations import fix_version_matrix, fix_utils
+from fixations.fix_utils import extract_info_for_fix_version, get_list_of_available_fix_versions
+from fixations.fix_version_matrix import create_fix_version_matrix, get_fix_version_matrix, \
+    compute_fix_version_matrix_key, FixVersionDiff
+from tests.conftest import create_fix_tag
+
+
+FIX_TAG_DICTS_BY_VERSION = {
+    '4.2': {'40': create_fix_tag('40', 'OrdType', values=[('1', 'Market'), ('2', 'Limit'), ('E', 'Hidden')]),
+            '63': create_fix_tag('63', 'SettlmntTyp')},
+    '4.4': {'40': create_fix_tag('40', 'OrdType', values=[('1', 'Market'), ('2', 'Limit'), ('P', 'Pegged')]),
+            '63': create_fix_tag('63', 'SettlType')},
+    '5.0': {'40': create_fix_tag('40', 'OrdType', values=[('1', 'Market'), ('2', 'LimitOrder'), ('P', 'Pegged')]),
+            '63': create_fix_tag('63', 'SettlType', desc='Settlement type'),
+            '1237': create_fix_tag('1237', 'NoOrdTypeRules')},
+}
+
+
+def test_diff():
+    matrix = create_fix_version_matrix(FIX_TAG_DICTS_BY_VERSION)
+    assert matrix.tag_version_masks == {'40': 0b111, '63': 0b111, '1237': 0b100}
+    assert matrix.value_version_masks['40'] == {'1': 0b111, '2': 0b111, 'E': 0b001, 'P': 0b110}
+
+    fix_version_diff = matrix.diff('4.2', '5.0')
+    assert fix_version_diff.added_tag_ids == ['1237'] and fix_version_diff.removed_tag_ids == []
+    assert fix_version_diff.changed_tag_ids == ['63']
+    assert fix_version_diff.added_values == [('40', 'P', 'Pegged')]
+    assert fix_version_diff.removed_values == [('40', 'E', 'Hidden')]
+    assert fix_version_diff.renamed_values == [('40', '2', 'Limit', 'LimitOrder')]
+    assert matrix.diff('4.4', '4.4') == FixVersionDiff('4.4', '4.4')
+
+
+def test_merged_tags_and_clashes():
+    matrix = create_fix_version_matrix(FIX_TAG_DICTS_BY_VERSION)
+    merged_fix_tag = matrix.get_fix_tag('40', matrix.get_version_mask())
+    assert [(v.value, v.name) for v in merged_fix_tag.values.values()] == \
+           [('1', 'Market'), ('2', 'LimitOrder'), ('E', 'Hidden'), ('P', 'Pegged')]
+    assert matrix.get_fix_tag('63', matrix.get_version_mask(['4.2'])).name == 'SettlmntTyp'
+    assert matrix.get_fix_tag('1237', matrix.get_version_mask(['4.2', '4.4'])) is None
+    assert matrix.get_values('40', '4.4') == [('1', 'Market'), ('2', 'Limit'), ('P', 'Pegged')]
+
+    assert [(c.fix_tag_id, c.value, c.name, c.fix_version, c.fix_version_name)
+            for c in matrix.get_value_clashes(matrix.get_version_mask())] == [('40', '2', 'Limit', '5.0', 'LimitOrder')]
+    assert matrix.get_value_clashes(matrix.get_version_mask(['4.2', '4.4'])) == []
+
+
+# The matrix gives the same merged tags and clashes as merging the versions' infos one after the other
+def test_matrix_merges_like_fix_version_infos():
+    fix_versions = get_list_of_available_fix_versions(include_fix_version_1_1=False)
+    # the merge modifies the infos, which are cached
+    fix_version_infos = [pickle.loads(pickle.dumps(extract_info_for_fix_version(fix_version)))
+                         for fix_version in fix_versions]
+    all_versions_info = fix_version_infos[0]
+    clashes = []
+    for fix_version_info in fix_version_infos[1:]:
+        clashes.extend(all_versions_info.merge_with_other_fix_version_info(fix_version_info))
+
+    matrix = create_fix_version_matrix({fix_version: extract_info_for_fix_version(fix_version).fix_tags_by_tag_id
+                                        for fix_version in fix_versions})
+    version_mask = matrix.get_version_mask()
+    assert matrix.get_tag_ids(version_mask) == sorted(all_versions_info.fix_tags_by_tag_id, key=int)
+    for fix_tag_id, fix_tag in all_versions_info.fix_tags_by_tag_id.items():
+        merged_fix_tag = matrix.get_fix_tag(fix_tag_id, version_mask)
+        assert merged_fix_tag.values == {value: fix_tag.values[value] for value in sorted(fix_tag.values)}
+        merged_fix_tag.values = fix_tag.values
+        assert merged_fix_tag == fix_tag
+    assert sorted(map(repr, matrix.get_value_clashes(version_mask))) == sorted(map(repr, clashes))
+
+
+def test_matrix_is_saved_and_rebuilt_when_xml_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(fix_version_matrix, 'get_data_dir_path', lambda: str(tmp_path))
+    get_fix_version_matrix.cache_clear()
+    try:
+        matrix = get_fix_version_matrix()
+        assert len(list((tmp_path / 'compiled').glob('FIX_VERSION_MATRIX-*.pickle'))) == 1
+
+        def fail(*args):
+            raise AssertionError("Shouldn't be rebuilt")
+
+        monkeypatch.setattr(fix_version_matrix, 'create_fix_version_matrix', fail)
+        get_fix_version_matrix.cache_clear()
+        assert get_fix_version_matrix() == matrix
+    finally:
+        get_fix_version_matrix.cache_clear()
+
+    xml_path = tmp_path / 'Fields.xml'
+    xml_path.write_text('<Fields/>')
+    monkeypatch.setattr(fix_utils, 'path_for_fix_version', lambda fix_version, file: str(xml_path))
+    matrix_key = compute_fix_version_matrix_key(['4.2'], {})
+    xml_path.write_text('<Fields><Field/></Fields>')
+    assert compute_fix_version_matrix_key(['4.2'], {}) != matrix_key
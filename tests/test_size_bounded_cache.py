@@ -0,0 +1,23 @@
+from fixations.size_bounded_cache import SizeBoundedCache
+
+
+def test_least_recently_used_values_are_evicted():
+    cache = SizeBoundedCache(10)
+    cache.put('a', 'A', 4)
+    cache.put('b', 'B', 4)
+    assert cache.get('a') == 'A'
+    cache.put('c', 'C', 4)
+    assert cache.get('b') is None
+    assert cache.get('a') == 'A' and cache.get('c') == 'C'
+    assert cache.size == 8 and len(cache) == 2
+    assert (cache.hit_count, cache.miss_count) == (3, 1)
+
+
+def test_oversized_values_and_invalidation():
+    cache = SizeBoundedCache(10)
+    cache.put('a', 'A', 4)
+    cache.put('a', 'AA', 11)
+    assert cache.get('a') is None and cache.size == 0
+    cache.put('b', 'B', 4)
+    cache.invalidate('b')
+    assert cache.get('b') is None and cache.size == 0
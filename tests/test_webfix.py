@@ -0,0 +1,118 @@
+import io
+import urllib.parse
+
+import pytest
+
+from fixations import webfix
+
+pytestmark = pytest.mark.usefixtures('webfix_store')
+
+LINES = "12:00:00.001 8=FIX.4.2|9=10|35=D|49=BUYER|56=SELLER|11=ORD1|55=IBM|10=001\n" \
+        "12:00:00.002 8=FIX.4.2|9=10|35=8|49=SELLER|56=BUYER|11=ORD1|37=EX1|39=0|10=002"
+
+
+def test_id_lookups_are_cached():
+    client = webfix.app.test_client()
+    str_id = webfix.store_fix_lines(LINES)
+    webfix.render_cache.clear()
+
+    response = client.get(f"/?id={str_id}")
+    assert response.status_code == 200 and b'ORD1' in response.data
+    etag = response.headers['ETag']
+    hit_count = webfix.render_cache.hit_count
+    assert client.get(f"/?id={str_id}").data == response.data
+    assert webfix.render_cache.hit_count == hit_count + 1
+    # the other variants of the page are cached separately
+    assert client.get(f"/?id={str_id}&transpose=1").data != response.data
+
+    # the browser's copy is still valid
+    assert client.get(f"/?id={str_id}", headers={'If-None-Match': etag}).status_code == 304
+
+    # until the id is saved with other lines
+    webfix.store.save(str_id, LINES.replace('ORD1', 'ORD2'))
+    response = client.get(f"/?id={str_id}", headers={'If-None-Match': etag})
+    assert response.status_code == 200 and b'ORD2' in response.data and b'ORD1' not in response.data
+
+
+def test_unknown_id_is_not_cached():
+    client = webfix.app.test_client()
+    webfix.render_cache.clear()
+    response = client.get("/?id=unknown")
+    assert response.status_code == 200 and 'ETag' not in response.headers
+    assert len(webfix.render_cache) == 0
+
+
+def test_stdin_is_streamed(monkeypatch):
+    monkeypatch.setattr(webfix, 'STDIN_READ_SIZE', 7)
+    monkeypatch.setattr(webfix, 'STDIN_TABLE_SIZE', 2)
+    lines = ["# orders", *LINES.splitlines(), "not a FIX line", LINES.splitlines()[0].replace('ORD1', 'ORD3')]
+    body = urllib.parse.quote_plus('\n'.join(lines)).encode()
+
+    response = webfix.app.test_client().post('/stdin', data=body)
+    assert response.is_streamed
+    text = response.get_data(as_text=True)
+    # 2 tables followed by the URL of the same id as the whole body would have been stored with
+    assert text.count('TAG_ID') == 2 and 'ORD3' in text
+    assert text.splitlines()[-1].endswith(f"?id={webfix.store_fix_lines(chr(10).join(lines))}")
+    assert "not a FIX line" in webfix.store.get(text.splitlines()[-1].split("?id=")[1])[0]
+
+
+def test_stdin_without_fix_lines():
+    response = webfix.app.test_client().post('/stdin', data=b'nothing to see')
+    assert response.get_data(as_text=True) == "Could not find FIX lines!"
+
+
+def test_iter_byte_lines_from_body(monkeypatch):
+    body = urllib.parse.quote_plus("a b\n%cé\n\nd").encode()
+    for read_size in range(1, len(body) + 1):
+        monkeypatch.setattr(webfix, 'STDIN_READ_SIZE', read_size)
+        assert list(webfix.iter_byte_lines_from_body(io.BytesIO(body))) == [b'a b', b'%c\xc3\xa9', b'', b'd']
+        assert list(webfix.iter_byte_lines_from_body(io.BytesIO(body + b'%0A'))) == \
+            [b'a b', b'%c\xc3\xa9', b'', b'd', b'']
+
+
+def test_huge_grids_are_served_by_windows(monkeypatch):
+    monkeypatch.setattr(webfix, 'VIRTUAL_GRID_MIN_CELL_COUNT', 100)
+    monkeypatch.setattr(webfix, 'INITIAL_WINDOW_COLUMN_COUNT', 5)
+    client = webfix.app.test_client()
+    lines = '\n'.join(LINES.splitlines()[0].replace('ORD1', f"ORD{i}") for i in range(50))
+    webfix.grid_cache.clear()
+
+    page = client.post('/', data={'fix_lines': lines}).get_data(as_text=True)
+    # only the first window of the grid is in the page: it's not rendered as a table
+    assert 'virtual_grid_window' in page and '<table class="table">' not in page
+    assert len(webfix.grid_cache) == 1
+    str_id = webfix.store_fix_lines(lines)
+    # nor are the lines: the textarea gets them from /lines
+    assert 'textarea_lines.push' not in page and f"/lines?id={str_id}" in page
+    assert client.get(f"/lines?id={str_id}").get_data(as_text=True) == lines
+    assert client.get("/lines?id=unknown").status_code == 404
+
+    window = client.get(f"/grid?id={str_id}&row_start=0&row_count=2&column_start=45&column_count=10").get_json()
+    assert webfix.grid_cache.hit_count == 1
+    assert (window['row_count'], window['column_count'], window['row_start'], window['column_start']) == (5, 50, 0, 45)
+    assert window['headers'][:2] == ['TAG_ID', 'TAG_NAME'] and len(window['headers']) == 2 + 5
+    assert window['rows'][1][:2] == ['35', 'MsgType'] and len(window['rows']) == 2
+    assert window['rows'][0][2:] == [f"ORD{i}" for i in range(45, 50)]
+
+    # the transposed grid, a TAG_NAME row and a row per FIX line, isn't cached yet
+    window = client.get(f"/grid?id={str_id}&transpose=true&row_start=50&row_count=5&column_count=1").get_json()
+    assert window['row_count'] == 51 and len(window['rows']) == 1 and len(window['rows'][0]) == 1 + 1
+    assert len(webfix.grid_cache) == 2
+
+    assert client.get("/grid?id=unknown").status_code == 404
+    assert client.get(f"/grid?id={str_id}&row_start=x").status_code == 400
+
+
+def test_search():
+    client = webfix.app.test_client()
+    response = client.get("/search?q=ordtyp&fix_versions=4.2,4.4&limit=3")
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert len(results) <= 3
+    assert results[0] == {'fix_tag_id': '40', 'name': 'OrdType', 'rank': 'name prefix', 'score': 0.857,
+                          'match': 'OrdType', 'fix_versions': ['4.2', '4.4']}
+
+    assert client.get("/search?q=ordtyp&fix_versions=9.9").status_code == 400
+    assert client.get("/search?q=ordtyp&limit=many").status_code == 400
+    assert client.get("/search").get_json()['results'] == []